@@ -0,0 +1,237 @@
+import argparse
+import enum
+import json
+import math
+import statistics
+import sys
+import typing
+
+NORMAL_DISTRIBUTION = statistics.NormalDist()
+
+
+class SignificanceTest(enum.StrEnum):
+    MANN_WHITNEY = "mann-whitney"
+    WELCH = "welch"
+
+
+class Verdict(enum.StrEnum):
+    REGRESSION = enum.auto()
+    IMPROVEMENT = enum.auto()
+    UNCHANGED = enum.auto()
+
+
+class Comparison(typing.NamedTuple):
+    name: str
+    records_count: typing.Optional[int]
+    baseline_median: float
+    candidate_median: float
+    ratio: float
+    p_value: float
+    verdict: Verdict
+
+
+def LoadBenchmarks(json_path: str) -> dict[str, dict[str, typing.Any]]:
+    with open(json_path, "r") as f:
+        data = json.load(f)
+    benchmarks: dict[str, dict[str, typing.Any]] = {}
+    for test in data["benchmarks"]:
+        # Merged matrix results hold the same test once per cell
+        matrix_cell = test.get("extra_info", {}).get("matrix_cell")
+        key = f"{matrix_cell}::{test['name']}" if matrix_cell else test["name"]
+        benchmarks[key] = test
+    return benchmarks
+
+
+def GetRecordsCount(test: dict[str, typing.Any]) -> typing.Optional[int]:
+    records_count = (test.get("params") or {}).get("records_count")
+    return int(records_count) if records_count is not None else None
+
+
+def MannWhitneyPValue(
+    baseline: list[float], candidate: list[float]
+) -> float:
+    samples = sorted(
+        [(value, 0) for value in baseline]
+        + [(value, 1) for value in candidate]
+    )
+    ranks = [0.0] * len(samples)
+    tie_correction = 0.0
+    start = 0
+    while start < len(samples):
+        end = start
+        while (
+            end + 1 < len(samples)
+            and samples[end + 1][0] == samples[start][0]
+        ):
+            end += 1
+        for position in range(start, end + 1):
+            ranks[position] = (start + end) / 2 + 1
+        ties = end - start + 1
+        tie_correction += ties**3 - ties
+        start = end + 1
+    baseline_count, candidate_count = len(baseline), len(candidate)
+    total_count = baseline_count + candidate_count
+    baseline_rank_sum = sum(
+        rank for rank, (_, group) in zip(ranks, samples) if group == 0
+    )
+    u_statistic = baseline_rank_sum - baseline_count * (baseline_count + 1) / 2
+    u_mean = baseline_count * candidate_count / 2
+    u_variance = (
+        baseline_count
+        * candidate_count
+        / 12
+        * (
+            total_count
+            + 1
+            - tie_correction / (total_count * (total_count - 1))
+        )
+    )
+    if u_variance <= 0:
+        return 1.0
+    # Normal approximation with continuity correction
+    z_score = max(abs(u_statistic - u_mean) - 0.5, 0) / math.sqrt(u_variance)
+    return 2 * (1 - NORMAL_DISTRIBUTION.cdf(z_score))
+
+
+def WelchPValue(
+    baseline_stats: dict[str, typing.Any],
+    candidate_stats: dict[str, typing.Any],
+) -> float:
+    standard_error = math.sqrt(
+        baseline_stats["stddev"] ** 2 / baseline_stats["rounds"]
+        + candidate_stats["stddev"] ** 2 / candidate_stats["rounds"]
+    )
+    if standard_error == 0:
+        return float(baseline_stats["mean"] == candidate_stats["mean"])
+    # Normal approximation of the t distribution, works on summary stats so
+    # runs saved without --benchmark-save-data can still be compared
+    z_score = abs(candidate_stats["mean"] - baseline_stats["mean"]) / (
+        standard_error
+    )
+    return 2 * (1 - NORMAL_DISTRIBUTION.cdf(z_score))
+
+
+def CompareBenchmark(
+    name: str,
+    baseline: dict[str, typing.Any],
+    candidate: dict[str, typing.Any],
+    significance_test: SignificanceTest,
+    threshold: float,
+    alpha: float,
+) -> Comparison:
+    baseline_stats, candidate_stats = baseline["stats"], candidate["stats"]
+    if (
+        significance_test == SignificanceTest.MANN_WHITNEY
+        and "data" in baseline_stats
+        and "data" in candidate_stats
+    ):
+        p_value = MannWhitneyPValue(
+            baseline_stats["data"], candidate_stats["data"]
+        )
+    else:
+        p_value = WelchPValue(baseline_stats, candidate_stats)
+    ratio = (
+        candidate_stats["median"] / baseline_stats["median"]
+        if baseline_stats["median"]
+        else math.inf
+    )
+    verdict = Verdict.UNCHANGED
+    if p_value < alpha and ratio > 1 + threshold:
+        verdict = Verdict.REGRESSION
+    elif p_value < alpha and ratio < 1 - threshold:
+        verdict = Verdict.IMPROVEMENT
+    return Comparison(
+        name,
+        GetRecordsCount(candidate),
+        baseline_stats["median"],
+        candidate_stats["median"],
+        ratio,
+        p_value,
+        verdict,
+    )
+
+
+def PrintComparisons(comparisons: list[Comparison]) -> None:
+    print(
+        f"{'verdict':<12} {'ratio':>8} {'p-value':>8} "
+        f"{'baseline':>12} {'candidate':>12} {'records':>8}  name"
+    )
+    for comparison in sorted(
+        comparisons, key=lambda comparison: -comparison.ratio
+    ):
+        print(
+            f"{comparison.verdict.value:<12} {comparison.ratio:>8.3f} "
+            f"{comparison.p_value:>8.4f} {comparison.baseline_median:>12.6f} "
+            f"{comparison.candidate_median:>12.6f} "
+            f"{comparison.records_count or '':>8}  {comparison.name}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compares a candidate benchmark run against a baseline "
+        "and exits nonzero on significant slowdowns."
+    )
+    parser.add_argument("baseline", type=str, help="Baseline results JSON")
+    parser.add_argument("candidate", type=str, help="Candidate results JSON")
+    parser.add_argument(
+        "--test",
+        type=SignificanceTest,
+        default=SignificanceTest.MANN_WHITNEY,
+        help="Significance test on the timing distributions "
+        f"({', '.join(test.value for test in SignificanceTest)}), "
+        "Welch is used when raw timings were not saved",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.05,
+        help="Relative change of the median ignored as noise",
+    )
+    parser.add_argument(
+        "--alpha",
+        type=float,
+        default=0.05,
+        help="Significance level",
+    )
+    args = parser.parse_args()
+
+    baseline_benchmarks = LoadBenchmarks(args.baseline)
+    candidate_benchmarks = LoadBenchmarks(args.candidate)
+    comparisons = [
+        CompareBenchmark(
+            name,
+            baseline_benchmarks[name],
+            candidate,
+            args.test,
+            args.threshold,
+            args.alpha,
+        )
+        for name, candidate in candidate_benchmarks.items()
+        if name in baseline_benchmarks
+    ]
+    PrintComparisons(comparisons)
+    unmatched_names = baseline_benchmarks.keys() ^ candidate_benchmarks.keys()
+    for name in sorted(unmatched_names):
+        side = "baseline" if name in baseline_benchmarks else "candidate"
+        print(f"Only in {side}: {name}")
+
+    regressions = [
+        comparison
+        for comparison in comparisons
+        if comparison.verdict == Verdict.REGRESSION
+    ]
+    improvements = [
+        comparison
+        for comparison in comparisons
+        if comparison.verdict == Verdict.IMPROVEMENT
+    ]
+    print(
+        f"{len(regressions)} regressions, {len(improvements)} improvements, "
+        f"{len(comparisons) - len(regressions) - len(improvements)} unchanged"
+    )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,56 +1,118 @@
+import argparse
+import html
 import json
-import sys
+import os
 import typing
 from collections import defaultdict
 
 import matplotlib.pyplot as plt
+import numpy as np
 
-if len(sys.argv) > 1:
-    JSON_PATH = sys.argv[1]
-else:
-    raise ValueError(
-        "Please provide the path to the benchmark JSON file as a command-line argument."
+# Growth faster than this exponent of records_count is flagged
+SUPER_LINEAR_EXPONENT = 1.1
+
+BenchmarkSeries = dict[str, dict[str, dict[str, dict[int, typing.Any]]]]
+
+
+class ScalingFit(typing.NamedTuple):
+    op: str
+    query_variant: str
+    backend: str
+    exponent: float
+    coefficient: float
+    points: int
+
+
+def get_operation(test_name: str) -> str:
+    # Tests sharing an operation (time range and ordered reads, cache-aside
+    # updates) are kept apart by their test name
+    test_function = test_name.split("[")[0]
+    for op in ("create", "read", "update", "delete", "aggregate"):
+        if op in test_function:
+            return test_function.removeprefix("test_").removesuffix(
+                "_records"
+            )
+    raise ValueError(f"Unknown operation in test name: {test_name}")
+
+
+def get_backend_label(test: dict[str, typing.Any], json_path: str) -> str:
+    extra_info = test.get("extra_info", {})
+    return extra_info.get("matrix_cell") or extra_info.get(
+        "database_type", os.path.splitext(os.path.basename(json_path))[0]
+    )
+
+
+def load_benchmark_series(json_paths: list[str]) -> BenchmarkSeries:
+    # op -> query variant -> backend -> records_count -> stats
+    data: BenchmarkSeries = defaultdict(
+        lambda: defaultdict(lambda: defaultdict(dict))
     )
+    for json_path in json_paths:
+        with open(json_path, "r") as f:
+            benchmarks = json.load(f)["benchmarks"]
+        for test in benchmarks:
+            # The records count leads the parameters, the rest name the query
+            query_variant = (
+                "-".join(test["param"].split("-")[1:]) or "create"
+            )
+            data[get_operation(test["name"])][query_variant][
+                get_backend_label(test, json_path)
+            ][int(test["params"]["records_count"])] = test["stats"]
+    return data
 
-with open(JSON_PATH, "r") as f:
-    data = json.load(f)
-
-benchmarks = data["benchmarks"]
-
-data: dict[str, dict[str, typing.Any]] = defaultdict(dict)
-
-for test in benchmarks:
-    if "create" in test["name"]:
-        op = "create"
-    elif "read" in test["name"]:
-        op = "read"
-    elif "update" in test["name"]:
-        op = "update"
-    elif "delete" in test["name"]:
-        op = "delete"
-    else:
-        raise ValueError(f"Unknown operation in test name: {test['name']}")
-    try:
-        query_variant = test["param"].split("-")[1]
-    except IndexError:
-        query_variant = "create"
-    data[op].setdefault(query_variant, {})[
-        int(test["params"]["records_count"])
-    ] = test["stats"]
+
+def fit_scaling_exponent(
+    stats: dict[int, typing.Any],
+) -> typing.Optional[tuple[float, float]]:
+    sizes = sorted(size for size in stats if stats[size]["mean"] > 0)
+    if len(sizes) < 2:
+        return None
+    # mean_time = coefficient * records_count ** exponent
+    exponent, log_coefficient = np.polyfit(
+        np.log(sizes), np.log([stats[size]["mean"] for size in sizes]), 1
+    )
+    return float(exponent), float(np.exp(log_coefficient))
+
+
+def fit_all_series(data: BenchmarkSeries) -> list[ScalingFit]:
+    scaling_fits: list[ScalingFit] = []
+    for op, variants in data.items():
+        for query_variant, backends in variants.items():
+            for backend, stats in backends.items():
+                scaling_fit = fit_scaling_exponent(stats)
+                if scaling_fit is not None:
+                    scaling_fits.append(
+                        ScalingFit(
+                            op,
+                            query_variant,
+                            backend,
+                            *scaling_fit,
+                            len(stats),
+                        )
+                    )
+    return scaling_fits
+
+
+def project_mean_time(scaling_fit: ScalingFit, records_count: int) -> float:
+    return scaling_fit.coefficient * records_count**scaling_fit.exponent
 
 
 def plot_all_subplots(op: str, data: dict[str, typing.Any]):
     fig, axs = plt.subplots(2, 1, figsize=(10, 10))
     fig.suptitle(f"{op.capitalize()} - Benchmark Analysis", fontsize=16)
 
-    for query_variant, stats in data.items():
-        sizes = sorted(stats.keys())
-        mean_times = [stats[size]["mean"] for size in sizes]
-        operations_per_second = [stats[size]["ops"] for size in sizes]
-        axs[0].plot(sizes, mean_times, marker="o", label=query_variant)
-        axs[1].plot(
-            sizes, operations_per_second, marker="o", label=query_variant
-        )
+    for query_variant, backends in data.items():
+        for backend, stats in backends.items():
+            label = (
+                query_variant
+                if len(backends) == 1
+                else f"{query_variant} ({backend})"
+            )
+            sizes = sorted(stats.keys())
+            mean_times = [stats[size]["mean"] for size in sizes]
+            operations_per_second = [stats[size]["ops"] for size in sizes]
+            axs[0].plot(sizes, mean_times, marker="o", label=label)
+            axs[1].plot(sizes, operations_per_second, marker="o", label=label)
 
     axs[0].set_xscale("log")
     axs[0].set_xlabel("Number of records")
@@ -69,5 +131,168 @@ def plot_all_subplots(op: str, data: dict[str, typing.Any]):
     plt.show()
 
 
-for operation, values in list(data.items()):
-    plot_all_subplots(operation, values)
+def plot_scaling_report(
+    op: str,
+    variants: dict[str, typing.Any],
+    scaling_fits: list[ScalingFit],
+    image_path: str,
+) -> None:
+    columns = min(len(variants), 3)
+    rows = -(-len(variants) // columns)
+    fig, axs = plt.subplots(
+        rows, columns, figsize=(6 * columns, 5 * rows), squeeze=False
+    )
+    fig.suptitle(f"{op.capitalize()} - Scaling Across Backends", fontsize=16)
+    fits_by_series = {
+        (scaling_fit.query_variant, scaling_fit.backend): scaling_fit
+        for scaling_fit in scaling_fits
+        if scaling_fit.op == op
+    }
+
+    for ax, (query_variant, backends) in zip(
+        axs.flat, sorted(variants.items())
+    ):
+        for backend, stats in sorted(backends.items()):
+            sizes = sorted(stats.keys())
+            scaling_fit = fits_by_series.get((query_variant, backend))
+            label = backend
+            if scaling_fit is not None:
+                label += f" (n^{scaling_fit.exponent:.2f})"
+            line = ax.plot(
+                sizes,
+                [stats[size]["mean"] for size in sizes],
+                marker="o",
+                label=label,
+            )[0]
+            if scaling_fit is not None:
+                ax.plot(
+                    sizes,
+                    [project_mean_time(scaling_fit, size) for size in sizes],
+                    linestyle="--",
+                    color=line.get_color(),
+                )
+        ax.set_xscale("log")
+        ax.set_yscale("log")
+        ax.set_xlabel("Number of records")
+        ax.set_ylabel("Execution time (seconds)")
+        ax.set_title(query_variant)
+        ax.grid(True, which="both")
+        ax.legend()
+    for ax in list(axs.flat)[len(variants) :]:
+        ax.set_visible(False)
+
+    # Leave room for the suptitle above the subplot grid
+    fig.tight_layout(rect=(0, 0, 1, 0.97))
+    fig.savefig(image_path)
+    plt.close(fig)
+
+
+def write_html_report(
+    report_dir: str,
+    image_names: list[str],
+    scaling_fits: list[ScalingFit],
+    projection_sizes: list[int],
+) -> None:
+    header_cells = "".join(
+        f"<th>projected at {size:,}</th>" for size in projection_sizes
+    )
+    table_rows: list[str] = []
+    for scaling_fit in sorted(
+        scaling_fits, key=lambda scaling_fit: -scaling_fit.exponent
+    ):
+        super_linear = scaling_fit.exponent > SUPER_LINEAR_EXPONENT
+        projected_cells = "".join(
+            f"<td>{project_mean_time(scaling_fit, size):.4f} s</td>"
+            for size in projection_sizes
+        )
+        table_rows.append(
+            f'<tr class="{"super-linear" if super_linear else ""}">'
+            f"<td>{html.escape(scaling_fit.op)}</td>"
+            f"<td>{html.escape(scaling_fit.query_variant)}</td>"
+            f"<td>{html.escape(scaling_fit.backend)}</td>"
+            f"<td>{scaling_fit.exponent:.3f}</td>"
+            f"<td>{'yes' if super_linear else ''}</td>"
+            f"<td>{scaling_fit.points}</td>"
+            f"{projected_cells}</tr>"
+        )
+    images = "".join(
+        f'<img src="{html.escape(image_name)}">' for image_name in image_names
+    )
+    report = (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'>"
+        "<title>Benchmark scaling report</title><style>"
+        "body{font-family:sans-serif} table{border-collapse:collapse}"
+        "td,th{border:1px solid #ccc;padding:4px 8px}"
+        ".super-linear{background:#fdd} img{max-width:100%}"
+        "</style></head><body><h1>Benchmark scaling report</h1>"
+        f"<p>Mean time is fitted as c * n^k over records_count n. "
+        f"Rows with k &gt; {SUPER_LINEAR_EXPONENT} grow super-linearly.</p>"
+        "<table><tr><th>operation</th><th>query</th><th>backend</th>"
+        "<th>exponent k</th><th>super-linear</th><th>points</th>"
+        f"{header_cells}</tr>{''.join(table_rows)}</table>"
+        f"{images}</body></html>"
+    )
+    with open(os.path.join(report_dir, "index.html"), "w") as f:
+        f.write(report)
+
+
+def write_report(
+    data: BenchmarkSeries, report_dir: str, projection_sizes: list[int]
+) -> None:
+    plt.switch_backend("Agg")
+    os.makedirs(report_dir, exist_ok=True)
+    scaling_fits = fit_all_series(data)
+    image_names: list[str] = []
+    for op, variants in data.items():
+        image_name = f"{op}.png"
+        plot_scaling_report(
+            op, variants, scaling_fits, os.path.join(report_dir, image_name)
+        )
+        image_names.append(image_name)
+    write_html_report(report_dir, image_names, scaling_fits, projection_sizes)
+    for scaling_fit in scaling_fits:
+        if scaling_fit.exponent > SUPER_LINEAR_EXPONENT:
+            print(
+                f"Super-linear: {scaling_fit.op} {scaling_fit.query_variant} "
+                f"on {scaling_fit.backend} "
+                f"scales as n^{scaling_fit.exponent:.2f}"
+            )
+    print(f"Report written to {os.path.join(report_dir, 'index.html')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Plots benchmark results, or writes a scaling report "
+        "that overlays several backends."
+    )
+    parser.add_argument(
+        "json_paths",
+        type=str,
+        nargs="+",
+        help="Benchmark JSON files, one per backend or a merged matrix file",
+    )
+    parser.add_argument(
+        "--report-dir",
+        type=str,
+        default=None,
+        help="Write PNG/HTML report files here instead of showing the plots",
+    )
+    parser.add_argument(
+        "--projection-sizes",
+        type=int,
+        nargs="+",
+        default=[1000000, 10000000],
+        help="records_count values the fitted curves are projected to",
+    )
+    args = parser.parse_args()
+
+    data = load_benchmark_series(args.json_paths)
+    if args.report_dir:
+        write_report(data, args.report_dir, args.projection_sizes)
+        return
+    for operation, values in list(data.items()):
+        plot_all_subplots(operation, values)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import argparse
+import logging
+
+from src.synthetic_trips import LoadSyntheticTripModel
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Writes seeded synthetic NYC taxi trips, learned from a "
+        "source parquet file, in chunks to a new parquet file."
+    )
+    parser.add_argument(
+        "source", type=str, help="Parquet file the trips are learned from"
+    )
+    parser.add_argument("output", type=str, help="Parquet file to write")
+    parser.add_argument(
+        "--rows", type=int, required=True, help="Number of trips to generate"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=1000000,
+        help="Trips generated and written at once",
+    )
+    parser.add_argument(
+        "--jitter",
+        type=float,
+        default=0.1,
+        help="Log-normal sigma applied to distances, fares and durations",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    trip_model = LoadSyntheticTripModel(args.source, args.jitter)
+    trip_model.write_parquet(args.output, args.rows, args.seed, args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
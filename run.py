@@ -1,9 +1,36 @@
 import argparse
 import logging
+import sys
 
 import pytest
 
-from src.database_fixture_factory import DatabaseFixtureFactory, DatabaseType
+from src.database_fixture_factory import (
+    EMBEDDED_DATABASE_TYPES,
+    ContainerScope,
+    DatabaseFixtureFactory,
+    DatabaseType,
+    ServerMode,
+)
+from src.framework.crud_handlers import CacheWritePolicy, ReadResultFormat
+from src.framework.index_profiles import IndexProfile
+from src.framework.phase_profiler import PhaseProfiler
+from src.framework.postgres_database import (
+    PostgresDatabase,
+    PostgresDurabilityProfile,
+    PostgresLayout,
+)
+from src.framework.redis_database import (
+    RedisDatabase,
+    RedisDurabilityProfile,
+    RedisStorageModel,
+)
+from src.framework.schema_profiles import SchemaProfile
+from src.framework.sqlite_database import (
+    SQLITE_IN_MEMORY_PATH,
+    SqliteDatabase,
+    SqlitePragmaProfile,
+)
+from src.framework.tracing import JsonLinesTraceSink, LoggingTraceSink, Tracer
 
 
 def main():
@@ -22,6 +49,149 @@ def main():
         required=True,
         help="Path to the parquet file with data to load",
     )
+    parser.add_argument(
+        "--container-scope",
+        type=lambda scope: ContainerScope[scope.upper()],
+        default=ContainerScope.SESSION,
+        help="How long one database server lives "
+        f"({', '.join(scope.value for scope in ContainerScope)})",
+    )
+    parser.add_argument(
+        "--server-mode",
+        type=lambda mode: ServerMode[mode.upper()],
+        default=ServerMode.COMPOSE,
+        help="Start the server with docker compose, attach to a running one "
+        "or spawn a local redis-server/postgres process "
+        f"({', '.join(mode.value for mode in ServerMode)})",
+    )
+    parser.add_argument(
+        "--host",
+        type=str,
+        default="127.0.0.1",
+        help="Database server host",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=None,
+        help="Database server port, the database default when omitted",
+    )
+    parser.add_argument(
+        "--compose-project",
+        type=str,
+        default="",
+        help="Docker compose project name, isolates parallel runs",
+    )
+    parser.add_argument(
+        "--benchmark-json",
+        type=str,
+        default=None,
+        help="Write results to this JSON file instead of the saved run history",
+    )
+    parser.add_argument(
+        "--sample-resources",
+        type=float,
+        nargs="?",
+        const=1.0,
+        default=None,
+        metavar="INTERVAL",
+        help="Sample server memory, command and CPU statistics every "
+        "INTERVAL seconds (1 when omitted) during each benchmark",
+    )
+    parser.add_argument(
+        "--records-counts",
+        type=int,
+        nargs="+",
+        default=DatabaseFixtureFactory.GetRecordsCounts(),
+        help="Numbers of records every benchmark is run with",
+    )
+    parser.add_argument(
+        "--load-chunk-size",
+        type=int,
+        default=100000,
+        help="Rows handed to the loader at once",
+    )
+    parser.add_argument(
+        "--synthetic-seed",
+        type=int,
+        default=None,
+        help="Stream seeded synthetic trips learned from --parquet instead of "
+        "its rows, so records counts are not limited by the file",
+    )
+    parser.add_argument(
+        "--read-result-format",
+        type=lambda result_format: ReadResultFormat[result_format.upper()],
+        default=ReadResultFormat.ROWS,
+        help="Shape of read results "
+        f"({', '.join(result_format.value for result_format in ReadResultFormat)}), "
+        "the columnar formats skip per row dicts and ORM entities",
+    )
+    parser.add_argument(
+        "--delete-batch-size",
+        type=int,
+        default=None,
+        help="Delete matching relational rows and the rows they own in "
+        "transactions of at most this many rows, one cascading DELETE when "
+        "omitted",
+    )
+    parser.add_argument(
+        "--cache-host",
+        type=str,
+        default=None,
+        help="Host of a running Redis server used as cache-aside tier in "
+        "front of the database, cache-aside benchmarks are skipped when omitted",
+    )
+    parser.add_argument(
+        "--cache-port",
+        type=int,
+        default=6379,
+        help="Port of the Redis cache server",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=int,
+        default=None,
+        help="Seconds cached reads live, no expiry when omitted",
+    )
+    parser.add_argument(
+        "--cache-write-policy",
+        type=lambda policy: CacheWritePolicy[policy.upper()],
+        default=CacheWritePolicy.INVALIDATE,
+        help="What updates and deletes do to the cached reads of the tables "
+        f"they touch ({', '.join(policy.value for policy in CacheWritePolicy)})",
+    )
+    parser.add_argument(
+        "--profile-phases",
+        action="store_true",
+        help="Split handler operations into query build, wire, server, "
+        "decode and conversion time and store them per benchmark",
+    )
+    parser.add_argument(
+        "--flamegraph",
+        type=str,
+        default=None,
+        metavar="TEST_NAME",
+        help="Record a py-spy flamegraph of the tests whose name contains "
+        "TEST_NAME",
+    )
+    parser.add_argument(
+        "--flamegraph-dir",
+        type=str,
+        default=".benchmarks/flamegraphs",
+        help="Directory the flamegraph SVG files are written to",
+    )
+    parser.add_argument(
+        "--trace-log",
+        action="store_true",
+        help="Log query start/end, row and byte trace events of every "
+        "handler operation",
+    )
+    parser.add_argument(
+        "--trace-file",
+        type=str,
+        default=None,
+        help="Append trace events as JSON lines to this file",
+    )
     parser.add_argument(
         "--log-level",
         type=str,
@@ -29,26 +199,152 @@ def main():
         default="INFO",
         help="Set the logging level",
     )
+    parser.add_argument(
+        "--capture-query-plans",
+        action="store_true",
+        help="Store EXPLAIN ANALYZE / FT.PROFILE output of every benchmarked query",
+    )
+    parser.add_argument(
+        "--index-profile",
+        type=lambda profile: IndexProfile[profile.upper()],
+        default=IndexProfile.NONE,
+        help="Secondary indexes created on the Postgres schema "
+        f"({', '.join(profile.value for profile in IndexProfile)})",
+    )
+    parser.add_argument(
+        "--redis-storage-model",
+        type=lambda model: RedisStorageModel[model.upper()],
+        default=RedisStorageModel.JSON,
+        help="How trips are stored in Redis "
+        f"({', '.join(model.value for model in RedisStorageModel)})",
+    )
+    parser.add_argument(
+        "--postgres-layout",
+        type=lambda layout: PostgresLayout[layout.upper()],
+        default=PostgresLayout.NORMALIZED,
+        help="Postgres data layout "
+        f"({', '.join(layout.value for layout in PostgresLayout)})",
+    )
+    parser.add_argument(
+        "--schema-profile",
+        type=lambda profile: SchemaProfile[profile.upper()],
+        default=SchemaProfile.STANDARD,
+        help="Postgres column types, compact uses smallint codes, a zone "
+        "table and numeric amounts "
+        f"({', '.join(profile.value for profile in SchemaProfile)})",
+    )
+    parser.add_argument(
+        "--postgres-durability-profile",
+        type=lambda profile: PostgresDurabilityProfile[profile.upper()],
+        default=PostgresDurabilityProfile.NORMAL,
+        help="Postgres commit and WAL durability "
+        f"({', '.join(profile.value for profile in PostgresDurabilityProfile)})",
+    )
+    parser.add_argument(
+        "--redis-durability-profile",
+        type=lambda profile: RedisDurabilityProfile[profile.upper()],
+        default=RedisDurabilityProfile.DEFAULT,
+        help="Redis persistence and AOF fsync policy "
+        f"({', '.join(profile.value for profile in RedisDurabilityProfile)})",
+    )
+    parser.add_argument(
+        "--redis-shards",
+        type=int,
+        default=1,
+        help="Redis instances the trip keys are spread over by hash, on "
+        "consecutive ports starting at the Redis port",
+    )
+    parser.add_argument(
+        "--partition-by-month",
+        action="store_true",
+        help="Range partition trip tables by pickup month in Postgres",
+    )
+    parser.add_argument(
+        "--sqlite-path",
+        type=str,
+        default=SQLITE_IN_MEMORY_PATH,
+        help="SQLite database file, in-memory when omitted",
+    )
+    parser.add_argument(
+        "--sqlite-journal-mode",
+        type=str,
+        choices=["WAL", "DELETE", "TRUNCATE", "MEMORY", "OFF"],
+        default="WAL",
+        help="SQLite journal mode for file databases",
+    )
+    parser.add_argument(
+        "--sqlite-pragma-profile",
+        type=lambda profile: SqlitePragmaProfile[profile.upper()],
+        default=SqlitePragmaProfile.BALANCED,
+        help="SQLite pragma tuning profile "
+        f"({', '.join(profile.value for profile in SqlitePragmaProfile)})",
+    )
     args = parser.parse_args()
     logging.basicConfig(level=getattr(logging, args.log_level))
 
     try:
         DatabaseFixtureFactory.SetDatabaseType(args.database)
         DatabaseFixtureFactory.SetDatasetPath(args.parquet)
+        DatabaseFixtureFactory.SetRecordsCounts(args.records_counts)
+        DatabaseFixtureFactory.SetLoadChunkSize(args.load_chunk_size)
+        DatabaseFixtureFactory.SetSyntheticSeed(args.synthetic_seed)
+        DatabaseFixtureFactory.SetCaptureQueryPlans(args.capture_query_plans)
+        DatabaseFixtureFactory.SetContainerScope(args.container_scope)
+        DatabaseFixtureFactory.SetServerMode(args.server_mode)
+        DatabaseFixtureFactory.SetComposeProjectName(args.compose_project)
+        DatabaseFixtureFactory.SetResourceSamplingInterval(
+            args.sample_resources
+        )
+        DatabaseFixtureFactory.SetReadResultFormat(args.read_result_format)
+        DatabaseFixtureFactory.SetDeleteBatchSize(args.delete_batch_size)
+        DatabaseFixtureFactory.SetCacheAddress(args.cache_host, args.cache_port)
+        DatabaseFixtureFactory.SetCacheTtl(args.cache_ttl)
+        DatabaseFixtureFactory.SetCacheWritePolicy(args.cache_write_policy)
+        PhaseProfiler.SetEnabled(args.profile_phases)
+        if args.trace_log:
+            Tracer.AddSink(LoggingTraceSink(logging.INFO))
+        if args.trace_file:
+            Tracer.AddSink(JsonLinesTraceSink(args.trace_file))
+        PhaseProfiler.SetFlamegraphCapture(args.flamegraph, args.flamegraph_dir)
+        if args.database not in EMBEDDED_DATABASE_TYPES:
+            DatabaseFixtureFactory.SetServerAddress(args.host, args.port)
+        PostgresDatabase.SetIndexProfile(args.index_profile)
+        PostgresDatabase.SetLayout(args.postgres_layout)
+        PostgresDatabase.SetPartitioning(args.partition_by_month)
+        PostgresDatabase.SetDurabilityProfile(args.postgres_durability_profile)
+        PostgresDatabase.SetSchemaProfile(args.schema_profile)
+        SqliteDatabase.SetDatabasePath(args.sqlite_path)
+        SqliteDatabase.SetJournalMode(args.sqlite_journal_mode)
+        SqliteDatabase.SetPragmaProfile(args.sqlite_pragma_profile)
+        RedisDatabase.SetStorageModel(args.redis_storage_model)
+        RedisDatabase.SetDurabilityProfile(args.redis_durability_profile)
+        RedisDatabase.SetShardsCount(args.redis_shards)
 
-        pytest.main(
+        # Parallel runs would race on numbering the saved history files
+        benchmark_output_args = (
+            [f"--benchmark-json={args.benchmark_json}"]
+            if args.benchmark_json
+            else [
+                "--benchmark-save",
+                f"performance_{args.database.value.lower()}",
+            ]
+        )
+        return pytest.main(
             args=[
                 "test/performance_tests.py",
                 "-s",
                 "-vv",
-                "--benchmark-save",
-                f"performance_{args.database.value.lower()}",
+                # Raw timings let compare_benchmarks.py test distributions
+                "--benchmark-save-data",
+                *benchmark_output_args,
             ]
         )
     except Exception:
         DatabaseFixtureFactory.TeardownDatabase()
         raise
+    finally:
+        Tracer.CloseSinks()
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
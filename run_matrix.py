@@ -0,0 +1,274 @@
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import typing
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import product
+
+from src.database_fixture_factory import EMBEDDED_DATABASE_TYPES, DatabaseType
+from src.framework.index_profiles import IndexProfile
+from src.framework.postgres_database import (
+    PostgresDurabilityProfile,
+    PostgresLayout,
+)
+from src.framework.redis_database import (
+    RedisDurabilityProfile,
+    RedisStorageModel,
+)
+from src.framework.schema_profiles import SchemaProfile
+
+DEFAULT_PORTS: dict[DatabaseType, int] = {
+    DatabaseType.POSTGRES: 5432,
+    DatabaseType.REDIS: 6379,
+    DatabaseType.POSTGRES_JSONB: 5432,
+}
+
+
+class MatrixCell(typing.NamedTuple):
+    database: DatabaseType
+    parquet: str
+    options: dict[str, str]
+
+    @property
+    def name(self) -> str:
+        dataset_name = os.path.splitext(os.path.basename(self.parquet))[0]
+        return "_".join(
+            [self.database.value, dataset_name, *self.options.values()]
+        )
+
+
+def BuildMatrixCells(args: argparse.Namespace) -> list[MatrixCell]:
+    cells: list[MatrixCell] = []
+    for database, parquet in product(args.databases, args.parquet):
+        match database:
+            case DatabaseType.POSTGRES:
+                option_axes = {
+                    "--index-profile": args.index_profiles,
+                    "--postgres-layout": args.postgres_layouts,
+                    "--schema-profile": args.schema_profiles,
+                    "--postgres-durability-profile": (
+                        args.postgres_durability_profiles
+                    ),
+                }
+            case DatabaseType.POSTGRES_JSONB:
+                option_axes = {
+                    "--postgres-durability-profile": (
+                        args.postgres_durability_profiles
+                    ),
+                }
+            case DatabaseType.REDIS:
+                option_axes = {
+                    "--redis-storage-model": args.redis_storage_models,
+                    "--redis-durability-profile": args.redis_durability_profiles,
+                    "--redis-shards": args.redis_shards_counts,
+                }
+            case _:
+                option_axes = {}
+        for option_values in product(*option_axes.values()):
+            cells.append(
+                MatrixCell(
+                    database,
+                    parquet,
+                    {
+                        option: str(value)
+                        for option, value in zip(option_axes, option_values)
+                    },
+                )
+            )
+    return cells
+
+
+def RunMatrixCell(
+    cell_index: int,
+    cell: MatrixCell,
+    output_directory: str,
+    forwarded_args: list[str],
+    ports_stride: int = 1,
+) -> tuple[MatrixCell, str, int]:
+    # The index keeps file names unique for datasets sharing a base name
+    cell_file_prefix = os.path.join(
+        output_directory, f"{cell_index}_{cell.name}"
+    )
+    results_path = f"{cell_file_prefix}.json"
+    command = [
+        sys.executable,
+        "run.py",
+        "--database",
+        cell.database.value,
+        "--parquet",
+        cell.parquet,
+        "--benchmark-json",
+        results_path,
+        *(
+            argument
+            for option_value in cell.options.items()
+            for argument in option_value
+        ),
+    ]
+    # Every cell gets its own compose project and host ports, sharded
+    # Redis cells use one port per shard
+    if cell.database not in EMBEDDED_DATABASE_TYPES:
+        command += [
+            "--compose-project",
+            f"benchmark_matrix_{cell_index}",
+            "--port",
+            str(
+                DEFAULT_PORTS[cell.database] + 1 + cell_index * ports_stride
+            ),
+        ]
+    command += forwarded_args
+    log_path = f"{cell_file_prefix}.log"
+    logging.info(f"Starting {cell.name}, log in {log_path}")
+    with open(log_path, "w") as cell_log:
+        return_code = subprocess.run(
+            command, stdout=cell_log, stderr=subprocess.STDOUT
+        ).returncode
+    logging.info(f"Finished {cell.name} with exit code {return_code}")
+    return cell, results_path, return_code
+
+
+def MergeMatrixResults(
+    cell_results: list[tuple[MatrixCell, str, int]], merged_path: str
+) -> None:
+    merged_results: dict[str, typing.Any] = {"benchmarks": [], "cells": []}
+    for cell, results_path, return_code in cell_results:
+        merged_results["cells"].append(
+            {
+                "name": cell.name,
+                "database": cell.database.value,
+                "parquet": cell.parquet,
+                "options": cell.options,
+                "return_code": return_code,
+            }
+        )
+        if not os.path.exists(results_path):
+            logging.warning(f"No results were written by {cell.name}")
+            continue
+        with open(results_path, "r") as f:
+            cell_data = json.load(f)
+        for key in ("machine_info", "commit_info", "datetime", "version"):
+            merged_results.setdefault(key, cell_data.get(key))
+        for benchmark in cell_data["benchmarks"]:
+            benchmark["extra_info"]["matrix_cell"] = cell.name
+            benchmark["extra_info"]["dataset"] = cell.parquet
+            merged_results["benchmarks"].append(benchmark)
+    with open(merged_path, "w") as f:
+        json.dump(merged_results, f, indent=4)
+    logging.info(
+        f"Merged {len(merged_results['benchmarks'])} benchmarks into {merged_path}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Runs the performance tests for a matrix of databases, "
+        "datasets and profiles in parallel. Unknown arguments are passed "
+        "on to run.py."
+    )
+    parser.add_argument(
+        "--databases",
+        type=lambda db_type: DatabaseType[db_type.upper()],
+        nargs="+",
+        required=True,
+        help="Database types to run",
+    )
+    parser.add_argument(
+        "--parquet",
+        type=str,
+        nargs="+",
+        required=True,
+        help="Paths to the parquet files with data to load",
+    )
+    parser.add_argument(
+        "--index-profiles",
+        type=lambda profile: IndexProfile[profile.upper()],
+        nargs="+",
+        default=[IndexProfile.NONE],
+        help="Postgres index profiles to run",
+    )
+    parser.add_argument(
+        "--postgres-layouts",
+        type=lambda layout: PostgresLayout[layout.upper()],
+        nargs="+",
+        default=[PostgresLayout.NORMALIZED],
+        help="Postgres data layouts to run",
+    )
+    parser.add_argument(
+        "--redis-storage-models",
+        type=lambda model: RedisStorageModel[model.upper()],
+        nargs="+",
+        default=[RedisStorageModel.JSON],
+        help="Redis storage models to run",
+    )
+    parser.add_argument(
+        "--schema-profiles",
+        type=lambda profile: SchemaProfile[profile.upper()],
+        nargs="+",
+        default=[SchemaProfile.STANDARD],
+        help="Postgres schema profiles to run",
+    )
+    parser.add_argument(
+        "--postgres-durability-profiles",
+        type=lambda profile: PostgresDurabilityProfile[profile.upper()],
+        nargs="+",
+        default=[PostgresDurabilityProfile.NORMAL],
+        help="Postgres durability profiles to run",
+    )
+    parser.add_argument(
+        "--redis-durability-profiles",
+        type=lambda profile: RedisDurabilityProfile[profile.upper()],
+        nargs="+",
+        default=[RedisDurabilityProfile.DEFAULT],
+        help="Redis durability profiles to run",
+    )
+    parser.add_argument(
+        "--redis-shards-counts",
+        type=int,
+        nargs="+",
+        default=[1],
+        help="Numbers of Redis shards to run",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of cells run at once, all of them when omitted",
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=str,
+        default=os.path.join(
+            ".benchmarks", f"matrix_{datetime.now():%Y%m%d_%H%M%S}"
+        ),
+        help="Directory for the per cell results, logs and merged results",
+    )
+    args, forwarded_args = parser.parse_known_args()
+    logging.basicConfig(level=logging.INFO)
+
+    cells = BuildMatrixCells(args)
+    os.makedirs(args.output_dir, exist_ok=True)
+    logging.info(f"Running {len(cells)} matrix cells")
+    with ThreadPoolExecutor(max_workers=args.jobs or len(cells)) as executor:
+        cell_results = list(
+            executor.map(
+                lambda indexed_cell: RunMatrixCell(
+                    *indexed_cell,
+                    args.output_dir,
+                    forwarded_args,
+                    max(args.redis_shards_counts),
+                ),
+                enumerate(cells),
+            )
+        )
+    MergeMatrixResults(
+        cell_results, os.path.join(args.output_dir, "matrix.json")
+    )
+    return max(return_code for _, _, return_code in cell_results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,37 +1,94 @@
+import collections
 import enum
+import logging
 import os
+import shutil
 import subprocess
 import sys
+import tempfile
 import typing
 
 import pandas as pd
+from redis import Redis
 
-from .framework.abstract_database import AbstractDatabase
-from .framework.postgres_database import PostgresDatabase
+from .framework.abstract_database import AbstractDatabase, WaitForDatabaseReady
+from .framework.crud_handlers import CacheWritePolicy, ReadResultFormat
+from .framework.numpy_database import NumpyDatabase
+from .framework.postgres_database import PostgresDatabase, PostgresLayout
+from .framework.postgres_document_database import PostgresDocumentDatabase
 from .framework.redis_database import RedisDatabase
+from .framework.resource_sampler import ParseMemoryUsage, ReadProcessSample
+from .framework.sqlite_database import SqliteDatabase
 from .nyc_data_loaders import (
+    LoadNycTaxiDataToNumpyDatabase,
+    LoadNycTaxiDataToPostgresDatabase,
+    LoadNycTaxiDataToPostgresJsonbDatabase,
     LoadNycTaxiDataToRedisDatabase,
     LoadNycTaxiDataToSqlDatabase,
+    ReadNycTaxiParquetChunks,
 )
+from .synthetic_trips import LoadSyntheticTripModel, SyntheticTripModel
 
 
 class DatabaseType(enum.StrEnum):
     POSTGRES = enum.auto()
     REDIS = enum.auto()
+    SQLITE = enum.auto()
+    NUMPY = enum.auto()
+    POSTGRES_JSONB = enum.auto()
     UNKNOWN = enum.auto()
 
 
+# Embedded backends run in-process and need no docker compose project
+EMBEDDED_DATABASE_TYPES = (DatabaseType.SQLITE, DatabaseType.NUMPY)
+
+# Database types sharing the server (compose file, settings, spawn command)
+# of another type
+DATABASE_SERVER_TYPES: dict[DatabaseType, DatabaseType] = {
+    DatabaseType.POSTGRES_JSONB: DatabaseType.POSTGRES,
+}
+
+
+class ContainerScope(enum.StrEnum):
+    SESSION = enum.auto()
+    MODULE = enum.auto()
+    FUNCTION = enum.auto()
+
+
+class ServerMode(enum.StrEnum):
+    COMPOSE = enum.auto()
+    ATTACH = enum.auto()
+    SPAWN = enum.auto()
+
+
 class DatabaseFixtureFactory:
     database_type: DatabaseType = DatabaseType.UNKNOWN
     dataset_path: str = ""
     docker_compose_file: str = ""
+    capture_query_plans: bool = False
+    container_scope: ContainerScope = ContainerScope.SESSION
+    server_mode: ServerMode = ServerMode.COMPOSE
+    compose_project_name: str = ""
+    local_servers: list[subprocess.Popen[bytes]] = []
+    local_server_directory: str = ""
+    resource_sampling_interval: typing.Optional[float] = None
+    read_result_format: ReadResultFormat = ReadResultFormat.ROWS
+    delete_batch_size: typing.Optional[int] = None
+    cache_address: typing.Optional[tuple[str, int]] = None
+    cache_ttl: typing.Optional[int] = None
+    cache_write_policy: CacheWritePolicy = CacheWritePolicy.INVALIDATE
+    cache_engine: typing.Optional[Redis] = None
+    records_counts: list[int] = [1000, 5000, 10000, 50000]
+    load_chunk_size: int = 100000
+    synthetic_seed: typing.Optional[int] = None
+    synthetic_trip_model: typing.Optional[SyntheticTripModel] = None
 
     @classmethod
     def SetDatabaseType(cls, db_type: DatabaseType) -> None:
         cls.database_type = db_type
         cls.docker_compose_file = os.path.join(
             os.path.dirname(os.path.abspath(sys.argv[0])),
-            f"{cls.database_type.value.lower()}",
+            f"{cls.GetServerType().value.lower()}",
             "compose.yml",
         )
 
@@ -39,6 +96,10 @@ class DatabaseFixtureFactory:
     def GetDatabaseType(cls) -> DatabaseType:
         return cls.database_type
 
+    @classmethod
+    def GetServerType(cls) -> DatabaseType:
+        return DATABASE_SERVER_TYPES.get(cls.database_type, cls.database_type)
+
     @classmethod
     def SetDatasetPath(cls, dataset_path: str) -> None:
         cls.dataset_path = dataset_path
@@ -48,55 +109,468 @@ class DatabaseFixtureFactory:
         return cls.dataset_path
 
     @classmethod
-    def SetupDatabase(cls) -> None:
-        subprocess.run(
-            ["docker", "compose", "-f", cls.docker_compose_file, "up", "-d"],
-            check=True,
+    def SetRecordsCounts(cls, records_counts: list[int]) -> None:
+        cls.records_counts = records_counts
+
+    @classmethod
+    def GetRecordsCounts(cls) -> list[int]:
+        return cls.records_counts
+
+    @classmethod
+    def SetLoadChunkSize(cls, load_chunk_size: int) -> None:
+        cls.load_chunk_size = load_chunk_size
+
+    @classmethod
+    def SetSyntheticSeed(cls, synthetic_seed: typing.Optional[int]) -> None:
+        # With a seed the dataset only trains the generator, any number of
+        # rows is streamed to the loaders
+        cls.synthetic_seed = synthetic_seed
+        cls.synthetic_trip_model = None
+
+    @classmethod
+    def GetRecordChunks(
+        cls, records_count: int
+    ) -> typing.Iterator[pd.DataFrame]:
+        if cls.synthetic_seed is None:
+            return ReadNycTaxiParquetChunks(
+                cls.dataset_path, records_count, cls.load_chunk_size
+            )
+        if cls.synthetic_trip_model is None:
+            cls.synthetic_trip_model = LoadSyntheticTripModel(cls.dataset_path)
+        return cls.synthetic_trip_model.generate(
+            records_count, cls.synthetic_seed, cls.load_chunk_size
         )
 
     @classmethod
-    def TeardownDatabase(cls) -> None:
-        subprocess.run(
-            [
-                "docker",
-                "compose",
-                "-f",
-                cls.docker_compose_file,
-                "down",
-                "-v",
-            ],
-            check=True,
+    def SetCaptureQueryPlans(cls, capture_query_plans: bool) -> None:
+        cls.capture_query_plans = capture_query_plans
+
+    @classmethod
+    def GetCaptureQueryPlans(cls) -> bool:
+        return cls.capture_query_plans
+
+    @classmethod
+    def SetContainerScope(cls, container_scope: ContainerScope) -> None:
+        cls.container_scope = container_scope
+
+    @classmethod
+    def GetContainerScope(cls) -> ContainerScope:
+        return cls.container_scope
+
+    @classmethod
+    def SetServerMode(cls, server_mode: ServerMode) -> None:
+        cls.server_mode = server_mode
+
+    @classmethod
+    def GetServerMode(cls) -> ServerMode:
+        return cls.server_mode
+
+    @classmethod
+    def SetResourceSamplingInterval(
+        cls, resource_sampling_interval: typing.Optional[float]
+    ) -> None:
+        cls.resource_sampling_interval = resource_sampling_interval
+
+    @classmethod
+    def GetResourceSamplingInterval(cls) -> typing.Optional[float]:
+        return cls.resource_sampling_interval
+
+    @classmethod
+    def SetReadResultFormat(cls, read_result_format: ReadResultFormat) -> None:
+        cls.read_result_format = read_result_format
+
+    @classmethod
+    def GetReadResultFormat(cls) -> ReadResultFormat:
+        return cls.read_result_format
+
+    @classmethod
+    def SetDeleteBatchSize(cls, delete_batch_size: typing.Optional[int]) -> None:
+        cls.delete_batch_size = delete_batch_size
+
+    @classmethod
+    def GetDeleteBatchSize(cls) -> typing.Optional[int]:
+        return cls.delete_batch_size
+
+    @classmethod
+    def SetCacheAddress(
+        cls, host: typing.Optional[str], port: int = 6379
+    ) -> None:
+        # The cache tier attaches to a running Redis server, it is not started
+        # or torn down with the benchmarked database
+        cls.cache_address = (host, port) if host else None
+        cls.cache_engine = None
+
+    @classmethod
+    def GetCacheAddress(cls) -> typing.Optional[tuple[str, int]]:
+        return cls.cache_address
+
+    @classmethod
+    def SetCacheTtl(cls, cache_ttl: typing.Optional[int]) -> None:
+        cls.cache_ttl = cache_ttl
+
+    @classmethod
+    def GetCacheTtl(cls) -> typing.Optional[int]:
+        return cls.cache_ttl
+
+    @classmethod
+    def SetCacheWritePolicy(cls, cache_write_policy: CacheWritePolicy) -> None:
+        cls.cache_write_policy = cache_write_policy
+
+    @classmethod
+    def GetCacheWritePolicy(cls) -> CacheWritePolicy:
+        return cls.cache_write_policy
+
+    @classmethod
+    def GetCacheEngine(cls) -> Redis:
+        if cls.cache_address is None:
+            raise ValueError("No cache address is set.")
+        if cls.cache_engine is None:
+            host, port = cls.cache_address
+            cls.cache_engine = Redis(
+                host=host, port=port, decode_responses=True
+            )
+            WaitForDatabaseReady("Redis cache", cls.cache_engine.ping)
+        return cls.cache_engine
+
+    @classmethod
+    def GetServerProcessSample(cls) -> dict[str, typing.Any]:
+        if cls.database_type in EMBEDDED_DATABASE_TYPES:
+            return ReadProcessSample(os.getpid())
+        match cls.server_mode:
+            case ServerMode.SPAWN:
+                server_samples = [
+                    ReadProcessSample(local_server.pid)
+                    for local_server in cls.local_servers
+                ]
+            case ServerMode.COMPOSE:
+                server_samples = [
+                    cls.__GetContainerSample(server_index)
+                    for server_index in range(
+                        len(cls.GetDatabaseHandle().GetServerAddresses())
+                    )
+                ]
+            case _:
+                return {}
+        # Shards are summed, together they are one database server
+        summed_sample: collections.Counter[str] = collections.Counter()
+        for server_sample in server_samples:
+            summed_sample.update(server_sample)
+        return dict(summed_sample)
+
+    @classmethod
+    def __GetContainerSample(cls, server_index: int) -> dict[str, typing.Any]:
+        container_id = cls.__RunDockerCompose(
+            "ps", "-q", "db", capture_output=True, server_index=server_index
+        ).strip()
+        if not container_id:
+            return {}
+        cpu_percent, memory_usage = (
+            subprocess.run(
+                [
+                    "docker",
+                    "stats",
+                    "--no-stream",
+                    "--format",
+                    "{{.CPUPerc}};{{.MemUsage}}",
+                    container_id,
+                ],
+                check=True,
+                capture_output=True,
+                text=True,
+            )
+            .stdout.strip()
+            .split(";")
         )
+        return {
+            "container_cpu_percent": float(cpu_percent.rstrip("%")),
+            "container_memory_bytes": ParseMemoryUsage(
+                memory_usage.split("/")[0]
+            ),
+        }
+
+    @classmethod
+    def SetComposeProjectName(cls, compose_project_name: str) -> None:
+        cls.compose_project_name = compose_project_name
+
+    @classmethod
+    def SetupDatabase(cls) -> None:
+        if cls.database_type in EMBEDDED_DATABASE_TYPES:
+            return
+        match cls.server_mode:
+            case ServerMode.COMPOSE:
+                # One compose project per server, shards run side by side
+                for server_index in range(
+                    len(cls.GetDatabaseHandle().GetServerAddresses())
+                ):
+                    cls.__RunDockerCompose("up", "-d", server_index=server_index)
+            case ServerMode.ATTACH:
+                logging.warning(
+                    "Durability settings are not applied to an attached "
+                    f"server: {cls.GetDatabaseHandle().GetServerSettings()}"
+                )
+                # Leftovers of an earlier run would skew the benchmarks
+                cls.GetDatabaseHandle().FlushDatabase()
+            case ServerMode.SPAWN:
+                cls.__SpawnLocalServer()
+
+    @classmethod
+    def TeardownDatabase(cls) -> None:
+        if cls.database_type in EMBEDDED_DATABASE_TYPES:
+            if cls.database_type == DatabaseType.SQLITE:
+                SqliteDatabase.DeleteDatabase()
+            cls.GetDatabaseHandle().Reset()
+            return
+        match cls.server_mode:
+            case ServerMode.COMPOSE:
+                for server_index in range(
+                    len(cls.GetDatabaseHandle().GetServerAddresses())
+                ):
+                    cls.__RunDockerCompose(
+                        "down", "-v", server_index=server_index
+                    )
+            case ServerMode.ATTACH:
+                cls.GetDatabaseHandle().FlushDatabase()
+            case ServerMode.SPAWN:
+                cls.__StopLocalServer()
         cls.GetDatabaseHandle().Reset()
 
+    @classmethod
+    def SetServerAddress(
+        cls, host: str, port: typing.Optional[int] = None
+    ) -> None:
+        cls.GetDatabaseHandle().SetAddress(host, port)
+
     @classmethod
     def ChooseBasedOnDatabaseType(
         cls,
         redis_option: typing.Any,
         postgres_option: typing.Any,
+        sqlite_option: typing.Any = None,
+        numpy_option: typing.Any = None,
+        postgres_jsonb_option: typing.Any = None,
     ) -> typing.Any:
         match cls.database_type:
             case DatabaseType.POSTGRES:
                 return postgres_option
             case DatabaseType.REDIS:
                 return redis_option
+            case DatabaseType.SQLITE if sqlite_option is not None:
+                return sqlite_option
+            case DatabaseType.NUMPY if numpy_option is not None:
+                return numpy_option
+            case DatabaseType.POSTGRES_JSONB if postgres_jsonb_option is not None:
+                return postgres_jsonb_option
             case _:
                 raise ValueError(
                     f"Unsupported database type: {cls.database_type}"
                 )
 
+    @classmethod
+    def ChooseQueryBasedOnDatabaseType(
+        cls,
+        redis_query: typing.Any,
+        orm_query: typing.Any,
+    ) -> typing.Any:
+        # Flat Postgres layouts and JSONB documents mirror the Redis document
+        # and run its queries
+        if (
+            cls.database_type == DatabaseType.POSTGRES
+            and PostgresDatabase.GetLayout() != PostgresLayout.NORMALIZED
+        ):
+            return redis_query
+        return cls.ChooseBasedOnDatabaseType(
+            redis_query,
+            orm_query,
+            sqlite_option=orm_query,
+            numpy_option=redis_query,
+            postgres_jsonb_option=redis_query,
+        )
+
     @classmethod
     def GetDatabaseHandle(cls) -> AbstractDatabase:
         return cls.ChooseBasedOnDatabaseType(
             redis_option=RedisDatabase(),
             postgres_option=PostgresDatabase(),
+            sqlite_option=SqliteDatabase(),
+            numpy_option=NumpyDatabase(),
+            postgres_jsonb_option=PostgresDocumentDatabase(),
         )
 
+    @classmethod
+    def GetBenchmarkDimensions(cls) -> dict[str, typing.Any]:
+        return {
+            "database_type": cls.database_type.value,
+            "read_result_format": cls.read_result_format.value,
+            "synthetic_seed": cls.synthetic_seed,
+            "delete_batch_size": cls.delete_batch_size,
+            **(
+                {
+                    "cache_ttl": cls.cache_ttl,
+                    "cache_write_policy": cls.cache_write_policy.value,
+                }
+                if cls.cache_address is not None
+                else {}
+            ),
+            **cls.GetDatabaseHandle().GetBenchmarkDimensions(),
+        }
+
     @classmethod
     def GetDataLoaderFunction(
         cls,
     ) -> typing.Callable[[AbstractDatabase, pd.DataFrame], None]:
         return cls.ChooseBasedOnDatabaseType(
             redis_option=LoadNycTaxiDataToRedisDatabase,
-            postgres_option=LoadNycTaxiDataToSqlDatabase,
+            postgres_option=LoadNycTaxiDataToPostgresDatabase,
+            sqlite_option=LoadNycTaxiDataToSqlDatabase,
+            numpy_option=LoadNycTaxiDataToNumpyDatabase,
+            postgres_jsonb_option=LoadNycTaxiDataToPostgresJsonbDatabase,
         )
+
+    @classmethod
+    def __RunDockerCompose(
+        cls,
+        *compose_args: str,
+        capture_output: bool = False,
+        server_index: int = 0,
+    ) -> str:
+        compose_command = ["docker", "compose", "-f", cls.docker_compose_file]
+        if server_index:
+            compose_command += [
+                "-p",
+                f"{cls.compose_project_name or cls.GetServerType().value}"
+                f"_shard{server_index}",
+            ]
+        elif cls.compose_project_name:
+            compose_command += ["-p", cls.compose_project_name]
+        # compose.yml publishes the port given by <DATABASE>_PORT and passes
+        # the server settings given by <DATABASE>_<SETTING>
+        environment_prefix = cls.GetServerType().value.upper()
+        _, port = cls.GetDatabaseHandle().GetServerAddresses()[server_index]
+        compose_result = subprocess.run(
+            compose_command + list(compose_args),
+            check=True,
+            capture_output=capture_output,
+            text=True,
+            env={
+                **os.environ,
+                f"{environment_prefix}_PORT": str(port),
+                **{
+                    f"{environment_prefix}_{setting.upper()}": value
+                    for setting, value in cls.GetDatabaseHandle()
+                    .GetServerSettings()
+                    .items()
+                },
+            },
+        )
+        return compose_result.stdout or ""
+
+    @classmethod
+    def __SpawnLocalServer(cls) -> None:
+        cls.local_server_directory = tempfile.mkdtemp(
+            prefix=f"benchmark_{cls.database_type.value}_"
+        )
+        # Sharded databases get one server process per shard
+        for server_index, (host, port) in enumerate(
+            cls.GetDatabaseHandle().GetServerAddresses()
+        ):
+            server_directory = os.path.join(
+                cls.local_server_directory, f"server{server_index}"
+            )
+            os.makedirs(server_directory)
+            server_command = cls.__BuildLocalServerCommand(
+                host, port, server_directory
+            )
+            server_log_path = os.path.join(server_directory, "server.log")
+            logging.info(
+                f"Spawning {server_command[0]} on {host}:{port}, log in {server_log_path}"
+            )
+            with open(server_log_path, "wb") as server_log:
+                cls.local_servers.append(
+                    subprocess.Popen(
+                        server_command,
+                        stdout=server_log,
+                        stderr=subprocess.STDOUT,
+                    )
+                )
+
+    @classmethod
+    def __BuildLocalServerCommand(
+        cls, host: str, port: int, server_directory: str
+    ) -> list[str]:
+        server_settings = cls.GetDatabaseHandle().GetServerSettings()
+        match cls.GetServerType():
+            case DatabaseType.REDIS:
+                return [
+                    "redis-server",
+                    "--bind",
+                    host,
+                    "--port",
+                    str(port),
+                    "--dir",
+                    server_directory,
+                    *(
+                        argument
+                        for setting, value in server_settings.items()
+                        for argument in (f"--{setting}", value)
+                    ),
+                ]
+            case DatabaseType.POSTGRES:
+                database_username, _, database_name = (
+                    PostgresDatabase.GetCredentials()
+                )
+                data_directory = os.path.join(server_directory, "data")
+                subprocess.run(
+                    [
+                        "initdb",
+                        "-D",
+                        data_directory,
+                        "-U",
+                        database_username,
+                        "--auth=trust",
+                    ],
+                    check=True,
+                    stdout=subprocess.DEVNULL,
+                )
+                subprocess.run(
+                    ["postgres", "--single", "-D", data_directory, "postgres"],
+                    input=f"CREATE DATABASE {database_name};\n".encode(),
+                    check=True,
+                    stdout=subprocess.DEVNULL,
+                )
+                return [
+                    "postgres",
+                    "-D",
+                    data_directory,
+                    "-p",
+                    str(port),
+                    "-c",
+                    f"listen_addresses={host}",
+                    "-c",
+                    "shared_preload_libraries=pg_stat_statements",
+                    *(
+                        argument
+                        for setting, value in server_settings.items()
+                        for argument in ("-c", f"{setting}={value}")
+                    ),
+                    "-k",
+                    server_directory,
+                ]
+            case _:
+                raise ValueError(
+                    f"Unsupported database type: {cls.database_type}"
+                )
+
+    @classmethod
+    def __StopLocalServer(cls) -> None:
+        for local_server in cls.local_servers:
+            local_server.terminate()
+        for local_server in cls.local_servers:
+            try:
+                local_server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                local_server.kill()
+                local_server.wait()
+        cls.local_servers = []
+        if cls.local_server_directory:
+            shutil.rmtree(cls.local_server_directory, ignore_errors=True)
+            cls.local_server_directory = ""
@@ -1,12 +1,79 @@
+import enum
+import logging
+import os
+import time
 import typing
 from abc import ABC
 
 
+def WaitForDatabaseReady(
+    database_name: str,
+    probe: typing.Callable[[], typing.Any],
+    timeout_seconds: float = 30.0,
+    initial_delay: float = 0.01,
+    max_delay: float = 0.5,
+) -> None:
+    # Poll with exponential backoff so an already running server is detected
+    # within milliseconds instead of a fixed one second sleep
+    deadline = time.monotonic() + timeout_seconds
+    delay = initial_delay
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            probe()
+            logging.debug(
+                f"{database_name} database is ready after {attempt} attempts."
+            )
+            return
+        except Exception:
+            if time.monotonic() + delay > deadline:
+                raise
+            logging.debug(
+                f"Waiting for {database_name} database to be ready...{attempt}"
+            )
+            time.sleep(delay)
+            delay = min(delay * 2, max_delay)
+
+
+class CacheState(enum.StrEnum):
+    COLD = enum.auto()
+    WARM = enum.auto()
+
+
+def DropOperatingSystemCaches() -> None:
+    # Needs root on the host running the server, otherwise only the
+    # database's own caches are evicted
+    try:
+        os.sync()
+        with open("/proc/sys/vm/drop_caches", "w") as drop_caches:
+            drop_caches.write("3\n")
+    except OSError as e:
+        logging.debug(f"Operating system caches were not dropped: {e}")
+
+
 class AbstractDatabase(ABC):
     @classmethod
     def GetDatabaseEngine(cls) -> typing.Any:
         raise NotImplementedError()
 
+    @classmethod
+    def SetAddress(cls, host: str, port: typing.Optional[int] = None) -> None:
+        raise NotImplementedError()
+
+    @classmethod
+    def GetAddress(cls) -> tuple[str, int]:
+        raise NotImplementedError()
+
+    @classmethod
+    def GetServerAddresses(cls) -> list[tuple[str, int]]:
+        # Every server the database runs on, sharded databases run several
+        return [cls.GetAddress()]
+
+    @classmethod
+    def GetShardEngines(cls) -> list[typing.Any]:
+        return [cls.GetDatabaseEngine()]
+
     @classmethod
     def FlushDatabase(cls) -> None:
         raise NotImplementedError()
@@ -14,3 +81,42 @@ class AbstractDatabase(ABC):
     @classmethod
     def Reset(cls) -> None:
         raise NotImplementedError()
+
+    @classmethod
+    def GetStorageFootprint(cls) -> dict[str, typing.Any]:
+        raise NotImplementedError()
+
+    @classmethod
+    def GetBenchmarkDimensions(cls) -> dict[str, typing.Any]:
+        return {}
+
+    @classmethod
+    def GetResourceSample(cls) -> dict[str, typing.Any]:
+        return {}
+
+    @classmethod
+    def GetServerSettings(cls) -> dict[str, str]:
+        # Configuration the server is started with, by compose or spawn
+        return {}
+
+    @classmethod
+    def EvictCaches(cls) -> None:
+        pass
+
+    @classmethod
+    def PrewarmCaches(cls) -> None:
+        pass
+
+    @classmethod
+    def PrepareForLoad(cls) -> None:
+        pass
+
+    @classmethod
+    def FinishLoad(cls) -> None:
+        pass
+
+    @classmethod
+    def GetServerExecutionSeconds(cls) -> typing.Optional[float]:
+        # Cumulative execution time reported by the server, None when the
+        # engine does not report it
+        return None
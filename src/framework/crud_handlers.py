@@ -1,82 +1,608 @@
 import contextlib
+import copy
+import enum
+import hashlib
+import heapq
+import io
 import json
 import logging
+import math
 import typing
 from abc import ABC
+from concurrent.futures import Executor
+from datetime import datetime
 
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.json
 from redis.commands.json.path import Path
+from redis.commands.search.aggregation import AggregateRequest, AggregateResult
 from redis.commands.search.document import Document
 from redis.commands.search.query import Query
-from sqlalchemy import Delete, Engine, Result, Update, insert
-from sqlalchemy.orm import Session
+from sqlalchemy import (
+    Column,
+    Delete,
+    Engine,
+    Executable,
+    Result,
+    Select,
+    Table,
+    Update,
+    cast,
+    delete,
+    func,
+    insert,
+    inspect,
+    literal,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.dialects.postgresql import JSONB, array
+from sqlalchemy.orm import MANYTOONE, Mapper, Session, aliased
+from sqlalchemy.sql.util import find_tables
 from sqlalchemy.sql.selectable import TypedReturnsRows
 
 from redis import Redis
 
-from .models import BaseOrmType
+from .models import TRIP_FLAT_VIEW_SOURCES, BaseOrmType, Trip
+from .numpy_database import ColumnarTable
+from .phase_profiler import PhaseProfiler, ProfiledOperation
+from .postgres_document_database import (
+    GetDocumentField,
+    GetDocumentFieldKey,
+    TripDocument,
+)
+from .query_translation import (
+    BuildShardAggregateArguments,
+    CompileNumpyMask,
+    CompileSqlAggregate,
+    CompileSqlPredicate,
+    EvaluateNumpyAggregate,
+    GetRedisQuerySortBy,
+    MergeShardAggregateRows,
+    ParseRedisAggregateRequest,
+    ParseRedisQuery,
+)
+from .redis_database import GetKeyShard, RedisStorageModel
+from .tracing import TraceEvent, TracedOperation, Tracer
 
 
 class AbstractCRUDHandler(ABC):
     pass
 
 
+class ReadResultFormat(enum.StrEnum):
+    ROWS = enum.auto()
+    DATAFRAME = enum.auto()
+    ARROW = enum.auto()
+
+
+ColumnarResult = pd.DataFrame | pa.Table
+
+
+def BuildColumnarResult(
+    column_names: list[str],
+    rows: typing.Sequence[typing.Sequence[typing.Any]],
+    result_format: ReadResultFormat,
+) -> ColumnarResult:
+    # Driver rows are transposed straight into columns, no dict per row
+    if result_format == ReadResultFormat.DATAFRAME:
+        return pd.DataFrame.from_records(rows, columns=column_names)
+    columns = list(zip(*rows)) or [() for _ in column_names]
+    return pa.table(
+        {
+            column_name: pa.array(column)
+            for column_name, column in zip(column_names, columns)
+        }
+    )
+
+
+def BuildColumnarResultFromColumns(
+    columns: dict[str, list[typing.Any]],
+    result_format: ReadResultFormat,
+) -> ColumnarResult:
+    if result_format == ReadResultFormat.DATAFRAME:
+        return pd.DataFrame(columns)
+    return pa.table(
+        {
+            column_name: pa.array(column)
+            for column_name, column in columns.items()
+        }
+    )
+
+
+def _GetRelatedColumns(
+    entity: typing.Any, mapper: Mapper[typing.Any], prefix: str
+) -> tuple[list[typing.Any], list[typing.Any]]:
+    related_joins: list[typing.Any] = []
+    related_columns: list[typing.Any] = []
+    for relationship in mapper.relationships:
+        if relationship.direction is not MANYTOONE:
+            continue
+        # Columns are named by their path in the serialized row, the aliases
+        # keep apart from tables the query joins itself
+        related_prefix = f"{prefix}{relationship.key}."
+        related_entity = aliased(
+            relationship.mapper,
+            name="related_" + related_prefix.rstrip(".").replace(".", "_"),
+        )
+        related_joins.append(
+            getattr(entity, relationship.key).of_type(related_entity)
+        )
+        related_columns += [
+            getattr(related_entity, column_property.key).label(
+                f"{related_prefix}{column_property.key}"
+            )
+            for column_property in relationship.mapper.column_attrs
+        ]
+        nested_joins, nested_columns = _GetRelatedColumns(
+            related_entity, relationship.mapper, related_prefix
+        )
+        related_joins += nested_joins
+        related_columns += nested_columns
+    return related_joins, related_columns
+
+
+def ExpandRelatedColumns(query: typing.Any) -> typing.Any:
+    # Row reads serialize the parents of every entity, the columnar result
+    # selects the same parents through outer joins, one prefixed column each
+    if not isinstance(query, Select):
+        return query
+    for column_description in query.column_descriptions:
+        entity = column_description["entity"]
+        if entity is None or column_description["expr"] is not entity:
+            continue
+        related_joins, related_columns = _GetRelatedColumns(
+            entity, inspect(entity), ""
+        )
+        for related_join in related_joins:
+            query = query.outerjoin(related_join)
+        query = query.add_columns(*related_columns)
+    return query
+
+
 ORM_TABLE_TYPE = typing.TypeVar("ORM_TABLE_TYPE", bound=BaseOrmType)
 
+# Ids bound per IN list, below the SQLite limit of 32766 parameters
+DELETE_ID_SLICE_SIZE = 10000
+
+
+def GetOwnedReferences(table: Table) -> list[tuple[Column[typing.Any], Table]]:
+    # Parent rows referenced with ON DELETE CASCADE belong to the child row
+    return sorted(
+        (
+            (foreign_key.parent, foreign_key.column.table)
+            for foreign_key in table.foreign_keys
+            if foreign_key.ondelete == "CASCADE"
+        ),
+        key=lambda reference: reference[0].name,
+    )
+
+
+def GetDependentReferences(
+    table: Table,
+) -> list[tuple[Table, Column[typing.Any]]]:
+    return sorted(
+        (
+            (dependent_table, foreign_key.parent)
+            for dependent_table in table.metadata.tables.values()
+            for foreign_key in dependent_table.foreign_keys
+            # Statements hold an annotated copy of the table, references()
+            # compares the underlying table
+            if foreign_key.ondelete == "CASCADE"
+            and foreign_key.references(table)
+        ),
+        key=lambda reference: (reference[0].name, reference[1].name),
+    )
+
+
+def EncodeRedisHashValue(value: typing.Any) -> typing.Optional[str]:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def EncodeRedisHashEntry(entry: dict[str, typing.Any]) -> dict[str, str]:
+    encoded_entry: dict[str, str] = {}
+    for field, value in entry.items():
+        encoded_value = EncodeRedisHashValue(value)
+        if encoded_value is not None:
+            encoded_entry[field] = encoded_value
+    return encoded_entry
+
 
 class RedisCRUDHandler(AbstractCRUDHandler):
-    def __init__(self, db_engine: Redis):
-        self.db_engine = db_engine
+    def __init__(
+        self,
+        db_engine: Redis | list[Redis],
+        storage_model: RedisStorageModel = RedisStorageModel.JSON,
+        result_format: ReadResultFormat = ReadResultFormat.ROWS,
+        shard_executor: typing.Optional[Executor] = None,
+    ):
+        # A list of engines spreads the trip keys over them by key hash,
+        # every shard holds its own search index
+        self.shard_engines = (
+            db_engine if isinstance(db_engine, list) else [db_engine]
+        )
+        self.db_engine = self.shard_engines[0]
+        self.storage_model = storage_model
+        self.result_format = result_format
+        # The executor is owned by the caller, handlers are created per test
+        self.shard_executor = shard_executor
+
+    def _map_shards(
+        self, shard_function: typing.Callable[[int, Redis], typing.Any]
+    ) -> list[typing.Any]:
+        # Shards are queried in parallel when an executor is given
+        if self.shard_executor is None:
+            return [
+                shard_function(shard_index, shard_engine)
+                for shard_index, shard_engine in enumerate(self.shard_engines)
+            ]
+        return list(
+            self.shard_executor.map(
+                shard_function,
+                range(len(self.shard_engines)),
+                self.shard_engines,
+            )
+        )
+
+    def _get_shard_index(self, entry_id: str) -> int:
+        return GetKeyShard(entry_id, len(self.shard_engines))
+
+    def _write_entry(
+        self, client: typing.Any, entry_id: str, entry: dict[str, typing.Any]
+    ) -> None:
+        match self.storage_model:
+            case RedisStorageModel.JSON:
+                client.json().set(entry_id, Path.root_path(), entry)
+            case RedisStorageModel.HASH:
+                client.hset(entry_id, mapping=EncodeRedisHashEntry(entry))
+
+    def _write_entries(
+        self,
+        entries: typing.Iterable[tuple[str, typing.Any]],
+        write_function: typing.Callable[[typing.Any, str, typing.Any], None],
+    ) -> None:
+        if len(self.shard_engines) == 1:
+            # A single instance keeps one round trip per write, so runs
+            # without shards measure the same writes as before sharding
+            with PhaseProfiler.Phase("wire"):
+                for entry_id, entry in entries:
+                    write_function(self.db_engine, entry_id, entry)
+            return
+        # One pipeline per shard, so each server gets a single round trip
+        shard_entries: list[list[tuple[str, typing.Any]]] = [
+            [] for _ in self.shard_engines
+        ]
+        for entry_id, entry in entries:
+            shard_entries[self._get_shard_index(entry_id)].append(
+                (entry_id, entry)
+            )
+
+        def WriteShard(shard_index: int, shard_engine: Redis) -> None:
+            grouped_entries = shard_entries[shard_index]
+            if not grouped_entries:
+                return
+            shard_pipeline = shard_engine.pipeline(transaction=False)
+            for entry_id, entry in grouped_entries:
+                write_function(shard_pipeline, entry_id, entry)
+            shard_pipeline.execute()
+
+        with PhaseProfiler.Phase("wire"):
+            self._map_shards(WriteShard)
 
     def create(self, entry_id: str, entry: dict[str, typing.Any]) -> None:
-        self.db_engine.json().set(entry_id, Path.root_path(), entry)
+        self._write_entry(
+            self.shard_engines[self._get_shard_index(entry_id)],
+            entry_id,
+            entry,
+        )
 
-    def read(
-        self, indexed_query: tuple[str, Query]
-    ) -> dict[str, dict[str, typing.Any]]:
-        index_name, query = indexed_query
-        logging.debug(f"Executing Redis query: {query.query_string()}")
-        max_results = int(self.db_engine.ft(index_name).search(query).total)  # type: ignore
+    def create_many(
+        self, entries: typing.Iterable[tuple[str, dict[str, typing.Any]]]
+    ) -> None:
+        self._write_entries(entries, self._write_entry)
 
+    def _search_shard(
+        self, shard_engine: Redis, index_name: str, query: Query
+    ) -> tuple[int, list[Document]]:
+        max_results = int(shard_engine.ft(index_name).search(query).total)  # type: ignore
+        # paging() sets the limit in place, every shard pages its own copy
+        paged_query = copy.copy(query).paging(0, max_results)
+        # The reply is parsed into Documents by redis-py, so wire time also
+        # covers RESP parsing
         found_entries: list[Document] = (  # type: ignore
-            self.db_engine.ft(index_name)
-            .search(query.paging(0, max_results))
-            .docs  # type: ignore
+            shard_engine.ft(index_name).search(paged_query).docs  # type: ignore
         )
-        logging.info(f"Found {max_results} entries matching the query.")
+        return max_results, found_entries
+
+    def _get_sort_key(
+        self, field: str, ascending: bool
+    ) -> typing.Callable[[Document], typing.Any]:
+        document_key = GetDocumentFieldKey(field)
+
+        def SortKey(document: Document) -> typing.Any:
+            # Documents without the field go last, as in a Redis SORTBY
+            value = self._decode_document(document).get(document_key)
+            if value is None:
+                return math.inf if ascending else -math.inf
+            return float(value)
+
+        return SortKey
+
+    def _search_documents(
+        self, indexed_query: tuple[str, Query]
+    ) -> list[Document]:
+        index_name, query = indexed_query
+        with PhaseProfiler.Phase("wire"):
+            shard_results = self._map_shards(
+                lambda _, shard_engine: self._search_shard(
+                    shard_engine, index_name, query
+                )
+            )
+        max_results = sum(shard_total for shard_total, _ in shard_results)
+        sort_by = GetRedisQuerySortBy(query)
+        if len(shard_results) == 1:
+            found_entries = shard_results[0][1]
+        elif sort_by is None:
+            found_entries = [
+                document
+                for _, shard_entries in shard_results
+                for document in shard_entries
+            ]
+        else:
+            # Every shard returns its matches sorted, a k-way merge keeps
+            # the order without sorting them again
+            field, ascending = sort_by
+            with PhaseProfiler.Phase("merge"):
+                found_entries = list(
+                    heapq.merge(
+                        *(shard_entries for _, shard_entries in shard_results),
+                        key=self._get_sort_key(field, ascending),
+                        reverse=not ascending,
+                    )
+                )
+        Tracer.Emit(TraceEvent.ROWS, operation="search", rows=max_results)
+        return found_entries
 
-        dict_entries: dict[str, dict[str, typing.Any]] = {}
-        for document in found_entries:  # type: ignore
-            doc_json: dict[str, typing.Any] = json.loads(document.json)  # type: ignore
-            dict_entries[document.id] = doc_json  # type: ignore
-        logging.debug(f"Redis read query result: {dict_entries}")
+    def _decode_rows(
+        self, found_entries: list[Document]
+    ) -> dict[str, dict[str, typing.Any]]:
+        with PhaseProfiler.Phase("decode"):
+            decoded_entries = [
+                self._decode_document(document) for document in found_entries
+            ]
+        with PhaseProfiler.Phase("conversion"):
+            dict_entries: dict[str, dict[str, typing.Any]] = {
+                document.id: decoded_entry  # type: ignore
+                for document, decoded_entry in zip(
+                    found_entries, decoded_entries
+                )
+            }
         return dict_entries
 
+    def _decode_columns(self, found_entries: list[Document]) -> pa.Table:
+        match self.storage_model:
+            case RedisStorageModel.JSON if found_entries:
+                # Arrow parses the documents as one NDJSON buffer in C
+                encoded_entries = "\n".join(
+                    document.json for document in found_entries  # type: ignore
+                ).encode()
+                found_table = pyarrow.json.read_json(
+                    io.BytesIO(encoded_entries),
+                    read_options=pyarrow.json.ReadOptions(
+                        block_size=len(encoded_entries)
+                    ),
+                )
+            case RedisStorageModel.HASH if found_entries:
+                field_names = dict.fromkeys(
+                    field
+                    for document in found_entries
+                    for field in vars(document)
+                    if field not in ("id", "payload")
+                )
+                found_table = pa.table(
+                    {
+                        field: self._decode_hash_column(
+                            [
+                                getattr(document, field, None)
+                                for document in found_entries
+                            ]
+                        )
+                        for field in field_names
+                    }
+                )
+            case _:
+                found_table = pa.table({})
+        return found_table.add_column(
+            0,
+            "id",
+            pa.array(
+                [document.id for document in found_entries], pa.string()  # type: ignore
+            ),
+        )
+
+    def _decode_hash_column(self, values: list[typing.Any]) -> pa.Array:
+        # HASH fields come back as strings, numeric ones are cast back
+        string_column = pa.array(values, pa.string())
+        try:
+            return string_column.cast(pa.float64())
+        except pa.ArrowInvalid:
+            return string_column
+
+    @TracedOperation
+    @ProfiledOperation
+    def read(
+        self, indexed_query: tuple[str, Query]
+    ) -> dict[str, dict[str, typing.Any]] | ColumnarResult:
+        found_entries = self._search_documents(indexed_query)
+        if Tracer.IsEnabled() and self.storage_model == RedisStorageModel.JSON:
+            Tracer.Emit(
+                TraceEvent.BYTES,
+                operation="read",
+                bytes=sum(len(document.json) for document in found_entries),  # type: ignore
+            )
+        if self.result_format == ReadResultFormat.ROWS:
+            return self._decode_rows(found_entries)
+        with PhaseProfiler.Phase("decode"):
+            found_table = self._decode_columns(found_entries)
+        if self.result_format == ReadResultFormat.ARROW:
+            return found_table
+        with PhaseProfiler.Phase("conversion"):
+            return found_table.to_pandas()
+
+    @TracedOperation
+    @ProfiledOperation
     def update(
         self,
         indexed_query: tuple[str, Query],
         values: dict[typing.Any, typing.Any],
     ) -> typing.Optional[int]:
-        query_results = self.read(indexed_query)
-        for entry_id, entry in query_results.items():
-            for field, value in values.items():
-                entry[field] = value
-            logging.debug(f"Updating entry ID {entry_id} with values {entry}")
-            self.db_engine.json().set(entry_id, Path.root_path(), entry)
-        logging.info(f"Updated {len(query_results)} entries.")
+        query_results = self._decode_rows(self._search_documents(indexed_query))
+        if self.storage_model == RedisStorageModel.HASH:
+            # Only the changed fields are written to a hash
+            self._write_entries(
+                ((entry_id, values) for entry_id in query_results),
+                self._write_entry,
+            )
+        else:
+            for entry in query_results.values():
+                entry.update(values)
+            self._write_entries(query_results.items(), self._write_entry)
+        Tracer.Emit(TraceEvent.ROWS, operation="update", rows=len(query_results))
         return len(query_results)
 
+    @TracedOperation
+    @ProfiledOperation
     def delete(self, indexed_query: tuple[str, Query]) -> None:
-        query_results = self.read(indexed_query)
-        if not query_results:
+        # Only the keys are needed, the documents are not decoded
+        found_entries = self._search_documents(indexed_query)
+        if not found_entries:
             logging.warning("No matching records found to delete.")
-        for entry_id in query_results.keys():
-            self.db_engine.json().delete(entry_id)
-        logging.info(f"Deleted {len(query_results)} entries.")
+
+        def DeleteEntry(
+            client: typing.Any, entry_id: str, _: typing.Any
+        ) -> None:
+            match self.storage_model:
+                case RedisStorageModel.JSON:
+                    client.json().delete(entry_id)
+                case RedisStorageModel.HASH:
+                    client.delete(entry_id)
+
+        self._write_entries(
+            ((document.id, None) for document in found_entries),  # type: ignore
+            DeleteEntry,
+        )
+        Tracer.Emit(TraceEvent.ROWS, operation="delete", rows=len(found_entries))
+
+    @TracedOperation
+    @ProfiledOperation
+    def aggregate(
+        self, indexed_aggregation: tuple[str, AggregateRequest]
+    ) -> list[dict[str, typing.Any]]:
+        if len(self.shard_engines) > 1:
+            return self._aggregate_shards(indexed_aggregation)
+        index_name, aggregate_request = indexed_aggregation
+        with PhaseProfiler.Phase("wire"):
+            aggregate_result: AggregateResult = self.db_engine.ft(  # type: ignore
+                index_name
+            ).aggregate(aggregate_request)
+        with PhaseProfiler.Phase("conversion"):
+            aggregated_rows = [
+                dict(zip(row[::2], row[1::2])) for row in aggregate_result.rows
+            ]
+        Tracer.Emit(
+            TraceEvent.ROWS, operation="aggregate", rows=len(aggregated_rows)
+        )
+        return aggregated_rows
+
+    def _aggregate_shards(
+        self, indexed_aggregation: tuple[str, AggregateRequest]
+    ) -> list[dict[str, typing.Any]]:
+        # Every shard groups its own trips, the partial groups are merged,
+        # sorted and limited on the client
+        index_name, aggregate_request = indexed_aggregation
+        with PhaseProfiler.Phase("query_build"):
+            pipeline = ParseRedisAggregateRequest(aggregate_request)
+            shard_arguments = BuildShardAggregateArguments(
+                aggregate_request, pipeline
+            )
+        with PhaseProfiler.Phase("wire"):
+            shard_replies = self._map_shards(
+                lambda _, shard_engine: shard_engine.execute_command(
+                    "FT.AGGREGATE", index_name, *shard_arguments
+                )
+            )
+        with PhaseProfiler.Phase("merge"):
+            aggregated_rows = MergeShardAggregateRows(
+                pipeline,
+                (
+                    dict(zip(row[::2], row[1::2]))
+                    for shard_reply in shard_replies
+                    # The reply starts with the number of groups
+                    for row in shard_reply[1:]
+                ),
+            )
+        Tracer.Emit(
+            TraceEvent.ROWS, operation="aggregate", rows=len(aggregated_rows)
+        )
+        return aggregated_rows
+
+    def _decode_document(self, document: Document) -> dict[str, typing.Any]:
+        match self.storage_model:
+            case RedisStorageModel.JSON:
+                return json.loads(document.json)  # type: ignore
+            case RedisStorageModel.HASH:
+                return {
+                    field: value
+                    for field, value in vars(document).items()
+                    if field not in ("id", "payload")
+                }
+
+    def explain(
+        self,
+        indexed_query: tuple[str, Query],
+        values: typing.Optional[dict[typing.Any, typing.Any]] = None,
+        for_delete: bool = False,
+    ) -> typing.Any:
+        # Updates and deletes are driven by the same search, values do not
+        # change the plan
+        index_name, query = indexed_query
+        if isinstance(query, AggregateRequest):
+            logging.debug(f"Profiling Redis aggregation: {query.build_args()}")
+            profile_args = ["AGGREGATE", "QUERY", *query.build_args()]
+        else:
+            logging.debug(f"Profiling Redis query: {query.query_string()}")
+            profile_args = ["SEARCH", "QUERY", *query.get_args()]
+        # Sharded searches run on every shard, each one has its own plan
+        shard_profiles = self._map_shards(
+            lambda _, shard_engine: shard_engine.execute_command(
+                "FT.PROFILE", index_name, *profile_args
+            )
+        )
+        return shard_profiles[0] if len(shard_profiles) == 1 else shard_profiles
 
 
 class OrmCRUDHandler(AbstractCRUDHandler):
-    def __init__(self, db_engine: Engine):
+    EXPLAIN_PREFIXES: dict[str, str] = {
+        "postgresql": "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)",
+        "sqlite": "EXPLAIN QUERY PLAN",
+    }
+
+    def __init__(
+        self,
+        db_engine: Engine,
+        result_format: ReadResultFormat = ReadResultFormat.ROWS,
+        delete_batch_size: typing.Optional[int] = None,
+    ):
         self.db_engine = db_engine
+        self.result_format = result_format
+        self.delete_batch_size = delete_batch_size
 
     @contextlib.contextmanager
     def _establish_session(self):
@@ -86,54 +612,905 @@ class OrmCRUDHandler(AbstractCRUDHandler):
 
     def create(
         self,
-        orm_type: typing.Type[ORM_TABLE_TYPE],
+        orm_type: typing.Type[ORM_TABLE_TYPE] | Table,
         *orm_entries: dict[str, typing.Any],
     ) -> list[int]:
+        # Plain tables take columns the mapped class does not have
+        table: Table = (
+            orm_type if isinstance(orm_type, Table) else orm_type.__table__  # type: ignore
+        )
         with self._establish_session() as session:
-            logging.debug(
-                f"Creating {len(orm_entries)} entries of type {orm_type.__name__}."
-            )
             query_result = session.execute(
-                insert(orm_type).returning(orm_type.id), orm_entries
+                insert(orm_type).returning(table.c.id), orm_entries
             )
             inserted_ids = [row[0] for row in query_result]
-        logging.debug(f"Inserted records with ids: {inserted_ids}")
+        Tracer.Emit(
+            TraceEvent.ROWS,
+            operation="create",
+            table=table.name,
+            rows=len(inserted_ids),
+        )
         return inserted_ids
 
+    def _read_columns(self, query: Executable) -> ColumnarResult:
+        # A Core connection returns the mapped table columns as plain rows,
+        # no ORM entities are hydrated into the identity map
+        with PhaseProfiler.Phase("query_build"):
+            columns_query = ExpandRelatedColumns(query)
+        with self.db_engine.connect() as connection:
+            with PhaseProfiler.Phase("wire"):
+                query_result = connection.execute(columns_query)
+            with PhaseProfiler.Phase("hydrate"):
+                column_names = list(query_result.keys())
+                found_rows = query_result.fetchall()
+        Tracer.Emit(TraceEvent.ROWS, operation="read", rows=len(found_rows))
+        with PhaseProfiler.Phase("conversion"):
+            return BuildColumnarResult(
+                column_names, found_rows, self.result_format
+            )
+
+    @TracedOperation
+    @ProfiledOperation
     def read(
         self, query: TypedReturnsRows[typing.Tuple[ORM_TABLE_TYPE]]
-    ) -> list[dict[str, typing.Any] | str]:
-        logging.debug(f"Executing ORM read query: {query}")
+    ) -> list[dict[str, typing.Any] | str] | ColumnarResult:
+        if self.result_format != ReadResultFormat.ROWS:
+            return self._read_columns(query)
         with self._establish_session() as session:
-            found_entries = session.scalars(query).all()
-            converted_entries = [
-                entry.to_dict() if hasattr(entry, "to_dict") else str(entry)
-                for entry in found_entries
-            ]
-            logging.info(
-                f"Found {len(found_entries)} entries matching the query."
+            # psycopg2 buffers the whole result on execute, drivers fetching
+            # lazily (SQLite) move part of the wire time into hydration
+            with PhaseProfiler.Phase("wire"):
+                scalar_result = session.scalars(query)
+            with PhaseProfiler.Phase("hydrate"):
+                found_entries = scalar_result.all()
+            with PhaseProfiler.Phase("conversion"):
+                converted_entries = [
+                    entry.to_dict() if hasattr(entry, "to_dict") else str(entry)
+                    for entry in found_entries
+                ]
+            Tracer.Emit(
+                TraceEvent.ROWS, operation="read", rows=len(found_entries)
             )
-            logging.debug(f"ORM read query result: {converted_entries}")
         return converted_entries
 
+    @TracedOperation
+    @ProfiledOperation
     def update(
         self,
         query: Update,
         values: dict[typing.Any, typing.Any],
     ) -> Result[typing.Any]:
-        logging.debug(
-            f"Executing ORM update query: {query} with values {values}."
-        )
         with self._establish_session() as session:
-            update_result = session.execute(query.values(**values))
-        logging.info(f"Updated {update_result.rowcount} entries.")
+            with PhaseProfiler.Phase("wire"):
+                update_result = session.execute(query.values(**values))
+        Tracer.Emit(
+            TraceEvent.ROWS, operation="update", rows=update_result.rowcount
+        )
         return update_result
 
-    def delete(self, query: Delete) -> Result[typing.Any]:
-        logging.debug(f"Executing ORM delete query: {query}.")
+    def _delete_rows(
+        self,
+        session: Session,
+        table: Table,
+        row_ids: list[typing.Any],
+        delete_dependents: bool = True,
+    ) -> int:
+        deleted_rows = 0
+        owned_references = GetOwnedReferences(table)
+        for slice_start in range(0, len(row_ids), DELETE_ID_SLICE_SIZE):
+            id_slice = row_ids[slice_start : slice_start + DELETE_ID_SLICE_SIZE]
+            if delete_dependents:
+                # Dependents go first, the database cascade would orphan the
+                # rows they own
+                for dependent_table, dependent_column in GetDependentReferences(
+                    table
+                ):
+                    dependent_ids = session.scalars(
+                        select(dependent_table.c.id).where(
+                            dependent_column.in_(id_slice)
+                        )
+                    ).all()
+                    self._delete_rows(
+                        session, dependent_table, list(dependent_ids)
+                    )
+            delete_query = delete(table).where(table.c.id.in_(id_slice))
+            if not owned_references:
+                deleted_rows += session.execute(delete_query).rowcount  # type: ignore
+                continue
+            owned_rows = session.execute(
+                delete_query.returning(
+                    *(column for column, _ in owned_references)
+                )
+            ).all()
+            deleted_rows += len(owned_rows)
+            for position, (_, owned_table) in enumerate(owned_references):
+                self._delete_rows(
+                    session,
+                    owned_table,
+                    [row[position] for row in owned_rows if row[position] is not None],
+                    delete_dependents=False,
+                )
+        return deleted_rows
+
+    @TracedOperation
+    @ProfiledOperation
+    def delete(self, query: Delete) -> int:
+        # Without a batch size one statement removes the matching rows and
+        # the ON DELETE CASCADE foreign keys remove their dependents
+        if self.delete_batch_size is None:
+            with self._establish_session() as session:
+                with PhaseProfiler.Phase("wire"):
+                    deleted_rows = session.execute(query).rowcount  # type: ignore
+        else:
+            deleted_rows = self._delete_batches(query, self.delete_batch_size)
+        if not deleted_rows:
+            logging.warning("No matching records found to delete.")
+        Tracer.Emit(TraceEvent.ROWS, operation="delete", rows=deleted_rows)
+        return deleted_rows
+
+    def _delete_batches(self, query: Delete, batch_size: int) -> int:
+        # Matching rows are removed with the rows they own, in transactions
+        # of at most batch_size rows
+        table: Table = query.table  # type: ignore
+        id_query = select(table.c.id).limit(batch_size)
+        if query.whereclause is not None:
+            id_query = id_query.where(query.whereclause)
+        deleted_rows = 0
+        while True:
+            with self._establish_session() as session:
+                with PhaseProfiler.Phase("wire"):
+                    batch_ids = list(session.scalars(id_query).all())
+                    self._delete_rows(session, table, batch_ids)
+            deleted_rows += len(batch_ids)
+            if len(batch_ids) < batch_size:
+                return deleted_rows
+
+    @TracedOperation
+    @ProfiledOperation
+    def aggregate(
+        self, query: Select[typing.Any]
+    ) -> list[dict[str, typing.Any]]:
+        with self._establish_session() as session:
+            with PhaseProfiler.Phase("wire"):
+                aggregate_result = session.execute(query).mappings()
+            with PhaseProfiler.Phase("conversion"):
+                aggregated_rows = [dict(row) for row in aggregate_result]
+        Tracer.Emit(
+            TraceEvent.ROWS, operation="aggregate", rows=len(aggregated_rows)
+        )
+        return aggregated_rows
+
+    def explain(
+        self,
+        query: Executable,
+        values: typing.Optional[dict[typing.Any, typing.Any]] = None,
+        for_delete: bool = False,
+    ) -> typing.Any:
+        if values is not None:
+            query = query.values(**values)  # type: ignore
+        explain_prefix = self.EXPLAIN_PREFIXES[self.db_engine.dialect.name]
+        compiled_query = query.compile(
+            self.db_engine, compile_kwargs={"literal_binds": True}
+        )
+        logging.debug(f"Explaining ORM query: {compiled_query}")
+        with self.db_engine.connect() as connection:
+            # EXPLAIN ANALYZE executes the statement, so DML must not persist
+            transaction = connection.begin()
+            try:
+                explain_result = connection.execution_options(
+                    no_parameters=True
+                ).exec_driver_sql(f"{explain_prefix} {compiled_query}")
+                plan_rows = explain_result.all()
+            finally:
+                transaction.rollback()
+        # Postgres returns one JSON document, SQLite one row per plan node
+        if len(plan_rows) == 1 and len(plan_rows[0]) == 1:
+            return plan_rows[0][0]
+        return [list(plan_row) for plan_row in plan_rows]
+
+
+# Flat relations mirror the Redis trip document, so they are queried with the
+# same (index, Query) selectors translated to SQL
+class FlatOrmCRUDHandler(OrmCRUDHandler):
+    def __init__(
+        self,
+        db_engine: Engine,
+        flat_relation: Table,
+        result_format: ReadResultFormat = ReadResultFormat.ROWS,
+        delete_batch_size: typing.Optional[int] = None,
+    ):
+        super().__init__(db_engine, result_format, delete_batch_size)
+        self.flat_relation = flat_relation
+
+    # Exact tag matches compare the column to the value unless overridden
+    _match_tag: typing.Optional[typing.Callable[[str, str], typing.Any]] = None
+
+    def _resolve_field(self, field: str) -> typing.Any:
+        return self.flat_relation.c[field]
+
+    def _translate_predicate(self, indexed_query: tuple[str, Query]) -> typing.Any:
+        _, query = indexed_query
+        return CompileSqlPredicate(
+            ParseRedisQuery(query.query_string()),
+            self._resolve_field,
+            self._match_tag,
+        )
+
+    def _translate_select(self, indexed_query: tuple[str, Query]) -> typing.Any:
+        select_query = select(self.flat_relation).where(
+            self._translate_predicate(indexed_query)
+        )
+        sort_by = GetRedisQuerySortBy(indexed_query[1])
+        if sort_by is not None:
+            field, ascending = sort_by
+            sort_column = self._resolve_field(field)
+            select_query = select_query.order_by(
+                sort_column.asc() if ascending else sort_column.desc()
+            )
+        return select_query
+
+    @TracedOperation
+    @ProfiledOperation
+    def read(  # type: ignore
+        self, indexed_query: tuple[str, Query]
+    ) -> list[dict[str, typing.Any]] | ColumnarResult:
+        with PhaseProfiler.Phase("query_build"):
+            select_query = self._translate_select(indexed_query)
+        if self.result_format != ReadResultFormat.ROWS:
+            return self._read_columns(select_query)
+        with self.db_engine.connect() as connection:
+            with PhaseProfiler.Phase("wire"):
+                query_result = connection.execute(select_query)
+            with PhaseProfiler.Phase("hydrate"):
+                found_entries = query_result.mappings().all()
+        with PhaseProfiler.Phase("conversion"):
+            converted_entries = [dict(entry) for entry in found_entries]
+        Tracer.Emit(
+            TraceEvent.ROWS, operation="read", rows=len(converted_entries)
+        )
+        return converted_entries
+
+    @TracedOperation
+    @ProfiledOperation
+    def update(  # type: ignore
+        self,
+        indexed_query: tuple[str, Query],
+        values: dict[typing.Any, typing.Any],
+    ) -> Result[typing.Any]:
+        with PhaseProfiler.Phase("query_build"):
+            update_query = update(self.flat_relation).where(
+                self._translate_predicate(indexed_query)
+            )
+        return super().update(update_query, values)
+
+    def _translate_delete(self, indexed_query: tuple[str, Query]) -> Delete:
+        return delete(self.flat_relation).where(
+            self._translate_predicate(indexed_query)
+        )
+
+    @TracedOperation
+    @ProfiledOperation
+    def delete(  # type: ignore
+        self, indexed_query: tuple[str, Query]
+    ) -> int:
+        with PhaseProfiler.Phase("query_build"):
+            delete_query = self._translate_delete(indexed_query)
+        return super().delete(delete_query)
+
+    def _translate_aggregate(
+        self, indexed_aggregation: tuple[str, AggregateRequest]
+    ) -> Select[typing.Any]:
+        _, aggregate_request = indexed_aggregation
+        return CompileSqlAggregate(
+            ParseRedisAggregateRequest(aggregate_request),
+            self.flat_relation,
+            self._resolve_field,
+            self._match_tag,
+        )
+
+    @TracedOperation
+    @ProfiledOperation
+    def aggregate(  # type: ignore
+        self, indexed_aggregation: tuple[str, AggregateRequest]
+    ) -> list[dict[str, typing.Any]]:
+        with PhaseProfiler.Phase("query_build"):
+            aggregate_query = self._translate_aggregate(indexed_aggregation)
+        return super().aggregate(aggregate_query)
+
+    def explain(  # type: ignore
+        self,
+        indexed_query: tuple[str, Query],
+        values: typing.Optional[dict[typing.Any, typing.Any]] = None,
+        for_delete: bool = False,
+    ) -> typing.Any:
+        # Deletes share their selector with reads, the DELETE is explained
+        if for_delete:
+            return OrmCRUDHandler.explain(
+                self, self._translate_delete(indexed_query)
+            )
+        if isinstance(indexed_query[1], AggregateRequest):
+            return super().explain(
+                self._translate_aggregate(indexed_query)  # type: ignore
+            )
+        if values is None:
+            return super().explain(self._translate_select(indexed_query))
+        return super().explain(
+            update(self.flat_relation).where(
+                self._translate_predicate(indexed_query)
+            ),
+            values,
+        )
+
+
+# Reads hit the materialized view, writes go to the normalized tables and are
+# made visible by refreshing the view
+class MaterializedViewCRUDHandler(FlatOrmCRUDHandler):
+    def __init__(
+        self,
+        db_engine: Engine,
+        flat_relation: Table,
+        refresh_on_write: bool = True,
+        result_format: ReadResultFormat = ReadResultFormat.ROWS,
+        delete_batch_size: typing.Optional[int] = None,
+    ):
+        super().__init__(db_engine, flat_relation, result_format, delete_batch_size)
+        self.refresh_on_write = refresh_on_write
+
+    def refresh(self) -> None:
+        logging.debug(f"Refreshing materialized view {self.flat_relation.name}")
+        with self.db_engine.begin() as connection:
+            connection.execute(
+                text(f"REFRESH MATERIALIZED VIEW {self.flat_relation.name}")
+            )
+
+    def _select_view_ids(
+        self, indexed_query: tuple[str, Query], id_column: str
+    ) -> typing.Any:
+        return select(self.flat_relation.c[id_column]).where(
+            self._translate_predicate(indexed_query)
+        )
+
+    def _translate_updates(
+        self,
+        indexed_query: tuple[str, Query],
+        values: dict[typing.Any, typing.Any],
+    ) -> list[Update]:
+        grouped_values: dict[
+            tuple[typing.Any, str], dict[str, typing.Any]
+        ] = {}
+        for field, value in values.items():
+            source_column, id_column = TRIP_FLAT_VIEW_SOURCES[field]
+            grouped_values.setdefault(
+                (source_column.class_, id_column), {}
+            )[source_column.key] = value
+        return [
+            update(orm_type)
+            .where(
+                orm_type.id.in_(self._select_view_ids(indexed_query, id_column))
+            )
+            .values(**orm_values)
+            for (orm_type, id_column), orm_values in grouped_values.items()
+        ]
+
+    @TracedOperation
+    @ProfiledOperation
+    def update(  # type: ignore
+        self,
+        indexed_query: tuple[str, Query],
+        values: dict[typing.Any, typing.Any],
+    ) -> int:
+        updated_rows = 0
+        with PhaseProfiler.Phase("query_build"):
+            update_queries = self._translate_updates(indexed_query, values)
         with self._establish_session() as session:
-            delete_result = session.execute(query)
-            if not delete_result.rowcount:
-                logging.warning("No matching records found to delete.")
-            logging.info(f"Deleted {delete_result.rowcount} entries.")
-        return delete_result
+            for update_query in update_queries:
+                with PhaseProfiler.Phase("wire"):
+                    updated_rows += session.execute(update_query).rowcount  # type: ignore
+        Tracer.Emit(TraceEvent.ROWS, operation="update", rows=updated_rows)
+        if self.refresh_on_write:
+            with PhaseProfiler.Phase("view_refresh"):
+                self.refresh()
+        return updated_rows
+
+    def _translate_delete(self, indexed_query: tuple[str, Query]) -> Delete:
+        return delete(Trip).where(
+            Trip.id.in_(self._select_view_ids(indexed_query, "id"))
+        )
+
+    @TracedOperation
+    @ProfiledOperation
+    def delete(  # type: ignore
+        self, indexed_query: tuple[str, Query]
+    ) -> int:
+        deleted_rows = OrmCRUDHandler.delete(
+            self, self._translate_delete(indexed_query)
+        )
+        if self.refresh_on_write:
+            with PhaseProfiler.Phase("view_refresh"):
+                self.refresh()
+        return deleted_rows
+
+    def explain(  # type: ignore
+        self,
+        indexed_query: tuple[str, Query],
+        values: typing.Optional[dict[typing.Any, typing.Any]] = None,
+        for_delete: bool = False,
+    ) -> typing.Any:
+        if values is None:
+            return super().explain(indexed_query, for_delete=for_delete)
+        return [
+            OrmCRUDHandler.explain(self, update_query)
+            for update_query in self._translate_updates(indexed_query, values)
+        ]
+
+
+# Trips stored as one JSONB document each, shaped like the Redis document, so
+# the Redis selectors are translated to JSONB predicates
+class JsonbDocumentCRUDHandler(FlatOrmCRUDHandler):
+    def __init__(
+        self,
+        db_engine: Engine,
+        document_relation: Table = TripDocument,
+        result_format: ReadResultFormat = ReadResultFormat.ROWS,
+        delete_batch_size: typing.Optional[int] = None,
+    ):
+        super().__init__(
+            db_engine, document_relation, result_format, delete_batch_size
+        )
+
+    def create(  # type: ignore
+        self, *document_rows: dict[str, typing.Any]
+    ) -> list[int]:
+        with self._establish_session() as session:
+            query_result = session.execute(
+                insert(self.flat_relation).returning(self.flat_relation.c.id),
+                document_rows,
+            )
+            inserted_ids = [row[0] for row in query_result]
+        Tracer.Emit(
+            TraceEvent.ROWS,
+            operation="create",
+            table=self.flat_relation.name,
+            rows=len(inserted_ids),
+        )
+        return inserted_ids
+
+    def _resolve_field(self, field: str) -> typing.Any:
+        return GetDocumentField(self.flat_relation.c.document, field)
+
+    def _match_tag(self, field: str, value: str) -> typing.Any:
+        # Containment is served by the jsonb_path_ops GIN index, an equality
+        # on the extracted text would scan
+        return self.flat_relation.c.document.contains(
+            cast(literal(json.dumps({GetDocumentFieldKey(field): value})), JSONB)
+        )
+
+    def _translate_values(
+        self, values: dict[typing.Any, typing.Any]
+    ) -> dict[str, typing.Any]:
+        # Only the changed keys are rewritten, not the whole document
+        updated_document = self.flat_relation.c.document
+        for field, value in values.items():
+            updated_document = func.jsonb_set(
+                updated_document,
+                array([GetDocumentFieldKey(field)]),
+                cast(literal(json.dumps(value)), JSONB),
+            )
+        return {"document": updated_document}
+
+    def _flatten_documents(
+        self, found_rows: typing.Sequence[typing.Any]
+    ) -> list[dict[str, typing.Any]]:
+        return [{"id": row_id, **document} for row_id, document in found_rows]
+
+    def _collect_document_columns(
+        self, found_rows: typing.Sequence[typing.Any]
+    ) -> dict[str, list[typing.Any]]:
+        # Fields are appended straight to their column, no dict per row. A
+        # field missing from a document is None in its row
+        columns: dict[str, list[typing.Any]] = {"id": []}
+        for row_position, (row_id, document) in enumerate(found_rows):
+            columns["id"].append(row_id)
+            for field, value in document.items():
+                column = columns.get(field)
+                if column is None:
+                    column = columns[field] = [None] * row_position
+                column.append(value)
+            if len(document) + 1 < len(columns):
+                for column in columns.values():
+                    if len(column) == row_position:
+                        column.append(None)
+        return columns
+
+    @TracedOperation
+    @ProfiledOperation
+    def read(  # type: ignore
+        self, indexed_query: tuple[str, Query]
+    ) -> list[dict[str, typing.Any]] | ColumnarResult:
+        with PhaseProfiler.Phase("query_build"):
+            select_query = self._translate_select(indexed_query)
+        with self.db_engine.connect() as connection:
+            # psycopg2 decodes the JSONB documents while fetching
+            with PhaseProfiler.Phase("wire"):
+                query_result = connection.execute(select_query)
+            with PhaseProfiler.Phase("hydrate"):
+                found_rows = query_result.fetchall()
+        Tracer.Emit(TraceEvent.ROWS, operation="read", rows=len(found_rows))
+        with PhaseProfiler.Phase("conversion"):
+            if self.result_format == ReadResultFormat.ROWS:
+                return self._flatten_documents(found_rows)
+            return BuildColumnarResultFromColumns(
+                self._collect_document_columns(found_rows), self.result_format
+            )
+
+    @TracedOperation
+    @ProfiledOperation
+    def update(  # type: ignore
+        self,
+        indexed_query: tuple[str, Query],
+        values: dict[typing.Any, typing.Any],
+    ) -> Result[typing.Any]:
+        with PhaseProfiler.Phase("query_build"):
+            document_values = self._translate_values(values)
+        return super().update(indexed_query, document_values)
+
+    def explain(  # type: ignore
+        self,
+        indexed_query: tuple[str, Query],
+        values: typing.Optional[dict[typing.Any, typing.Any]] = None,
+        for_delete: bool = False,
+    ) -> typing.Any:
+        if values is None:
+            return super().explain(indexed_query, for_delete=for_delete)
+        return super().explain(indexed_query, self._translate_values(values))
+
+
+class CacheWritePolicy(enum.StrEnum):
+    INVALIDATE = enum.auto()
+    WRITE_THROUGH = enum.auto()
+
+
+CACHE_KEY_PREFIX = "cache:"
+
+CACHED_DATETIME_KEY = "__datetime__"
+
+
+def EncodeCachedValue(value: typing.Any) -> typing.Any:
+    # Datetimes are tagged, so a hit returns the same types as a miss
+    if isinstance(value, datetime):
+        return {CACHED_DATETIME_KEY: value.isoformat()}
+    return str(value)
+
+
+def DecodeCachedObject(cached_object: dict[str, typing.Any]) -> typing.Any:
+    if len(cached_object) == 1 and CACHED_DATETIME_KEY in cached_object:
+        return datetime.fromisoformat(cached_object[CACHED_DATETIME_KEY])
+    return cached_object
+
+
+def GetReferencedTables(tables: typing.Iterable[Table]) -> set[Table]:
+    # Cached ORM entries serialize their lazily loaded parents as well
+    referenced_tables = set(tables)
+    pending_tables = list(referenced_tables)
+    while pending_tables:
+        for foreign_key in pending_tables.pop().foreign_keys:
+            parent_table = foreign_key.column.table
+            if parent_table not in referenced_tables:
+                referenced_tables.add(parent_table)
+                pending_tables.append(parent_table)
+    return referenced_tables
+
+
+def GetCascadedTables(table: Table) -> set[Table]:
+    cascaded_tables = {table}
+    pending_tables = [table]
+    while pending_tables:
+        pending_table = pending_tables.pop()
+        for related_table in [
+            owned_table for _, owned_table in GetOwnedReferences(pending_table)
+        ] + [
+            dependent_table
+            for dependent_table, _ in GetDependentReferences(pending_table)
+        ]:
+            if related_table not in cascaded_tables:
+                cascaded_tables.add(related_table)
+                pending_tables.append(related_table)
+    return cascaded_tables
+
+
+# Cache-aside tier: reads are served from Redis on a hit and from the ORM
+# handler on a miss, writes go to the ORM handler and then invalidate or
+# rewrite the cached reads of the tables they touched
+class CacheAsideCRUDHandler(AbstractCRUDHandler):
+    def __init__(
+        self,
+        backing_handler: OrmCRUDHandler,
+        cache: Redis,
+        ttl_seconds: typing.Optional[int] = None,
+        write_policy: CacheWritePolicy = CacheWritePolicy.INVALIDATE,
+    ):
+        if backing_handler.result_format != ReadResultFormat.ROWS:
+            raise ValueError("Only row results are cached.")
+        self.backing_handler = backing_handler
+        self.cache = cache
+        self.ttl_seconds = ttl_seconds
+        self.write_policy = write_policy
+        self.cached_queries: dict[str, Executable] = {}
+        self.reset_statistics()
+
+    def reset_statistics(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    def get_statistics(self) -> dict[str, typing.Any]:
+        reads = self.hits + self.misses
+        return {
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+            "cache_hit_ratio": self.hits / reads if reads else 0.0,
+            "cache_refreshes": self.refreshes,
+        }
+
+    def flush(self) -> None:
+        cached_keys = list(self.cache.scan_iter(match=f"{CACHE_KEY_PREFIX}*"))
+        if cached_keys:
+            self.cache.delete(*cached_keys)
+        self.cached_queries.clear()
+
+    def _cache_key(self, query: Executable) -> str:
+        compiled_query = query.compile(self.backing_handler.db_engine)
+        query_digest = hashlib.sha1(
+            f"{compiled_query}{sorted(compiled_query.params.items())}".encode()
+        ).hexdigest()
+        return f"{CACHE_KEY_PREFIX}query:{query_digest}"
+
+    def _table_key(self, table: Table) -> str:
+        return f"{CACHE_KEY_PREFIX}table:{table.name}"
+
+    def _store(
+        self, cache_key: str, query: Executable, entries: typing.Any
+    ) -> None:
+        cache_pipeline = self.cache.pipeline(transaction=False)
+        cache_pipeline.set(
+            cache_key,
+            json.dumps(entries, default=EncodeCachedValue),
+            ex=self.ttl_seconds,
+        )
+        for table in GetReferencedTables(
+            find_tables(query, check_columns=True, include_joins=True)  # type: ignore
+        ):
+            cache_pipeline.sadd(self._table_key(table), cache_key)
+        cache_pipeline.execute()
+        self.cached_queries[cache_key] = query
+
+    def _apply_write_policy(self, tables: set[Table]) -> None:
+        table_keys = [self._table_key(table) for table in tables]
+        cached_keys = set(self.cache.sunion(table_keys))  # type: ignore
+        if not cached_keys:
+            return
+        if self.write_policy == CacheWritePolicy.WRITE_THROUGH:
+            # Reads cached by this handler are rerun and stay hits, others
+            # are dropped. A write costs one read per cached query of the
+            # written tables, counted as cache_refreshes
+            for cache_key in sorted(cached_keys & set(self.cached_queries)):
+                self._store(
+                    cache_key,
+                    self.cached_queries[cache_key],
+                    self.backing_handler.read(self.cached_queries[cache_key]),
+                )
+                self.refreshes += 1
+            cached_keys -= set(self.cached_queries)
+        else:
+            for cache_key in cached_keys:
+                self.cached_queries.pop(cache_key, None)
+        if cached_keys:
+            self.cache.delete(*cached_keys)
+        Tracer.Emit(
+            TraceEvent.ROWS,
+            operation=f"cache_{self.write_policy.value}",
+            rows=len(cached_keys),
+        )
+
+    def create(
+        self,
+        orm_type: typing.Type[ORM_TABLE_TYPE],
+        *orm_entries: dict[str, typing.Any],
+    ) -> list[int]:
+        inserted_ids = self.backing_handler.create(orm_type, *orm_entries)
+        with PhaseProfiler.Phase("cache"):
+            self._apply_write_policy({orm_type.__table__})  # type: ignore
+        return inserted_ids
+
+    @TracedOperation
+    @ProfiledOperation
+    def read(
+        self, query: TypedReturnsRows[typing.Tuple[ORM_TABLE_TYPE]]
+    ) -> list[typing.Any]:
+        with PhaseProfiler.Phase("query_build"):
+            cache_key = self._cache_key(query)
+        with PhaseProfiler.Phase("cache"):
+            cached_entries = self.cache.get(cache_key)
+        if cached_entries is not None:
+            self.hits += 1
+            with PhaseProfiler.Phase("decode"):
+                return json.loads(
+                    cached_entries, object_hook=DecodeCachedObject  # type: ignore
+                )
+        self.misses += 1
+        found_entries = self.backing_handler.read(query)
+        with PhaseProfiler.Phase("cache"):
+            self._store(cache_key, query, found_entries)
+        return found_entries  # type: ignore
+
+    @TracedOperation
+    @ProfiledOperation
+    def update(
+        self,
+        query: Update,
+        values: dict[typing.Any, typing.Any],
+    ) -> Result[typing.Any]:
+        update_result = self.backing_handler.update(query, values)
+        with PhaseProfiler.Phase("cache"):
+            self._apply_write_policy({query.table})  # type: ignore
+        return update_result
+
+    @TracedOperation
+    @ProfiledOperation
+    def delete(self, query: Delete) -> int:
+        deleted_rows = self.backing_handler.delete(query)
+        with PhaseProfiler.Phase("cache"):
+            self._apply_write_policy(GetCascadedTables(query.table))  # type: ignore
+        return deleted_rows
+
+    def aggregate(
+        self, query: Select[typing.Any]
+    ) -> list[dict[str, typing.Any]]:
+        return self.backing_handler.aggregate(query)
+
+    def explain(
+        self,
+        query: Executable,
+        values: typing.Optional[dict[typing.Any, typing.Any]] = None,
+        for_delete: bool = False,
+    ) -> typing.Any:
+        return self.backing_handler.explain(query, values, for_delete)
+
+
+# In-process columnar baseline, the Redis (index, Query) selectors are
+# evaluated as boolean masks over the trip column arrays
+class NumpyCRUDHandler(AbstractCRUDHandler):
+    def __init__(
+        self,
+        db_engine: ColumnarTable,
+        result_format: ReadResultFormat = ReadResultFormat.ROWS,
+    ):
+        self.db_engine = db_engine
+        self.result_format = result_format
+
+    def create(self, columns: dict[str, np.ndarray]) -> np.ndarray:
+        inserted_ids = self.db_engine.append(columns)
+        Tracer.Emit(TraceEvent.ROWS, operation="create", rows=len(inserted_ids))
+        return inserted_ids
+
+    def _evaluate_mask(self, indexed_query: tuple[str, Query]) -> np.ndarray:
+        _, query = indexed_query
+        return CompileNumpyMask(
+            ParseRedisQuery(query.query_string()),
+            lambda field: self.db_engine.columns[field],
+            len(self.db_engine),
+        )
+
+    @TracedOperation
+    @ProfiledOperation
+    def read(
+        self, indexed_query: tuple[str, Query]
+    ) -> dict[str, np.ndarray] | ColumnarResult:
+        # No client/server split in process, execution covers the mask scan
+        with PhaseProfiler.Phase("execution"):
+            found_rows = np.flatnonzero(self._evaluate_mask(indexed_query))
+            sort_by = GetRedisQuerySortBy(indexed_query[1])
+            if sort_by is not None:
+                field, ascending = sort_by
+                sort_keys = self.db_engine.columns[field][found_rows]
+                found_rows = found_rows[
+                    np.argsort(
+                        sort_keys if ascending else -sort_keys, kind="stable"
+                    )
+                ]
+        with PhaseProfiler.Phase("conversion"):
+            found_entries: dict[str, np.ndarray] | ColumnarResult = {
+                "id": self.db_engine.ids[found_rows],
+                **{
+                    name: column[found_rows]
+                    for name, column in self.db_engine.columns.items()
+                },
+            }
+            # Rows stay as the sliced column arrays, the columnar formats
+            # are built from them without a copy per row
+            if self.result_format == ReadResultFormat.DATAFRAME:
+                found_entries = pd.DataFrame(found_entries)
+            elif self.result_format == ReadResultFormat.ARROW:
+                found_entries = pa.table(found_entries)
+        Tracer.Emit(TraceEvent.ROWS, operation="read", rows=len(found_rows))
+        return found_entries
+
+    @TracedOperation
+    @ProfiledOperation
+    def update(
+        self,
+        indexed_query: tuple[str, Query],
+        values: dict[typing.Any, typing.Any],
+    ) -> int:
+        update_mask = self._evaluate_mask(indexed_query)
+        for field, value in values.items():
+            self.db_engine.columns[field][update_mask] = value
+        updated_rows = int(np.count_nonzero(update_mask))
+        Tracer.Emit(TraceEvent.ROWS, operation="update", rows=updated_rows)
+        return updated_rows
+
+    @TracedOperation
+    @ProfiledOperation
+    def delete(self, indexed_query: tuple[str, Query]) -> int:
+        delete_mask = self._evaluate_mask(indexed_query)
+        deleted_rows = int(np.count_nonzero(delete_mask))
+        if not deleted_rows:
+            logging.warning("No matching records found to delete.")
+        self.db_engine.compact(~delete_mask)
+        Tracer.Emit(TraceEvent.ROWS, operation="delete", rows=deleted_rows)
+        return deleted_rows
+
+    @TracedOperation
+    @ProfiledOperation
+    def aggregate(
+        self, indexed_aggregation: tuple[str, AggregateRequest]
+    ) -> list[dict[str, typing.Any]]:
+        _, aggregate_request = indexed_aggregation
+        with PhaseProfiler.Phase("query_build"):
+            pipeline = ParseRedisAggregateRequest(aggregate_request)
+        with PhaseProfiler.Phase("execution"):
+            output_columns = EvaluateNumpyAggregate(
+                pipeline,
+                lambda field: self.db_engine.columns[field],
+                len(self.db_engine),
+            )
+        with PhaseProfiler.Phase("conversion"):
+            aggregated_rows = [
+                dict(zip(output_columns, row))
+                for row in zip(
+                    *(column.tolist() for column in output_columns.values())
+                )
+            ]
+        Tracer.Emit(
+            TraceEvent.ROWS, operation="aggregate", rows=len(aggregated_rows)
+        )
+        return aggregated_rows
+
+    def explain(
+        self,
+        indexed_query: tuple[str, Query],
+        values: typing.Optional[dict[typing.Any, typing.Any]] = None,
+        for_delete: bool = False,
+    ) -> typing.Any:
+        _, query = indexed_query
+        if isinstance(query, AggregateRequest):
+            pipeline = ParseRedisAggregateRequest(query)
+            return {
+                "pipeline": repr(pipeline),
+                "matched_rows": int(
+                    np.count_nonzero(
+                        CompileNumpyMask(
+                            pipeline.query,
+                            lambda field: self.db_engine.columns[field],
+                            len(self.db_engine),
+                        )
+                    )
+                ),
+            }
+        return {
+            "query_tree": repr(ParseRedisQuery(query.query_string())),
+            "sort_by": GetRedisQuerySortBy(query),
+            "matched_rows": int(
+                np.count_nonzero(self._evaluate_mask(indexed_query))
+            ),
+        }
@@ -0,0 +1,149 @@
+import enum
+import logging
+import typing
+
+from sqlalchemy import Engine, Table, text
+
+
+class IndexProfile(enum.StrEnum):
+    NONE = enum.auto()
+    FOREIGN_KEYS = enum.auto()
+    PREDICATES = enum.auto()
+    COVERING = enum.auto()
+
+
+def GetFlatPredicateIndexes(relation: str) -> list[str]:
+    return [
+        f"CREATE INDEX IF NOT EXISTS ix_{relation}_{column} ON {relation} ({column})"
+        for column in (
+            "pickup_time",
+            "dropoff_time",
+            "distance",
+            "passenger_count",
+            "rate_code_id",
+            "fare_amount",
+            "total_amount",
+            "airport_fee",
+            "improvement_surcharge",
+        )
+    ] + [
+        f"CREATE INDEX IF NOT EXISTS ix_{relation}_vendor_name ON {relation} (vendor_name varchar_pattern_ops)",
+    ]
+
+
+def GetFlatCoveringIndexes(relation: str) -> list[str]:
+    return [
+        f"CREATE INDEX IF NOT EXISTS ix_{relation}_pickup_time_covering ON {relation} (pickup_time) "
+        "INCLUDE (dropoff_time, distance, fare_amount)",
+        f"CREATE INDEX IF NOT EXISTS ix_{relation}_distance_covering ON {relation} (distance) "
+        "INCLUDE (passenger_count, fare_amount, total_amount)",
+        f"CREATE INDEX IF NOT EXISTS ix_{relation}_airport_fee_charged ON {relation} (airport_fee) "
+        "WHERE airport_fee > 0",
+        f"CREATE INDEX IF NOT EXISTS ix_{relation}_improvement_surcharge_no_airport ON {relation} (improvement_surcharge) "
+        "WHERE airport_fee = 0",
+    ]
+
+
+PREDICATE_INDEXES: dict[str, list[str]] = {
+    "trip": [
+        "CREATE INDEX IF NOT EXISTS ix_trip_distance ON trip (distance)",
+        "CREATE INDEX IF NOT EXISTS ix_trip_passenger_count ON trip (passenger_count)",
+    ],
+    "payment": [
+        "CREATE INDEX IF NOT EXISTS ix_payment_fare_amount ON payment (fare_amount)",
+        "CREATE INDEX IF NOT EXISTS ix_payment_total_amount ON payment (total_amount)",
+    ],
+    "fees": [
+        "CREATE INDEX IF NOT EXISTS ix_fees_airport_fee ON fees (airport_fee)",
+        "CREATE INDEX IF NOT EXISTS ix_fees_improvement_surcharge ON fees (improvement_surcharge)",
+    ],
+    "vendor": [
+        "CREATE INDEX IF NOT EXISTS ix_vendor_vendor_name ON vendor (vendor_name varchar_pattern_ops)",
+    ],
+    "taxi_meter": [
+        "CREATE INDEX IF NOT EXISTS ix_taxi_meter_taxi_meter_date ON taxi_meter (taxi_meter_date)",
+    ],
+    "trip_flat": GetFlatPredicateIndexes("trip_flat"),
+    "trip_flat_view": GetFlatPredicateIndexes("trip_flat_view"),
+}
+
+COVERING_INDEXES: dict[str, list[str]] = {
+    "trip": [
+        "CREATE INDEX IF NOT EXISTS ix_trip_distance_covering ON trip (distance) "
+        "INCLUDE (passenger_count, payment_id, vendor_id)",
+        "CREATE INDEX IF NOT EXISTS ix_trip_passenger_count_covering ON trip (passenger_count) "
+        "INCLUDE (distance, payment_id, vendor_id)",
+    ],
+    "payment": [
+        "CREATE INDEX IF NOT EXISTS ix_payment_fare_amount_covering ON payment (fare_amount) "
+        "INCLUDE (total_amount, rate_code_id, fees_id)",
+        "CREATE INDEX IF NOT EXISTS ix_payment_rate_code_id_non_standard ON payment (rate_code_id) "
+        "WHERE rate_code_id <> 1",
+    ],
+    "fees": [
+        "CREATE INDEX IF NOT EXISTS ix_fees_airport_fee_charged ON fees (airport_fee) "
+        "WHERE airport_fee > 0",
+        "CREATE INDEX IF NOT EXISTS ix_fees_improvement_surcharge_no_airport ON fees (improvement_surcharge) "
+        "WHERE airport_fee = 0",
+    ],
+    "trip_flat": GetFlatCoveringIndexes("trip_flat"),
+    "trip_flat_view": GetFlatCoveringIndexes("trip_flat_view"),
+}
+
+
+def GetForeignKeyIndexes(tables: typing.Iterable[Table]) -> list[str]:
+    return [
+        f"CREATE INDEX IF NOT EXISTS ix_{table.name}_{foreign_key.parent.name} "
+        f"ON {table.name} ({foreign_key.parent.name})"
+        for table in tables
+        for foreign_key in sorted(
+            table.foreign_keys, key=lambda fk: fk.parent.name
+        )
+    ]
+
+
+def GetRelationIndexes(
+    indexes: dict[str, list[str]], relation_names: typing.Iterable[str]
+) -> list[str]:
+    return [
+        statement
+        for relation_name in relation_names
+        for statement in indexes.get(relation_name, [])
+    ]
+
+
+def GetIndexProfileStatements(
+    index_profile: IndexProfile,
+    tables: list[Table],
+    view_names: typing.Sequence[str] = (),
+) -> list[str]:
+    relation_names = [table.name for table in tables] + list(view_names)
+    match index_profile:
+        case IndexProfile.NONE:
+            return []
+        case IndexProfile.FOREIGN_KEYS:
+            return GetForeignKeyIndexes(tables)
+        case IndexProfile.PREDICATES:
+            return GetForeignKeyIndexes(tables) + GetRelationIndexes(
+                PREDICATE_INDEXES, relation_names
+            )
+        case IndexProfile.COVERING:
+            return (
+                GetForeignKeyIndexes(tables)
+                + GetRelationIndexes(PREDICATE_INDEXES, relation_names)
+                + GetRelationIndexes(COVERING_INDEXES, relation_names)
+            )
+
+
+def CreateIndexProfile(
+    engine: Engine,
+    index_profile: IndexProfile,
+    tables: list[Table],
+    view_names: typing.Sequence[str] = (),
+) -> None:
+    with engine.begin() as connection:
+        for statement in GetIndexProfileStatements(
+            index_profile, tables, view_names
+        ):
+            logging.debug(f"Creating index with: {statement}")
+            connection.execute(text(statement))
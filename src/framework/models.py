@@ -1,8 +1,23 @@
 import typing
 from datetime import datetime
 
-from sqlalchemy import ForeignKey
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
+from sqlalchemy import (
+    Column,
+    ForeignKey,
+    Integer,
+    MetaData,
+    Table,
+    cast,
+    select,
+)
+from sqlalchemy.orm import (
+    DeclarativeBase,
+    InstrumentedAttribute,
+    Mapped,
+    aliased,
+    mapped_column,
+    relationship,
+)
 
 
 class BaseOrmType(DeclarativeBase):
@@ -110,7 +125,9 @@ class Payment(BaseOrmType):
     tolls_amount: Mapped[float]
     fare_amount: Mapped[float]
     total_amount: Mapped[float]
-    fees_id: Mapped[int] = mapped_column(ForeignKey("fees.id"))
+    fees_id: Mapped[int] = mapped_column(
+        ForeignKey("fees.id", ondelete="CASCADE")
+    )
     rate_code_id: Mapped[int] = mapped_column(ForeignKey("fare_rate.id"))
     fees: Mapped[Fees] = relationship("Fees")
     rate_code: Mapped[FareRate] = relationship("FareRate")
@@ -143,9 +160,17 @@ class Trip(BaseOrmType):
     )
     distance: Mapped[float]
     passenger_count: Mapped[int]
-    pickup_id: Mapped[int] = mapped_column(ForeignKey("taxi_meter.id"))
-    dropoff_id: Mapped[int] = mapped_column(ForeignKey("taxi_meter.id"))
-    payment_id: Mapped[int] = mapped_column(ForeignKey("payment.id"))
+    # Meter readings, payments and their fees belong to a single trip, vendors
+    # and fare rates are shared lookups
+    pickup_id: Mapped[int] = mapped_column(
+        ForeignKey("taxi_meter.id", ondelete="CASCADE")
+    )
+    dropoff_id: Mapped[int] = mapped_column(
+        ForeignKey("taxi_meter.id", ondelete="CASCADE")
+    )
+    payment_id: Mapped[int] = mapped_column(
+        ForeignKey("payment.id", ondelete="CASCADE")
+    )
     vendor_id: Mapped[int] = mapped_column(ForeignKey("vendor.id"))
     pickup: Mapped[TaxiMeter] = relationship(
         "TaxiMeter", foreign_keys=[pickup_id]
@@ -173,3 +198,114 @@ class Trip(BaseOrmType):
             else self.payment_id,
             "vendor": self.vendor.to_dict() if self.vendor else self.vendor_id,
         }
+
+
+class TripFlat(BaseOrmType):
+    __tablename__ = "trip_flat"
+
+    id: Mapped[int] = mapped_column(
+        primary_key=True,
+        unique=True,
+        autoincrement=True,
+    )
+    vendor_id: Mapped[typing.Optional[int]]
+    vendor_name: Mapped[typing.Optional[str]]
+    pickup_time: Mapped[datetime]
+    dropoff_time: Mapped[datetime]
+    passenger_count: Mapped[typing.Optional[int]]
+    distance: Mapped[typing.Optional[float]]
+    rate_code_id: Mapped[typing.Optional[int]]
+    fare_rate: Mapped[typing.Optional[str]]
+    PULocationID: Mapped[typing.Optional[int]]
+    DOLocationID: Mapped[typing.Optional[int]]
+    payment_type: Mapped[typing.Optional[float]]
+    fare_amount: Mapped[typing.Optional[float]]
+    extra: Mapped[typing.Optional[float]]
+    mta_tax: Mapped[typing.Optional[float]]
+    tip_amount: Mapped[typing.Optional[float]]
+    tolls_amount: Mapped[typing.Optional[float]]
+    improvement_surcharge: Mapped[typing.Optional[float]]
+    total_amount: Mapped[typing.Optional[float]]
+    congestion_surcharge: Mapped[typing.Optional[float]]
+    airport_fee: Mapped[typing.Optional[float]]
+    cbd_congestion_fee: Mapped[typing.Optional[float]]
+
+    def __repr__(self) -> str:
+        return f"TripFlat({self.to_dict()})"
+
+    def to_dict(self) -> dict[str, typing.Any]:
+        return {
+            column.key: getattr(self, column.key)
+            for column in self.__table__.columns
+        }
+
+
+_PickupMeter = aliased(TaxiMeter)
+_DropoffMeter = aliased(TaxiMeter)
+
+# Flattened join of the normalized schema, column names follow TripFlat and
+# the RediSearch field aliases
+TRIP_FLAT_VIEW_QUERY = (
+    select(
+        Trip.id,
+        Trip.pickup_id,
+        Trip.dropoff_id,
+        Trip.payment_id,
+        Payment.fees_id,
+        Trip.vendor_id,
+        Vendor.vendor_name,
+        _PickupMeter.taxi_meter_date.label("pickup_time"),
+        _DropoffMeter.taxi_meter_date.label("dropoff_time"),
+        Trip.passenger_count,
+        Trip.distance,
+        Payment.rate_code_id,
+        FareRate.rate_name.label("fare_rate"),
+        cast(_PickupMeter.taxi_meter_location, Integer).label("PULocationID"),
+        cast(_DropoffMeter.taxi_meter_location, Integer).label("DOLocationID"),
+        Payment.payment_type,
+        Payment.fare_amount,
+        Payment.extra,
+        Fees.mta_tax,
+        Payment.tolls_amount,
+        Fees.improvement_surcharge,
+        Payment.total_amount,
+        Fees.airport_fee,
+        Fees.cbd_congestion_fee,
+    )
+    .join(_PickupMeter, Trip.pickup)
+    .join(_DropoffMeter, Trip.dropoff)
+    .join(Trip.payment)
+    .join(Payment.fees)
+    .join(Payment.rate_code)
+    .join(Trip.vendor)
+)
+
+# Views live outside BaseOrmType.metadata so create_all never makes them tables
+VIEW_METADATA = MetaData()
+
+TripFlatView = Table(
+    "trip_flat_view",
+    VIEW_METADATA,
+    *(
+        Column(column.name, column.type)
+        for column in TRIP_FLAT_VIEW_QUERY.selected_columns
+    ),
+)
+
+# Normalized column written by an update of a TripFlatView column, with the
+# view column holding the id of the row to change
+TRIP_FLAT_VIEW_SOURCES: dict[str, tuple[InstrumentedAttribute[typing.Any], str]] = {
+    "passenger_count": (Trip.passenger_count, "id"),
+    "distance": (Trip.distance, "id"),
+    "vendor_name": (Vendor.vendor_name, "vendor_id"),
+    "rate_code_id": (Payment.rate_code_id, "payment_id"),
+    "payment_type": (Payment.payment_type, "payment_id"),
+    "fare_amount": (Payment.fare_amount, "payment_id"),
+    "extra": (Payment.extra, "payment_id"),
+    "tolls_amount": (Payment.tolls_amount, "payment_id"),
+    "total_amount": (Payment.total_amount, "payment_id"),
+    "mta_tax": (Fees.mta_tax, "fees_id"),
+    "improvement_surcharge": (Fees.improvement_surcharge, "fees_id"),
+    "airport_fee": (Fees.airport_fee, "fees_id"),
+    "cbd_congestion_fee": (Fees.cbd_congestion_fee, "fees_id"),
+}
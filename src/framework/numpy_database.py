@@ -0,0 +1,126 @@
+import logging
+import typing
+
+import numpy as np
+
+from .abstract_database import AbstractDatabase
+
+# Column name -> dtype, names match the Redis index aliases so the same
+# (index, Query) selectors can be evaluated against the arrays
+NUMPY_TRIP_COLUMNS: dict[str, typing.Any] = {
+    "vendor_id": np.float64,
+    "vendor_name": np.dtypes.StringDType(),
+    "pickup_time": np.float64,
+    "dropoff_time": np.float64,
+    "passenger_count": np.float64,
+    "distance": np.float64,
+    "rate_code_id": np.float64,
+    "fare_rate": np.dtypes.StringDType(),
+    "PULocationID": np.float64,
+    "DOLocationID": np.float64,
+    "payment_type": np.float64,
+    "fare_amount": np.float64,
+    "extra": np.float64,
+    "mta_tax": np.float64,
+    "tip_amount": np.float64,
+    "tolls_amount": np.float64,
+    "improvement_surcharge": np.float64,
+    "total_amount": np.float64,
+    "congestion_surcharge": np.float64,
+    "airport_fee": np.float64,
+    "cbd_congestion_fee": np.float64,
+}
+
+
+class ColumnarTable:
+    def __init__(self, column_types: dict[str, typing.Any]):
+        self.column_types = column_types
+        self.clear()
+
+    def clear(self) -> None:
+        self.columns: dict[str, np.ndarray] = {
+            name: np.empty(0, dtype=dtype)
+            for name, dtype in self.column_types.items()
+        }
+        self.ids = np.empty(0, dtype=np.int64)
+        # id -> row position, -1 for deleted ids
+        self.row_index = np.empty(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def next_id(self) -> int:
+        return len(self.row_index)
+
+    def append(self, columns: dict[str, np.ndarray]) -> np.ndarray:
+        rows_count = len(next(iter(columns.values())))
+        new_ids = np.arange(
+            self.next_id, self.next_id + rows_count, dtype=np.int64
+        )
+        for name, dtype in self.column_types.items():
+            self.columns[name] = np.concatenate(
+                [self.columns[name], np.asarray(columns[name], dtype=dtype)]
+            )
+        self.row_index = np.concatenate(
+            [self.row_index, np.arange(len(self), len(self) + rows_count)]
+        )
+        self.ids = np.concatenate([self.ids, new_ids])
+        return new_ids
+
+    def rows(self, ids: np.ndarray) -> np.ndarray:
+        return self.row_index[ids]
+
+    def compact(self, keep_mask: np.ndarray) -> None:
+        for name, column in self.columns.items():
+            self.columns[name] = column[keep_mask]
+        self.row_index[self.ids[~keep_mask]] = -1
+        self.ids = self.ids[keep_mask]
+        self.row_index[self.ids] = np.arange(len(self.ids))
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            sum(column.nbytes for column in self.columns.values())
+            + self.ids.nbytes
+            + self.row_index.nbytes
+        )
+
+
+class NumpyDatabase(AbstractDatabase):
+    __database_engine: typing.Optional[ColumnarTable] = None
+
+    @classmethod
+    def GetDatabaseEngine(cls) -> ColumnarTable:
+        # An empty table is falsy, so test for the instance itself
+        if cls.__database_engine is not None:
+            return cls.__database_engine
+
+        cls.__database_engine = ColumnarTable(NUMPY_TRIP_COLUMNS)
+        return cls.__database_engine
+
+    @classmethod
+    def FlushDatabase(cls) -> None:
+        cls.GetDatabaseEngine().clear()
+
+    @classmethod
+    def Reset(cls) -> None:
+        cls.__database_engine = None
+
+    @classmethod
+    def GetResourceSample(cls) -> dict[str, typing.Any]:
+        return {"memory_bytes": cls.GetDatabaseEngine().nbytes}
+
+    @classmethod
+    def GetStorageFootprint(cls) -> dict[str, typing.Any]:
+        trip_table = cls.GetDatabaseEngine()
+        trips_count = len(trip_table)
+        footprint = {
+            "database_size": trip_table.nbytes,
+            "trips_count": trips_count,
+            "bytes_per_trip": trip_table.nbytes / trips_count
+            if trips_count
+            else 0.0,
+        }
+        logging.info(f"NumPy storage footprint: {footprint}")
+        return footprint
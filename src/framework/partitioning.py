@@ -0,0 +1,122 @@
+import typing
+from datetime import datetime
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    ForeignKeyConstraint,
+    MetaData,
+    PrimaryKeyConstraint,
+    Table,
+)
+
+# Partitioned relation -> column holding the pickup (or meter) timestamp
+PARTITION_KEYS: dict[str, str] = {
+    "taxi_meter": "taxi_meter_date",
+    "trip": "pickup_date",
+    "trip_flat": "pickup_time",
+}
+
+# Partition keys the normalized relations do not have, the partitioned
+# copies get them as an extra column filled by the loader
+ADDED_PARTITION_KEYS: tuple[str, ...] = ("trip",)
+
+# Foreign keys into a partitioned relation must carry its partition key,
+# only the ones listed here can be kept
+PARTITIONED_FOREIGN_KEYS: dict[tuple[str, str], str] = {
+    ("trip", "pickup_id"): "pickup_date",
+}
+
+
+def _BuildPartitionedTable(
+    table: Table, partition_column: str, metadata: MetaData
+) -> Table:
+    primary_key_names = [column.name for column in table.primary_key.columns]
+    columns = [
+        Column(
+            column.name,
+            column.type,
+            nullable=False
+            if column.name == partition_column or column.primary_key
+            else column.nullable,
+            autoincrement=column is table.autoincrement_column,
+        )
+        for column in table.columns
+    ]
+    if table.name in ADDED_PARTITION_KEYS:
+        columns.append(Column(partition_column, DateTime(), nullable=False))
+    constraints: list[typing.Any] = [
+        PrimaryKeyConstraint(*primary_key_names, partition_column)
+    ]
+    for foreign_key in table.foreign_keys:
+        referenced_table = foreign_key.column.table.name
+        if referenced_table not in PARTITION_KEYS:
+            constraints.append(
+                ForeignKeyConstraint(
+                    [foreign_key.parent.name],
+                    [foreign_key.target_fullname],
+                    ondelete=foreign_key.ondelete,
+                )
+            )
+            continue
+        local_partition_column = PARTITIONED_FOREIGN_KEYS.get(
+            (table.name, foreign_key.parent.name)
+        )
+        if local_partition_column is not None:
+            constraints.append(
+                ForeignKeyConstraint(
+                    [foreign_key.parent.name, local_partition_column],
+                    [
+                        foreign_key.target_fullname,
+                        f"{referenced_table}.{PARTITION_KEYS[referenced_table]}",
+                    ],
+                    ondelete=foreign_key.ondelete,
+                )
+            )
+    return Table(
+        table.name,
+        metadata,
+        *columns,
+        *constraints,
+        postgresql_partition_by=f"RANGE ({partition_column})",
+    )
+
+
+def BuildPartitionedMetadata(tables: list[Table]) -> MetaData:
+    metadata = MetaData()
+    for table in tables:
+        if table.name in PARTITION_KEYS:
+            _BuildPartitionedTable(table, PARTITION_KEYS[table.name], metadata)
+        else:
+            table.to_metadata(metadata)
+    return metadata
+
+
+def GetMonthStart(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1)
+
+
+def GetNextMonthStart(moment: datetime) -> datetime:
+    if moment.month == 12:
+        return datetime(moment.year + 1, 1, 1)
+    return datetime(moment.year, moment.month + 1, 1)
+
+
+def GetMonthPartitionName(relation: str, month: datetime) -> str:
+    return f"{relation}_{month:%Y_%m}"
+
+
+def GetDefaultPartitionStatement(relation: str) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {relation}_default "
+        f"PARTITION OF {relation} DEFAULT"
+    )
+
+
+def GetMonthPartitionStatement(relation: str, month: datetime) -> str:
+    month_start = GetMonthStart(month)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {GetMonthPartitionName(relation, month_start)} "
+        f"PARTITION OF {relation} FOR VALUES "
+        f"FROM ('{month_start:%Y-%m-%d}') TO ('{GetNextMonthStart(month_start):%Y-%m-%d}')"
+    )
@@ -0,0 +1,181 @@
+import contextlib
+import functools
+import logging
+import os
+import re
+import shutil
+import signal
+import subprocess
+import time
+import typing
+from collections import defaultdict
+
+METHOD_TYPE = typing.TypeVar(
+    "METHOD_TYPE", bound=typing.Callable[..., typing.Any]
+)
+
+DISABLED_PHASE: typing.ContextManager[None] = contextlib.nullcontext()
+
+
+class PhaseProfiler:
+    __enabled: bool = False
+    __operation_depth: int = 0
+    __operations_count: int = 0
+    __operations_seconds: float = 0.0
+    __phase_seconds: dict[str, float] = defaultdict(float)
+    __phase_calls: dict[str, int] = defaultdict(int)
+    __server_execution_baseline: typing.Optional[float] = None
+    __flamegraph_test_pattern: typing.Optional[str] = None
+    __flamegraph_directory: str = "."
+
+    @classmethod
+    def SetEnabled(cls, enabled: bool) -> None:
+        cls.__enabled = enabled
+
+    @classmethod
+    def IsEnabled(cls) -> bool:
+        return cls.__enabled
+
+    @classmethod
+    def SetFlamegraphCapture(
+        cls, test_pattern: typing.Optional[str], output_directory: str
+    ) -> None:
+        cls.__flamegraph_test_pattern = test_pattern
+        cls.__flamegraph_directory = output_directory
+
+    @classmethod
+    def Reset(
+        cls, server_execution_seconds: typing.Optional[float] = None
+    ) -> None:
+        cls.__operation_depth = 0
+        cls.__operations_count = 0
+        cls.__operations_seconds = 0.0
+        cls.__phase_seconds.clear()
+        cls.__phase_calls.clear()
+        cls.__server_execution_baseline = server_execution_seconds
+
+    @classmethod
+    def Phase(cls, phase_name: str) -> typing.ContextManager[None]:
+        # Phases wrap every handler step, when disabled they cost one shared
+        # null context instead of a generator per call
+        if not cls.__enabled:
+            return DISABLED_PHASE
+        return cls.__TimedPhase(phase_name)
+
+    @classmethod
+    @contextlib.contextmanager
+    def __TimedPhase(cls, phase_name: str) -> typing.Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            cls.__phase_seconds[phase_name] += time.perf_counter() - start
+            cls.__phase_calls[phase_name] += 1
+
+    @classmethod
+    @contextlib.contextmanager
+    def Operation(cls) -> typing.Iterator[None]:
+        # Handler operations call each other (update reads first), only the
+        # outermost one is counted
+        cls.__operation_depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            cls.__operation_depth -= 1
+            if cls.__operation_depth == 0:
+                cls.__operations_seconds += time.perf_counter() - start
+                cls.__operations_count += 1
+
+    @classmethod
+    def GetReport(
+        cls, server_execution_seconds: typing.Optional[float] = None
+    ) -> dict[str, typing.Any]:
+        operations_count = max(cls.__operations_count, 1)
+        report: dict[str, typing.Any] = {
+            "operations_count": cls.__operations_count,
+            "operation_seconds": cls.__operations_seconds / operations_count,
+            "phase_seconds": {
+                phase_name: seconds / operations_count
+                for phase_name, seconds in cls.__phase_seconds.items()
+            },
+            "phase_calls": {
+                phase_name: calls / operations_count
+                for phase_name, calls in cls.__phase_calls.items()
+            },
+        }
+        if (
+            server_execution_seconds is not None
+            and cls.__server_execution_baseline is not None
+        ):
+            server_seconds = (
+                server_execution_seconds - cls.__server_execution_baseline
+            ) / operations_count
+            report["server_execution_seconds"] = server_seconds
+            if "wire" in report["phase_seconds"]:
+                report["network_and_driver_seconds"] = max(
+                    report["phase_seconds"]["wire"] - server_seconds, 0.0
+                )
+        return report
+
+    @classmethod
+    def StartFlamegraphCapture(
+        cls, test_name: str
+    ) -> typing.Optional[tuple[subprocess.Popen[bytes], str]]:
+        if (
+            cls.__flamegraph_test_pattern is None
+            or cls.__flamegraph_test_pattern not in test_name
+        ):
+            return None
+        py_spy_path = shutil.which("py-spy")
+        if py_spy_path is None:
+            logging.warning("py-spy is not installed, no flamegraph captured.")
+            return None
+        os.makedirs(cls.__flamegraph_directory, exist_ok=True)
+        flamegraph_path = os.path.join(
+            cls.__flamegraph_directory,
+            re.sub(r"[^\w.-]+", "_", test_name).strip("_") + ".svg",
+        )
+        py_spy_process = subprocess.Popen(
+            [
+                py_spy_path,
+                "record",
+                "--pid",
+                str(os.getpid()),
+                "--output",
+                flamegraph_path,
+                "--format",
+                "flamegraph",
+            ]
+        )
+        # Give py-spy time to attach before the benchmark starts
+        time.sleep(0.5)
+        return py_spy_process, flamegraph_path
+
+    @classmethod
+    def StopFlamegraphCapture(
+        cls, flamegraph_capture: tuple[subprocess.Popen[bytes], str]
+    ) -> typing.Optional[str]:
+        py_spy_process, flamegraph_path = flamegraph_capture
+        # py-spy writes the flamegraph when interrupted
+        py_spy_process.send_signal(signal.SIGINT)
+        try:
+            py_spy_process.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            py_spy_process.kill()
+        if not os.path.exists(flamegraph_path):
+            logging.warning(f"py-spy did not write {flamegraph_path}.")
+            return None
+        logging.info(f"Flamegraph written to {flamegraph_path}")
+        return flamegraph_path
+
+
+def ProfiledOperation(method: METHOD_TYPE) -> METHOD_TYPE:
+    @functools.wraps(method)
+    def ProfiledMethod(*args: typing.Any, **kwargs: typing.Any) -> typing.Any:
+        if not PhaseProfiler.IsEnabled():
+            return method(*args, **kwargs)
+        with PhaseProfiler.Operation():
+            return method(*args, **kwargs)
+
+    return typing.cast(METHOD_TYPE, ProfiledMethod)
@@ -0,0 +1,238 @@
+import logging
+import typing
+
+from sqlalchemy import (
+    Column,
+    Engine,
+    Float,
+    Integer,
+    MetaData,
+    Table,
+    cast,
+    create_engine,
+    text,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql.elements import ColumnElement
+
+from .abstract_database import AbstractDatabase, WaitForDatabaseReady
+from .postgres_database import (
+    CreatePostgresExtension,
+    EnablePostgresStatementStatistics,
+    EvictPostgresCaches,
+    GetPostgresServerExecutionSeconds,
+    PostgresDatabase,
+    PostgresDurabilityProfile,
+    PrewarmPostgresRelations,
+    SamplePostgresResources,
+    SetPostgresTablesLogged,
+)
+
+# Document keys of the fields CreateNycTaxiRedisSchema indexes under another
+# alias, all other aliases are the document keys themselves
+DOCUMENT_FIELD_KEYS: dict[str, str] = {
+    "pickup_time": "pickup_timestamp",
+    "dropoff_time": "dropoff_timestamp",
+}
+
+DOCUMENT_TAG_FIELDS = ("vendor_name", "fare_rate")
+
+DOCUMENT_NUMERIC_FIELDS = (
+    "pickup_time",
+    "dropoff_time",
+    "passenger_count",
+    "distance",
+    "rate_code_id",
+    "PULocationID",
+    "DOLocationID",
+    "payment_type",
+    "fare_amount",
+    "extra",
+    "mta_tax",
+    "tip_amount",
+    "tolls_amount",
+    "improvement_surcharge",
+    "total_amount",
+    "congestion_surcharge",
+    "airport_fee",
+    "cbd_congestion_fee",
+)
+
+# Documents live outside BaseOrmType.metadata, JSONB only exists in Postgres
+DOCUMENT_METADATA = MetaData()
+
+TripDocument = Table(
+    "trip_document",
+    DOCUMENT_METADATA,
+    Column("id", Integer, primary_key=True, autoincrement=False),
+    Column("document", JSONB, nullable=False),
+)
+
+
+def GetDocumentFieldKey(field: str) -> str:
+    return DOCUMENT_FIELD_KEYS.get(field, field)
+
+
+def GetDocumentField(
+    document: ColumnElement[typing.Any], field: str
+) -> ColumnElement[typing.Any]:
+    # Must compile to the expressions of TRIP_DOCUMENT_INDEXES, or the
+    # planner can not use them
+    field_value = document[GetDocumentFieldKey(field)].astext
+    if field in DOCUMENT_TAG_FIELDS:
+        return field_value
+    return cast(field_value, Float)
+
+
+# The GIN index serves exact tag matches (document @> ...), the expression
+# indexes numeric ranges, sorting and tag prefixes
+TRIP_DOCUMENT_INDEXES: list[str] = [
+    "CREATE INDEX IF NOT EXISTS ix_trip_document_document ON trip_document "
+    "USING gin (document jsonb_path_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_trip_document_vendor_name ON trip_document "
+    "((document ->> 'vendor_name') text_pattern_ops)",
+] + [
+    f"CREATE INDEX IF NOT EXISTS ix_trip_document_{field} ON trip_document "
+    f"(((document ->> '{GetDocumentFieldKey(field)}')::float8))"
+    for field in DOCUMENT_NUMERIC_FIELDS
+]
+
+
+class PostgresDocumentDatabase(AbstractDatabase):
+    __database_engine: typing.Optional[Engine] = None
+    __host: str = "127.0.0.1"
+    __port: int = 5432
+    __buffer_eviction: bool = False
+    __prewarm: bool = False
+    __statement_statistics: bool = False
+
+    @classmethod
+    def GetDatabaseEngine(cls) -> Engine:
+        if cls.__database_engine:
+            return cls.__database_engine
+
+        database_username, database_password, database_name = (
+            PostgresDatabase.GetCredentials()
+        )
+        cls.__database_engine = create_engine(
+            f"postgresql://{database_username}:{database_password}@{cls.__host}:{cls.__port}/{database_name}"
+        )
+        cls.__WaitForDatabaseReady()
+        DOCUMENT_METADATA.create_all(cls.__database_engine)
+        with cls.__database_engine.begin() as connection:
+            for statement in TRIP_DOCUMENT_INDEXES:
+                logging.debug(f"Creating index with: {statement}")
+                connection.execute(text(statement))
+        cls.__statement_statistics = EnablePostgresStatementStatistics(
+            cls.__database_engine
+        )
+        cls.__buffer_eviction = CreatePostgresExtension(
+            cls.__database_engine, "pg_buffercache"
+        )
+        cls.__prewarm = CreatePostgresExtension(
+            cls.__database_engine, "pg_prewarm"
+        )
+        return cls.__database_engine
+
+    @classmethod
+    def SetAddress(cls, host: str, port: typing.Optional[int] = None) -> None:
+        cls.__host = host
+        if port is not None:
+            cls.__port = port
+
+    @classmethod
+    def GetAddress(cls) -> tuple[str, int]:
+        return cls.__host, cls.__port
+
+    @classmethod
+    def GetServerSettings(cls) -> dict[str, str]:
+        # Same server as the relational Postgres, with its durability profile
+        return PostgresDatabase.GetServerSettings()
+
+    @classmethod
+    def GetBenchmarkDimensions(cls) -> dict[str, typing.Any]:
+        return {
+            "durability_profile": PostgresDatabase.GetDurabilityProfile().value
+        }
+
+    @classmethod
+    def FlushDatabase(cls) -> None:
+        with cls.GetDatabaseEngine().begin() as connection:
+            connection.execute(text(f"TRUNCATE TABLE {TripDocument.name}"))
+
+    @classmethod
+    def GetResourceSample(cls) -> dict[str, typing.Any]:
+        return SamplePostgresResources(
+            cls.GetDatabaseEngine(), cls.__statement_statistics
+        )
+
+    @classmethod
+    def GetServerExecutionSeconds(cls) -> typing.Optional[float]:
+        return GetPostgresServerExecutionSeconds(
+            cls.GetDatabaseEngine(), cls.__statement_statistics
+        )
+
+    @classmethod
+    def GetStorageFootprint(cls) -> dict[str, typing.Any]:
+        with cls.GetDatabaseEngine().connect() as connection:
+            table_size, indexes_size, trips_count = connection.execute(
+                text(
+                    "SELECT pg_table_size(CAST(:relation_name AS regclass)), "
+                    "pg_indexes_size(CAST(:relation_name AS regclass)), "
+                    f"(SELECT count(*) FROM {TripDocument.name})"
+                ),
+                {"relation_name": TripDocument.name},
+            ).one()
+        total_relation_size = int(table_size) + int(indexes_size)
+        footprint = {
+            "table_size": int(table_size),
+            "indexes_size": int(indexes_size),
+            "total_relation_size": total_relation_size,
+            "trips_count": int(trips_count),
+            "bytes_per_trip": total_relation_size / trips_count
+            if trips_count
+            else 0.0,
+        }
+        logging.info(f"PostgreSQL JSONB storage footprint: {footprint}")
+        return footprint
+
+    @classmethod
+    def PrepareForLoad(cls) -> None:
+        # The durability profile is shared with the relational Postgres runs
+        if (
+            PostgresDatabase.GetDurabilityProfile()
+            != PostgresDurabilityProfile.UNLOGGED_LOAD
+        ):
+            return
+        SetPostgresTablesLogged(cls.GetDatabaseEngine(), [TripDocument], False)
+
+    @classmethod
+    def FinishLoad(cls) -> None:
+        if (
+            PostgresDatabase.GetDurabilityProfile()
+            != PostgresDurabilityProfile.UNLOGGED_LOAD
+        ):
+            return
+        SetPostgresTablesLogged(cls.GetDatabaseEngine(), [TripDocument], True)
+
+    @classmethod
+    def EvictCaches(cls) -> None:
+        EvictPostgresCaches(cls.GetDatabaseEngine(), cls.__buffer_eviction)
+
+    @classmethod
+    def PrewarmCaches(cls) -> None:
+        PrewarmPostgresRelations(
+            cls.GetDatabaseEngine(), cls.__prewarm, [TripDocument.name]
+        )
+
+    @classmethod
+    def Reset(cls) -> None:
+        cls.__database_engine = None
+
+    @classmethod
+    def __WaitForDatabaseReady(cls) -> None:
+        def ProbeDatabase() -> None:
+            with cls.__database_engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+
+        WaitForDatabaseReady("PostgreSQL", ProbeDatabase)
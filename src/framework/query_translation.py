@@ -0,0 +1,728 @@
+import math
+import re
+import typing
+from datetime import datetime, timezone
+
+import numpy as np
+from redis.commands.search.aggregation import AggregateRequest
+from redis.commands.search.query import Query
+from sqlalchemy import (
+    DateTime,
+    Float,
+    FromClause,
+    Select,
+    and_,
+    func,
+    literal_column,
+    or_,
+    select,
+    true,
+)
+from sqlalchemy.sql.elements import ColumnElement
+
+
+class MatchAll(typing.NamedTuple):
+    pass
+
+
+class NumericRange(typing.NamedTuple):
+    field: str
+    low: float
+    high: float
+    low_inclusive: bool
+    high_inclusive: bool
+
+
+class TagMatch(typing.NamedTuple):
+    field: str
+    values: tuple[str, ...]
+
+
+class Conjunction(typing.NamedTuple):
+    children: tuple["QueryNode", ...]
+
+
+class Disjunction(typing.NamedTuple):
+    children: tuple["QueryNode", ...]
+
+
+QueryNode = typing.Union[
+    MatchAll, NumericRange, TagMatch, Conjunction, Disjunction
+]
+
+QUERY_TOKEN_PATTERN = re.compile(
+    r"\s*(?:"
+    r"(?P<numeric>@(?P<numeric_field>\w+):\[\s*(?P<low>\(?[^\s\]]+)\s+(?P<high>\(?[^\s\]]+)\s*\])"
+    r"|(?P<tag>@(?P<tag_field>\w+):\{(?P<tag_values>[^}]*)\})"
+    r"|(?P<symbol>[()|*])"
+    r")"
+)
+
+
+def _ParseNumericBound(bound: str) -> tuple[float, bool]:
+    exclusive = bound.startswith("(")
+    return float(bound.lstrip("(")), not exclusive
+
+
+def _TokenizeRedisQuery(query_string: str) -> list[typing.Any]:
+    tokens: list[typing.Any] = []
+    position = 0
+    query_string = query_string.strip()
+    while position < len(query_string):
+        match = QUERY_TOKEN_PATTERN.match(query_string, position)
+        if match is None or match.end() == position:
+            raise ValueError(
+                f"Unsupported Redis query syntax at {position}: {query_string}"
+            )
+        if match.group("numeric"):
+            low, low_inclusive = _ParseNumericBound(match.group("low"))
+            high, high_inclusive = _ParseNumericBound(match.group("high"))
+            tokens.append(
+                NumericRange(
+                    match.group("numeric_field"),
+                    low,
+                    high,
+                    low_inclusive,
+                    high_inclusive,
+                )
+            )
+        elif match.group("tag"):
+            tokens.append(
+                TagMatch(
+                    match.group("tag_field"),
+                    tuple(
+                        value.strip()
+                        for value in match.group("tag_values").split("|")
+                    ),
+                )
+            )
+        else:
+            tokens.append(match.group("symbol"))
+        position = match.end()
+        while position < len(query_string) and query_string[position].isspace():
+            position += 1
+    return tokens
+
+
+class _RedisQueryParser:
+    def __init__(self, tokens: list[typing.Any]):
+        self.tokens = tokens
+        self.position = 0
+
+    def _peek(self) -> typing.Any:
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return None
+
+    def _next(self) -> typing.Any:
+        token = self._peek()
+        self.position += 1
+        return token
+
+    def parse(self) -> QueryNode:
+        node = self._parse_disjunction()
+        if self._peek() is not None:
+            raise ValueError(f"Unexpected token in Redis query: {self._peek()}")
+        return node
+
+    def _parse_disjunction(self) -> QueryNode:
+        children = [self._parse_conjunction()]
+        while self._peek() == "|":
+            self._next()
+            children.append(self._parse_conjunction())
+        return children[0] if len(children) == 1 else Disjunction(tuple(children))
+
+    def _parse_conjunction(self) -> QueryNode:
+        children: list[QueryNode] = []
+        while self._peek() not in (None, "|", ")"):
+            children.append(self._parse_atom())
+        if not children:
+            raise ValueError("Empty expression in Redis query.")
+        return children[0] if len(children) == 1 else Conjunction(tuple(children))
+
+    def _parse_atom(self) -> QueryNode:
+        token = self._next()
+        if token == "*":
+            return MatchAll()
+        if token == "(":
+            node = self._parse_disjunction()
+            if self._next() != ")":
+                raise ValueError("Unbalanced parentheses in Redis query.")
+            return node
+        if isinstance(token, (NumericRange, TagMatch)):
+            return token
+        raise ValueError(f"Unexpected token in Redis query: {token}")
+
+
+def ParseRedisQuery(query_string: str) -> QueryNode:
+    return _RedisQueryParser(_TokenizeRedisQuery(query_string)).parse()
+
+
+def GetRedisQuerySortBy(query: Query) -> typing.Optional[tuple[str, bool]]:
+    sort_by = getattr(query, "_sortby", None)
+    if sort_by is None:
+        return None
+    field, direction = sort_by.args
+    return field, direction == "ASC"
+
+
+class AggregateApply(typing.NamedTuple):
+    alias: str
+    expression: str
+
+
+class AggregateReducer(typing.NamedTuple):
+    function: str
+    field: typing.Optional[str]
+    alias: str
+
+
+class AggregatePipeline(typing.NamedTuple):
+    query: QueryNode
+    applies: tuple[AggregateApply, ...]
+    group_by: tuple[str, ...]
+    reducers: tuple[AggregateReducer, ...]
+    sort_by: tuple[tuple[str, bool], ...]
+    limit: typing.Optional[tuple[int, int]]
+
+
+# Timestamps are truncated to these units by APPLY functions of the same name
+AGGREGATE_TIME_UNITS: dict[str, int] = {"hour": 3600, "day": 86400}
+
+AGGREGATE_REDUCERS = ("COUNT", "SUM", "AVG", "MIN", "MAX")
+
+APPLY_FUNCTION_PATTERN = re.compile(r"^\s*(\w+)\(\s*@(\w+)\s*\)\s*$")
+
+APPLY_ARITHMETIC_PATTERN = re.compile(
+    r"^\s*(@\w+|[\d.]+)\s*([-+*/])\s*(@\w+|[\d.]+)\s*$"
+)
+
+
+def _StripFieldPrefix(field: str) -> str:
+    return field[1:] if field.startswith("@") else field
+
+
+def ParseRedisAggregateRequest(
+    aggregate_request: AggregateRequest,
+) -> AggregatePipeline:
+    # Covers one GROUPBY with the COUNT/SUM/AVG/MIN/MAX reducers, APPLY steps
+    # before it and SORTBY/LIMIT after it
+    query_string, *arguments = aggregate_request.build_args()
+    applies: list[AggregateApply] = []
+    group_by: typing.Optional[tuple[str, ...]] = None
+    reducers: list[AggregateReducer] = []
+    sort_by: list[tuple[str, bool]] = []
+    limit: typing.Optional[tuple[int, int]] = None
+    position = 0
+    while position < len(arguments):
+        keyword = arguments[position].upper()
+        match keyword:
+            case "SCORER" | "DIALECT":
+                position += 2
+            case "LOAD":
+                position += 2 + int(arguments[position + 1])
+            case "APPLY" if group_by is None:
+                applies.append(
+                    AggregateApply(
+                        arguments[position + 3], arguments[position + 1]
+                    )
+                )
+                position += 4
+            case "GROUPBY" if group_by is None:
+                fields_count = int(arguments[position + 1])
+                group_by = tuple(
+                    _StripFieldPrefix(field)
+                    for field in arguments[
+                        position + 2 : position + 2 + fields_count
+                    ]
+                )
+                position += 2 + fields_count
+            case "REDUCE" if group_by is not None:
+                function = arguments[position + 1].upper()
+                arguments_count = int(arguments[position + 2])
+                if function not in AGGREGATE_REDUCERS or arguments_count > 1:
+                    raise ValueError(f"Unsupported reducer: {function}")
+                field = (
+                    _StripFieldPrefix(arguments[position + 3])
+                    if arguments_count
+                    else None
+                )
+                position += 3 + arguments_count
+                alias = f"__generated_alias{function.lower()}{field or ''}"
+                if (
+                    position < len(arguments)
+                    and arguments[position].upper() == "AS"
+                ):
+                    alias = arguments[position + 1]
+                    position += 2
+                reducers.append(AggregateReducer(function, field, alias))
+            case "SORTBY":
+                sort_arguments_count = int(arguments[position + 1])
+                sort_arguments = arguments[
+                    position + 2 : position + 2 + sort_arguments_count
+                ]
+                for sort_position, sort_argument in enumerate(sort_arguments):
+                    if sort_argument.upper() in ("ASC", "DESC"):
+                        continue
+                    direction = (
+                        sort_arguments[sort_position + 1].upper()
+                        if sort_position + 1 < len(sort_arguments)
+                        else "ASC"
+                    )
+                    sort_by.append(
+                        (_StripFieldPrefix(sort_argument), direction != "DESC")
+                    )
+                position += 2 + sort_arguments_count
+            case "LIMIT":
+                limit = (
+                    int(arguments[position + 1]),
+                    int(arguments[position + 2]),
+                )
+                position += 3
+            case _:
+                raise ValueError(
+                    f"Unsupported aggregation step {keyword} in: "
+                    f"{aggregate_request.build_args()}"
+                )
+    return AggregatePipeline(
+        ParseRedisQuery(query_string),
+        tuple(applies),
+        group_by or (),
+        tuple(reducers),
+        tuple(sort_by),
+        limit,
+    )
+
+
+# Partial reducers every shard runs, AVG is rebuilt from a SUM and a COUNT
+SHARD_PARTIAL_SUFFIXES = ("__sum", "__count")
+
+
+def BuildShardAggregateArguments(
+    aggregate_request: AggregateRequest, pipeline: AggregatePipeline
+) -> list[str]:
+    # Query, LOAD and APPLY steps run unchanged, the groups are returned
+    # unsorted and unlimited so they can be merged
+    arguments = aggregate_request.build_args()
+    shard_arguments = arguments[: arguments.index("GROUPBY")]
+    shard_arguments += [
+        "GROUPBY",
+        str(len(pipeline.group_by)),
+        *(f"@{field}" for field in pipeline.group_by),
+    ]
+    for reducer in pipeline.reducers:
+        match reducer.function:
+            case "COUNT":
+                shard_arguments += ["REDUCE", "COUNT", "0", "AS", reducer.alias]
+            case "AVG":
+                sum_suffix, count_suffix = SHARD_PARTIAL_SUFFIXES
+                shard_arguments += [
+                    "REDUCE",
+                    "SUM",
+                    "1",
+                    f"@{reducer.field}",
+                    "AS",
+                    f"{reducer.alias}{sum_suffix}",
+                    "REDUCE",
+                    "COUNT",
+                    "0",
+                    "AS",
+                    f"{reducer.alias}{count_suffix}",
+                ]
+            case _:
+                shard_arguments += [
+                    "REDUCE",
+                    reducer.function,
+                    "1",
+                    f"@{reducer.field}",
+                    "AS",
+                    reducer.alias,
+                ]
+    return shard_arguments
+
+
+def _FormatRedisNumber(value: float) -> str:
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _GetRedisSortKey(value: typing.Optional[str]) -> tuple[int, typing.Any]:
+    # Numbers sort numerically, before strings, missing values go last
+    if value is None:
+        return 2, ""
+    try:
+        return 0, float(value)
+    except ValueError:
+        return 1, value
+
+
+def MergeShardAggregateRows(
+    pipeline: AggregatePipeline,
+    shard_rows: typing.Iterable[dict[str, str]],
+) -> list[dict[str, str]]:
+    # Partial groups are re-reduced per group key, values stay strings as
+    # in a single instance reply
+    merged_groups: dict[tuple[typing.Optional[str], ...], dict[str, float]] = {}
+    for row in shard_rows:
+        group_key = tuple(row.get(field) for field in pipeline.group_by)
+        merged_values = merged_groups.setdefault(group_key, {})
+        for reducer in pipeline.reducers:
+            partial_aliases = (
+                [reducer.alias + suffix for suffix in SHARD_PARTIAL_SUFFIXES]
+                if reducer.function == "AVG"
+                else [reducer.alias]
+            )
+            for partial_alias in partial_aliases:
+                if row.get(partial_alias) is None:
+                    continue
+                value = float(row[partial_alias])
+                if partial_alias not in merged_values:
+                    merged_values[partial_alias] = value
+                elif reducer.function == "MIN":
+                    merged_values[partial_alias] = min(
+                        merged_values[partial_alias], value
+                    )
+                elif reducer.function == "MAX":
+                    merged_values[partial_alias] = max(
+                        merged_values[partial_alias], value
+                    )
+                else:
+                    merged_values[partial_alias] += value
+    merged_rows: list[dict[str, str]] = []
+    for group_key, merged_values in merged_groups.items():
+        merged_row = {
+            field: value
+            for field, value in zip(pipeline.group_by, group_key)
+            if value is not None
+        }
+        for reducer in pipeline.reducers:
+            if reducer.function == "AVG":
+                sum_suffix, count_suffix = SHARD_PARTIAL_SUFFIXES
+                values_count = merged_values.get(reducer.alias + count_suffix)
+                if values_count:
+                    merged_row[reducer.alias] = _FormatRedisNumber(
+                        merged_values[reducer.alias + sum_suffix] / values_count
+                    )
+            elif reducer.alias in merged_values:
+                merged_row[reducer.alias] = _FormatRedisNumber(
+                    merged_values[reducer.alias]
+                )
+        merged_rows.append(merged_row)
+    # Sorting is stable, the keys are applied from the last to the first
+    for field, ascending in reversed(pipeline.sort_by):
+        merged_rows.sort(
+            key=lambda merged_row: _GetRedisSortKey(merged_row.get(field)),
+            reverse=not ascending,
+        )
+    if pipeline.limit is not None:
+        offset, rows_count = pipeline.limit
+        merged_rows = merged_rows[offset : offset + rows_count]
+    return merged_rows
+
+
+def _ToColumnBound(column: ColumnElement[typing.Any], bound: float) -> typing.Any:
+    if isinstance(column.type, DateTime):
+        return datetime.fromtimestamp(bound, timezone.utc).replace(tzinfo=None)
+    return bound
+
+
+def CompileSqlPredicate(
+    node: QueryNode,
+    resolve_column: typing.Callable[[str], ColumnElement[typing.Any]],
+    match_tag: typing.Optional[
+        typing.Callable[[str, str], ColumnElement[bool]]
+    ] = None,
+) -> ColumnElement[bool]:
+    match node:
+        case MatchAll():
+            return true()
+        case NumericRange(field, low, high, low_inclusive, high_inclusive):
+            column = resolve_column(field)
+            conditions: list[ColumnElement[bool]] = []
+            if not math.isinf(low):
+                low_bound = _ToColumnBound(column, low)
+                conditions.append(
+                    column >= low_bound if low_inclusive else column > low_bound
+                )
+            if not math.isinf(high):
+                high_bound = _ToColumnBound(column, high)
+                conditions.append(
+                    column <= high_bound if high_inclusive else column < high_bound
+                )
+            return and_(true(), *conditions)
+        case TagMatch(field, values):
+            column = resolve_column(field)
+            return or_(
+                *(
+                    column.like(f"{value[:-1]}%")
+                    if value.endswith("*")
+                    else match_tag(field, value)
+                    if match_tag is not None
+                    else column == value
+                    for value in values
+                )
+            )
+        case Conjunction(children):
+            return and_(
+                *(
+                    CompileSqlPredicate(child, resolve_column, match_tag)
+                    for child in children
+                )
+            )
+        case Disjunction(children):
+            return or_(
+                *(
+                    CompileSqlPredicate(child, resolve_column, match_tag)
+                    for child in children
+                )
+            )
+    raise ValueError(f"Unsupported Redis query node: {node}")
+
+
+def CompileNumpyMask(
+    node: QueryNode,
+    resolve_column: typing.Callable[[str], np.ndarray],
+    rows_count: int,
+) -> np.ndarray:
+    match node:
+        case MatchAll():
+            return np.ones(rows_count, dtype=bool)
+        case NumericRange(field, low, high, low_inclusive, high_inclusive):
+            column = resolve_column(field)
+            mask = np.ones(rows_count, dtype=bool)
+            if not math.isinf(low):
+                mask &= column >= low if low_inclusive else column > low
+            if not math.isinf(high):
+                mask &= column <= high if high_inclusive else column < high
+            return mask
+        case TagMatch(field, values):
+            column = resolve_column(field)
+            mask = np.zeros(rows_count, dtype=bool)
+            for value in values:
+                mask |= (
+                    np.strings.startswith(column, value[:-1])
+                    if value.endswith("*")
+                    else column == value
+                )
+            return mask
+        case Conjunction(children):
+            return np.logical_and.reduce(
+                [
+                    CompileNumpyMask(child, resolve_column, rows_count)
+                    for child in children
+                ]
+            )
+        case Disjunction(children):
+            return np.logical_or.reduce(
+                [
+                    CompileNumpyMask(child, resolve_column, rows_count)
+                    for child in children
+                ]
+            )
+    raise ValueError(f"Unsupported Redis query node: {node}")
+
+
+def _CompileSqlApply(
+    expression: str,
+    resolve_value: typing.Callable[[str], ColumnElement[typing.Any]],
+) -> ColumnElement[typing.Any]:
+    function_match = APPLY_FUNCTION_PATTERN.match(expression)
+    if function_match and function_match.group(1) in AGGREGATE_TIME_UNITS:
+        unit, field = function_match.groups()
+        value = resolve_value(field)
+        # Units are rendered inline so SELECT and GROUP BY share one
+        # expression
+        if isinstance(value.type, DateTime):
+            return func.date_trunc(literal_column(f"'{unit}'"), value)
+        unit_seconds = literal_column(str(AGGREGATE_TIME_UNITS[unit]), Float)
+        return func.floor(value / unit_seconds) * unit_seconds
+    arithmetic_match = APPLY_ARITHMETIC_PATTERN.match(expression)
+    if arithmetic_match is None:
+        raise ValueError(f"Unsupported APPLY expression: {expression}")
+    left_operand, operator, right_operand = arithmetic_match.groups()
+    left, right = (
+        resolve_value(_StripFieldPrefix(operand))
+        if operand.startswith("@")
+        else literal_column(operand, Float)
+        for operand in (left_operand, right_operand)
+    )
+    match operator:
+        case "+":
+            return left + right
+        case "-":
+            return left - right
+        case "*":
+            return left * right
+        case _:
+            # Division by zero is null in the SQL result, not an error
+            return left / func.nullif(right, 0, type_=right.type)
+
+
+def CompileSqlAggregate(
+    pipeline: AggregatePipeline,
+    relation: FromClause,
+    resolve_column: typing.Callable[[str], ColumnElement[typing.Any]],
+    match_tag: typing.Optional[
+        typing.Callable[[str, str], ColumnElement[bool]]
+    ] = None,
+) -> Select[typing.Any]:
+    applied_values: dict[str, ColumnElement[typing.Any]] = {}
+
+    def ResolveValue(field: str) -> ColumnElement[typing.Any]:
+        if field in applied_values:
+            return applied_values[field]
+        return resolve_column(field)
+
+    for apply in pipeline.applies:
+        applied_values[apply.alias] = _CompileSqlApply(
+            apply.expression, ResolveValue
+        )
+    group_values = [ResolveValue(field) for field in pipeline.group_by]
+    output_columns = {
+        field: value.label(field)
+        for field, value in zip(pipeline.group_by, group_values)
+    }
+    for reducer in pipeline.reducers:
+        if reducer.function == "COUNT":
+            reduced_value = func.count()
+        else:
+            reduced_value = getattr(func, reducer.function.lower())(
+                ResolveValue(reducer.field)  # type: ignore
+            )
+        output_columns[reducer.alias] = reduced_value.label(reducer.alias)
+    aggregate_query = (
+        select(*output_columns.values())
+        .select_from(relation)
+        .where(CompileSqlPredicate(pipeline.query, resolve_column, match_tag))
+        .group_by(*group_values)
+        .order_by(
+            *(
+                output_columns[field].asc()
+                if ascending
+                else output_columns[field].desc()
+                for field, ascending in pipeline.sort_by
+            )
+        )
+    )
+    if pipeline.limit is not None:
+        offset, rows_count = pipeline.limit
+        aggregate_query = aggregate_query.offset(offset).limit(rows_count)
+    return aggregate_query
+
+
+def _EvaluateNumpyApply(
+    expression: str, resolve_value: typing.Callable[[str], np.ndarray]
+) -> np.ndarray:
+    function_match = APPLY_FUNCTION_PATTERN.match(expression)
+    if function_match and function_match.group(1) in AGGREGATE_TIME_UNITS:
+        unit, field = function_match.groups()
+        unit_seconds = AGGREGATE_TIME_UNITS[unit]
+        return np.floor(resolve_value(field) / unit_seconds) * unit_seconds
+    arithmetic_match = APPLY_ARITHMETIC_PATTERN.match(expression)
+    if arithmetic_match is None:
+        raise ValueError(f"Unsupported APPLY expression: {expression}")
+    left_operand, operator, right_operand = arithmetic_match.groups()
+    left, right = (
+        resolve_value(_StripFieldPrefix(operand)).astype(np.float64)
+        if operand.startswith("@")
+        else np.float64(operand)
+        for operand in (left_operand, right_operand)
+    )
+    match operator:
+        case "+":
+            return left + right
+        case "-":
+            return left - right
+        case "*":
+            return left * right
+        case _:
+            # Division by zero is NaN, like the null of the SQL translation
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return np.where(right != 0, left / right, np.nan)
+
+
+def EvaluateNumpyAggregate(
+    pipeline: AggregatePipeline,
+    resolve_column: typing.Callable[[str], np.ndarray],
+    rows_count: int,
+) -> dict[str, np.ndarray]:
+    mask = CompileNumpyMask(pipeline.query, resolve_column, rows_count)
+    applied_values: dict[str, np.ndarray] = {}
+
+    def ResolveValue(field: str) -> np.ndarray:
+        if field in applied_values:
+            return applied_values[field]
+        return resolve_column(field)[mask]
+
+    for apply in pipeline.applies:
+        applied_values[apply.alias] = _EvaluateNumpyApply(
+            apply.expression, ResolveValue
+        )
+    # Every group key is encoded as its position among the unique values, the
+    # positions of all keys are combined into one group number per row
+    matched_rows = int(np.count_nonzero(mask))
+    group_keys: list[np.ndarray] = []
+    group_codes: list[np.ndarray] = []
+    for field in pipeline.group_by:
+        unique_values, codes = np.unique(
+            ResolveValue(field), return_inverse=True
+        )
+        group_keys.append(unique_values)
+        group_codes.append(codes.reshape(-1))
+    if group_codes and matched_rows:
+        combined_codes = np.ravel_multi_index(
+            group_codes, [len(keys) for keys in group_keys]
+        )
+        group_numbers, group_inverse = np.unique(
+            combined_codes, return_inverse=True
+        )
+        group_inverse = group_inverse.reshape(-1)
+        key_positions = np.unravel_index(
+            group_numbers, [len(keys) for keys in group_keys]
+        )
+    else:
+        group_inverse = np.zeros(matched_rows, dtype=np.intp)
+        key_positions = tuple(np.zeros(0, dtype=np.intp) for _ in group_keys)
+    groups_count = int(group_inverse.max()) + 1 if matched_rows else 0
+    output_columns: dict[str, np.ndarray] = {
+        field: keys[positions]
+        for field, keys, positions in zip(
+            pipeline.group_by, group_keys, key_positions
+        )
+    }
+    group_sizes = np.bincount(group_inverse, minlength=groups_count)
+    for reducer in pipeline.reducers:
+        if reducer.function == "COUNT":
+            output_columns[reducer.alias] = group_sizes
+            continue
+        values = ResolveValue(reducer.field).astype(np.float64)  # type: ignore
+        match reducer.function:
+            case "SUM" | "AVG":
+                reduced_values = np.bincount(
+                    group_inverse, weights=values, minlength=groups_count
+                )
+                if reducer.function == "AVG":
+                    reduced_values = reduced_values / group_sizes
+            case "MIN":
+                reduced_values = np.full(groups_count, np.inf)
+                np.minimum.at(reduced_values, group_inverse, values)
+            case _:
+                reduced_values = np.full(groups_count, -np.inf)
+                np.maximum.at(reduced_values, group_inverse, values)
+        output_columns[reducer.alias] = reduced_values
+    if pipeline.sort_by:
+        # np.lexsort sorts by its last key first, descending keys are ordered
+        # by their negated ranks
+        sort_keys = []
+        for field, ascending in reversed(pipeline.sort_by):
+            ranks = np.unique(output_columns[field], return_inverse=True)[1]
+            ranks = ranks.reshape(-1)
+            sort_keys.append(ranks if ascending else -ranks)
+        group_order = np.lexsort(sort_keys)
+    else:
+        group_order = np.arange(groups_count)
+    if pipeline.limit is not None:
+        offset, rows_count = pipeline.limit
+        group_order = group_order[offset : offset + rows_count]
+    return {
+        name: column[group_order] for name, column in output_columns.items()
+    }
@@ -1,45 +1,258 @@
+import binascii
+import collections
+import enum
 import logging
-import time
+import statistics
 import typing
+from concurrent.futures import ThreadPoolExecutor
 
 from redis import Redis
 
-from .abstract_database import AbstractDatabase
+from .abstract_database import AbstractDatabase, WaitForDatabaseReady
+
+
+class RedisStorageModel(enum.StrEnum):
+    JSON = enum.auto()
+    HASH = enum.auto()
+
+
+class RedisDurabilityProfile(enum.StrEnum):
+    DEFAULT = enum.auto()
+    NONE = enum.auto()
+    AOF_EVERYSEC = enum.auto()
+    AOF_ALWAYS = enum.auto()
+
+
+# The default profile keeps the server's own persistence (RDB snapshots, no
+# AOF). RDB snapshots stay off in the others, so they only differ in the AOF
+# fsync policy
+REDIS_DURABILITY_SETTINGS: dict[RedisDurabilityProfile, dict[str, str]] = {
+    RedisDurabilityProfile.DEFAULT: {},
+    RedisDurabilityProfile.NONE: {
+        "save": "",
+        "appendonly": "no",
+        "appendfsync": "everysec",
+    },
+    RedisDurabilityProfile.AOF_EVERYSEC: {
+        "save": "",
+        "appendonly": "yes",
+        "appendfsync": "everysec",
+    },
+    RedisDurabilityProfile.AOF_ALWAYS: {
+        "save": "",
+        "appendonly": "yes",
+        "appendfsync": "always",
+    },
+}
+
+# Same key to slot mapping as Redis Cluster, so the shard of a key does not
+# depend on the Python hash seed
+REDIS_HASH_SLOTS = 16384
+
+
+def GetKeyShard(key: str, shards_count: int) -> int:
+    return binascii.crc_hqx(key.encode(), 0) % REDIS_HASH_SLOTS % shards_count
+
+
+# Commands the resource samples and the storage footprint send themselves,
+# they are left out of the command counts and the server execution time
+REDIS_SAMPLER_COMMANDS = frozenset(("info", "dbsize", "scan", "memory|usage"))
+
+
+def GetBenchmarkedCommandStats(
+    redis_handle: Redis,
+) -> dict[str, dict[str, typing.Any]]:
+    return {
+        command.removeprefix("cmdstat_"): command_stats
+        for command, command_stats in redis_handle.info(
+            "commandstats"
+        ).items()  # type: ignore
+        if command.removeprefix("cmdstat_") not in REDIS_SAMPLER_COMMANDS
+    }
 
 
 class RedisDatabase(AbstractDatabase):
-    __database_engine: typing.Optional[Redis] = None
+    __shard_engines: list[Redis] = []
+    __shard_executor: typing.Optional[ThreadPoolExecutor] = None
+    __host: str = "127.0.0.1"
+    __port: int = 6379
+    __shards_count: int = 1
+    __storage_model: RedisStorageModel = RedisStorageModel.JSON
+    __durability_profile: RedisDurabilityProfile = (
+        RedisDurabilityProfile.DEFAULT
+    )
 
     @classmethod
     def GetDatabaseEngine(cls) -> Redis:
-        if cls.__database_engine:
-            return cls.__database_engine
+        return cls.GetShardEngines()[0]
 
-        cls.__database_engine = Redis(
-            host="127.0.0.1", port=6379, decode_responses=True
-        )
-        cls.__WaitForDatabaseReady()
-        return cls.__database_engine
+    @classmethod
+    def GetShardEngines(cls) -> list[Redis]:
+        if cls.__shard_engines:
+            return cls.__shard_engines
+
+        cls.__shard_engines = [
+            Redis(host=host, port=port, decode_responses=True)
+            for host, port in cls.GetServerAddresses()
+        ]
+        for shard_engine in cls.__shard_engines:
+            WaitForDatabaseReady("Redis", shard_engine.ping)
+        return cls.__shard_engines
+
+    @classmethod
+    def GetShardExecutor(cls) -> typing.Optional[ThreadPoolExecutor]:
+        # Shards are separate single threaded servers, one pool shared by
+        # all handlers queries them in parallel
+        if cls.__shards_count == 1:
+            return None
+        if cls.__shard_executor is None:
+            cls.__shard_executor = ThreadPoolExecutor(
+                max_workers=cls.__shards_count
+            )
+        return cls.__shard_executor
+
+    @classmethod
+    def SetShardsCount(cls, shards_count: int) -> None:
+        cls.__shards_count = shards_count
+
+    @classmethod
+    def GetShardsCount(cls) -> int:
+        return cls.__shards_count
+
+    @classmethod
+    def SetAddress(cls, host: str, port: typing.Optional[int] = None) -> None:
+        cls.__host = host
+        if port is not None:
+            cls.__port = port
+
+    @classmethod
+    def GetAddress(cls) -> tuple[str, int]:
+        return cls.__host, cls.__port
+
+    @classmethod
+    def GetServerAddresses(cls) -> list[tuple[str, int]]:
+        # Shards listen on consecutive ports starting at the configured one
+        return [
+            (cls.__host, cls.__port + shard_index)
+            for shard_index in range(cls.__shards_count)
+        ]
 
     @classmethod
     def FlushDatabase(cls) -> None:
-        redis_handle = cls.GetDatabaseEngine()
-        redis_handle.flushdb()
+        for shard_engine in cls.GetShardEngines():
+            shard_engine.flushdb()
 
     @classmethod
     def Reset(cls) -> None:
-        cls.__database_engine = None
-
-    @classmethod
-    def __WaitForDatabaseReady(cls) -> None:
-        engine = cls.__database_engine
-        for attempt in range(10):
-            try:
-                engine.ping()
-                logging.debug("Redis database is ready.")
-                return
-            except Exception:
-                logging.warning(
-                    f"Waiting for Redis database to be ready...{attempt + 1}/10"
-                )
-                time.sleep(1)
+        cls.__shard_engines = []
+        if cls.__shard_executor is not None:
+            cls.__shard_executor.shutdown()
+            cls.__shard_executor = None
+
+    @classmethod
+    def SetStorageModel(cls, storage_model: RedisStorageModel) -> None:
+        cls.__storage_model = storage_model
+
+    @classmethod
+    def GetStorageModel(cls) -> RedisStorageModel:
+        return cls.__storage_model
+
+    @classmethod
+    def EvictCaches(cls) -> None:
+        # Everything stays in memory, only the connections are renewed
+        for shard_engine in cls.GetShardEngines():
+            shard_engine.connection_pool.disconnect()
+
+    @classmethod
+    def SetDurabilityProfile(
+        cls, durability_profile: RedisDurabilityProfile
+    ) -> None:
+        cls.__durability_profile = durability_profile
+
+    @classmethod
+    def GetDurabilityProfile(cls) -> RedisDurabilityProfile:
+        return cls.__durability_profile
+
+    @classmethod
+    def GetServerSettings(cls) -> dict[str, str]:
+        return REDIS_DURABILITY_SETTINGS[cls.__durability_profile]
+
+    @classmethod
+    def GetBenchmarkDimensions(cls) -> dict[str, typing.Any]:
+        return {
+            "storage_model": cls.__storage_model.value,
+            "durability_profile": cls.__durability_profile.value,
+            "shards_count": cls.__shards_count,
+        }
+
+    @classmethod
+    def GetResourceSample(cls) -> dict[str, typing.Any]:
+        # Shards are summed, together they are one database
+        memory_bytes = server_rss_bytes = cache_hits = cache_misses = 0
+        command_calls: collections.Counter[str] = collections.Counter()
+        for redis_handle in cls.GetShardEngines():
+            memory_info = redis_handle.info("memory")
+            stats_info = redis_handle.info("stats")
+            memory_bytes += int(memory_info["used_memory"])  # type: ignore
+            server_rss_bytes += int(memory_info["used_memory_rss"])  # type: ignore
+            cache_hits += int(stats_info["keyspace_hits"])  # type: ignore
+            cache_misses += int(stats_info["keyspace_misses"])  # type: ignore
+            command_calls.update(
+                {
+                    command: int(command_stats["calls"])
+                    for command, command_stats in GetBenchmarkedCommandStats(
+                        redis_handle
+                    ).items()
+                }
+            )
+        return {
+            "memory_bytes": memory_bytes,
+            "server_rss_bytes": server_rss_bytes,
+            "commands_processed": sum(command_calls.values()),
+            "command_calls": dict(command_calls),
+            "cache_hits": cache_hits,
+            "cache_misses": cache_misses,
+        }
+
+    @classmethod
+    def GetServerExecutionSeconds(cls) -> typing.Optional[float]:
+        return (
+            sum(
+                float(command_stats["usec"])
+                for redis_handle in cls.GetShardEngines()
+                for command_stats in GetBenchmarkedCommandStats(
+                    redis_handle
+                ).values()
+            )
+            / 1000000
+        )
+
+    @classmethod
+    def GetStorageFootprint(
+        cls, key_pattern: str = "trip:*", sample_size: int = 100
+    ) -> dict[str, typing.Any]:
+        used_memory = 0
+        documents_count = 0
+        sampled_sizes: list[int] = []
+        for redis_handle in cls.GetShardEngines():
+            used_memory += int(redis_handle.info("memory")["used_memory"])  # type: ignore
+            documents_count += int(redis_handle.dbsize())  # type: ignore
+            # Keys are spread by hash, the first shards give a fair sample
+            for key in redis_handle.scan_iter(
+                match=key_pattern, count=sample_size
+            ):
+                if len(sampled_sizes) >= sample_size:
+                    break
+                sampled_sizes.append(int(redis_handle.memory_usage(key) or 0))  # type: ignore
+        footprint = {
+            "used_memory": used_memory,
+            "documents_count": documents_count,
+            "used_memory_per_document": used_memory / documents_count
+            if documents_count
+            else 0.0,
+            "sampled_bytes_per_document": statistics.fmean(sampled_sizes)
+            if sampled_sizes
+            else 0.0,
+        }
+        logging.info(f"Redis storage footprint: {footprint}")
+        return footprint
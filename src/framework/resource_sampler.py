@@ -0,0 +1,156 @@
+import logging
+import os
+import re
+import threading
+import time
+import typing
+
+MEMORY_UNITS: dict[str, int] = {
+    "B": 1,
+    "KB": 1000,
+    "KIB": 1024,
+    "MB": 1000**2,
+    "MIB": 1024**2,
+    "GB": 1000**3,
+    "GIB": 1024**3,
+}
+
+MEMORY_USAGE_PATTERN = re.compile(r"([\d.]+)\s*([a-zA-Z]+)")
+
+
+def ParseMemoryUsage(memory_usage: str) -> int:
+    match = MEMORY_USAGE_PATTERN.match(memory_usage.strip())
+    if match is None:
+        raise ValueError(f"Unsupported memory usage: {memory_usage}")
+    return int(float(match.group(1)) * MEMORY_UNITS[match.group(2).upper()])
+
+
+def ReadProcessSample(pid: int) -> dict[str, typing.Any]:
+    with open(f"/proc/{pid}/stat", "r") as f:
+        # The command name may hold spaces, fields are counted after it
+        stat_fields = f.read().rsplit(")", 1)[1].split()
+    clock_ticks = os.sysconf("SC_CLK_TCK")
+    with open(f"/proc/{pid}/statm", "r") as f:
+        resident_pages = int(f.read().split()[1])
+    return {
+        "process_cpu_seconds": (int(stat_fields[11]) + int(stat_fields[12]))
+        / clock_ticks,
+        "process_rss_bytes": resident_pages * os.sysconf("SC_PAGE_SIZE"),
+    }
+
+
+class ResourceSampler:
+    def __init__(
+        self,
+        sample_functions: list[typing.Callable[[], dict[str, typing.Any]]],
+        interval: float = 1.0,
+    ):
+        self.sample_functions = sample_functions
+        self.interval = interval
+        self.samples: list[dict[str, typing.Any]] = []
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._start_time = 0.0
+
+    def start(self) -> None:
+        self._start_time = time.monotonic()
+        self._take_sample()
+        self._thread.start()
+
+    def mark_baseline(self) -> None:
+        # Deltas are summarized from the last baseline, e.g. after loading
+        self._take_sample(baseline=True)
+
+    def stop(self) -> list[dict[str, typing.Any]]:
+        self._stop_event.set()
+        self._thread.join()
+        self._take_sample()
+        return self.samples
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self._take_sample()
+
+    def _take_sample(self, baseline: bool = False) -> None:
+        sample: dict[str, typing.Any] = {
+            "elapsed": time.monotonic() - self._start_time
+        }
+        if baseline:
+            sample["baseline"] = True
+        for sample_function in self.sample_functions:
+            try:
+                sample.update(sample_function())
+            except Exception as e:
+                logging.debug(f"Resource sample failed: {e}")
+        self.samples.append(sample)
+
+
+def SummarizeResourceSamples(
+    samples: list[dict[str, typing.Any]],
+    operations_count: int,
+    records_count: typing.Optional[int],
+) -> dict[str, typing.Any]:
+    first_sample = next(
+        (sample for sample in reversed(samples) if sample.get("baseline")),
+        samples[0],
+    )
+    last_sample = samples[-1]
+
+    def Delta(key: str) -> typing.Optional[float]:
+        if key not in first_sample or key not in last_sample:
+            return None
+        return last_sample[key] - first_sample[key]
+
+    def Peak(key: str) -> typing.Optional[float]:
+        values = [sample[key] for sample in samples if key in sample]
+        return max(values) if values else None
+
+    summary: dict[str, typing.Any] = {
+        "samples_count": len(samples),
+        "peak_memory_bytes": Peak("memory_bytes"),
+        "peak_storage_bytes": Peak("storage_bytes"),
+        "peak_process_rss_bytes": Peak("process_rss_bytes"),
+    }
+    commands = Delta("commands_processed")
+    if commands is not None and operations_count:
+        summary["commands_per_operation"] = commands / operations_count
+    cache_hits, cache_misses = Delta("cache_hits"), Delta("cache_misses")
+    if cache_hits is not None and cache_misses is not None:
+        cache_accesses = cache_hits + cache_misses
+        summary["cache_hit_ratio"] = (
+            cache_hits / cache_accesses if cache_accesses else None
+        )
+    command_calls = {
+        command: calls - first_sample["command_calls"].get(command, 0)
+        for command, calls in last_sample.get("command_calls", {}).items()
+        if "command_calls" in first_sample
+    }
+    if command_calls and operations_count:
+        summary["command_calls_per_operation"] = {
+            command: calls / operations_count
+            for command, calls in command_calls.items()
+            if calls
+        }
+    cpu_seconds = Delta("process_cpu_seconds")
+    elapsed = last_sample["elapsed"] - first_sample["elapsed"]
+    if cpu_seconds is not None and elapsed:
+        summary["process_cpu_percent"] = 100.0 * cpu_seconds / elapsed
+    container_cpu = [
+        sample["container_cpu_percent"]
+        for sample in samples
+        if "container_cpu_percent" in sample
+    ]
+    if container_cpu:
+        summary["peak_container_cpu_percent"] = max(container_cpu)
+    if summary["peak_memory_bytes"] is not None and records_count:
+        summary["bytes_per_record"] = (
+            summary["peak_memory_bytes"] / records_count
+        )
+        summary["bytes_per_million_records"] = (
+            summary["bytes_per_record"] * 1000000
+        )
+    if summary["peak_storage_bytes"] is not None and records_count:
+        summary["storage_bytes_per_record"] = (
+            summary["peak_storage_bytes"] / records_count
+        )
+    return summary
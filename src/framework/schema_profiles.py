@@ -0,0 +1,151 @@
+import enum
+import typing
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Integer,
+    MetaData,
+    Numeric,
+    SmallInteger,
+    Table,
+)
+from sqlalchemy.types import TypeEngine
+
+from .models import BaseOrmType
+
+
+class SchemaProfile(enum.StrEnum):
+    STANDARD = enum.auto()
+    COMPACT = enum.auto()
+
+
+ZONE_TABLE_NAME = "zone"
+
+# Codes and ids below 32768 fit a smallint, amounts are stored in cents
+# precision instead of double precision floats
+MONEY_TYPE = Numeric(9, 2)
+
+COMPACT_COLUMN_TYPES: dict[str, dict[str, TypeEngine[typing.Any]]] = {
+    "fare_rate": {"id": SmallInteger()},
+    "vendor": {"id": SmallInteger()},
+    "taxi_meter": {"taxi_meter_location": SmallInteger()},
+    "fees": {
+        "mta_tax": MONEY_TYPE,
+        "improvement_surcharge": MONEY_TYPE,
+        "airport_fee": MONEY_TYPE,
+        "cbd_congestion_fee": MONEY_TYPE,
+    },
+    "payment": {
+        "payment_type": SmallInteger(),
+        "extra": MONEY_TYPE,
+        "tolls_amount": MONEY_TYPE,
+        "fare_amount": MONEY_TYPE,
+        "total_amount": MONEY_TYPE,
+        "rate_code_id": SmallInteger(),
+    },
+    "trip": {
+        "passenger_count": SmallInteger(),
+        "vendor_id": SmallInteger(),
+    },
+    "trip_flat": {
+        "vendor_id": SmallInteger(),
+        "passenger_count": SmallInteger(),
+        "rate_code_id": SmallInteger(),
+        "PULocationID": SmallInteger(),
+        "DOLocationID": SmallInteger(),
+        "payment_type": SmallInteger(),
+        "fare_amount": MONEY_TYPE,
+        "extra": MONEY_TYPE,
+        "mta_tax": MONEY_TYPE,
+        "tip_amount": MONEY_TYPE,
+        "tolls_amount": MONEY_TYPE,
+        "improvement_surcharge": MONEY_TYPE,
+        "total_amount": MONEY_TYPE,
+        "congestion_surcharge": MONEY_TYPE,
+        "airport_fee": MONEY_TYPE,
+        "cbd_congestion_fee": MONEY_TYPE,
+    },
+}
+
+# Location columns become foreign keys into the zone dimension table
+ZONE_FOREIGN_KEYS: dict[str, tuple[str, ...]] = {
+    "taxi_meter": ("taxi_meter_location",),
+    "trip_flat": ("PULocationID", "DOLocationID"),
+}
+
+
+def _GetColumnAlignmentOrder(column_type: TypeEngine[typing.Any]) -> int:
+    # 8 byte aligned columns go first and variable length ones last, so
+    # Postgres needs no padding between them
+    if isinstance(column_type, (Float, DateTime)):
+        return 0
+    if isinstance(column_type, SmallInteger):
+        return 2
+    if isinstance(column_type, Integer):
+        return 1
+    return 3
+
+
+def _BuildCompactTable(table: Table, metadata: MetaData) -> Table:
+    column_types = COMPACT_COLUMN_TYPES.get(table.name, {})
+    zone_columns = ZONE_FOREIGN_KEYS.get(table.name, ())
+    columns = [
+        Column(
+            column.name,
+            column_types.get(column.name, column.type),
+            *(
+                ForeignKey(
+                    foreign_key.target_fullname, ondelete=foreign_key.ondelete
+                )
+                for foreign_key in column.foreign_keys
+            ),
+            *(
+                [ForeignKey(f"{ZONE_TABLE_NAME}.id")]
+                if column.name in zone_columns
+                else []
+            ),
+            primary_key=column.primary_key,
+            nullable=column.nullable,
+            autoincrement=column.autoincrement,
+        )
+        for column in table.columns
+    ]
+    # The primary key is the only unique index, no extra unique constraint
+    return Table(
+        table.name,
+        metadata,
+        *sorted(
+            columns, key=lambda column: _GetColumnAlignmentOrder(column.type)
+        ),
+    )
+
+
+def BuildCompactMetadata(tables: typing.Iterable[Table]) -> MetaData:
+    metadata = MetaData()
+    Table(
+        ZONE_TABLE_NAME,
+        metadata,
+        Column("id", SmallInteger(), primary_key=True, autoincrement=False),
+    )
+    for table in tables:
+        _BuildCompactTable(table, metadata)
+    return metadata
+
+
+COMPACT_METADATA = BuildCompactMetadata(BaseOrmType.metadata.sorted_tables)
+
+
+def GetSchemaProfileTables(
+    schema_profile: SchemaProfile, tables: list[Table]
+) -> list[Table]:
+    match schema_profile:
+        case SchemaProfile.STANDARD:
+            return tables
+        case SchemaProfile.COMPACT:
+            # The zone table goes first, it is referenced by the others
+            return [COMPACT_METADATA.tables[ZONE_TABLE_NAME]] + [
+                COMPACT_METADATA.tables[table.name] for table in tables
+            ]
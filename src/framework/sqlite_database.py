@@ -0,0 +1,198 @@
+import enum
+import logging
+import os
+import sqlite3
+import typing
+from datetime import datetime
+
+from sqlalchemy import Engine, create_engine, event, text
+from sqlalchemy.pool import StaticPool
+
+from .abstract_database import AbstractDatabase, DropOperatingSystemCaches
+from .models import BaseOrmType
+
+
+class SqlitePragmaProfile(enum.StrEnum):
+    SAFE = enum.auto()
+    BALANCED = enum.auto()
+    FAST = enum.auto()
+
+
+SQLITE_PRAGMA_PROFILES: dict[SqlitePragmaProfile, dict[str, typing.Any]] = {
+    SqlitePragmaProfile.SAFE: {
+        "synchronous": "FULL",
+    },
+    SqlitePragmaProfile.BALANCED: {
+        "synchronous": "NORMAL",
+        "cache_size": -64 * 1024,
+        "temp_store": "MEMORY",
+        "mmap_size": 256 * 1024 * 1024,
+    },
+    SqlitePragmaProfile.FAST: {
+        "synchronous": "OFF",
+        "cache_size": -256 * 1024,
+        "temp_store": "MEMORY",
+        "mmap_size": 1024 * 1024 * 1024,
+    },
+}
+
+SQLITE_IN_MEMORY_PATH = ":memory:"
+
+
+def _SqliteDateTrunc(unit: str, value: typing.Optional[str]) -> typing.Optional[str]:
+    if value is None:
+        return None
+    moment = datetime.fromisoformat(value)
+    match unit:
+        case "hour":
+            moment = moment.replace(minute=0, second=0, microsecond=0)
+        case "day":
+            moment = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+        case "month":
+            moment = moment.replace(
+                day=1, hour=0, minute=0, second=0, microsecond=0
+            )
+        case _:
+            raise ValueError(f"Unsupported date_trunc unit: {unit}")
+    return moment.isoformat(sep=" ")
+
+
+class SqliteDatabase(AbstractDatabase):
+    __database_engine: typing.Optional[Engine] = None
+    __database_path: str = SQLITE_IN_MEMORY_PATH
+    __journal_mode: str = "WAL"
+    __pragma_profile: SqlitePragmaProfile = SqlitePragmaProfile.BALANCED
+
+    @classmethod
+    def GetDatabaseEngine(cls) -> Engine:
+        if cls.__database_engine:
+            return cls.__database_engine
+
+        if cls.__database_path == SQLITE_IN_MEMORY_PATH:
+            # A single shared connection keeps the in-memory database alive
+            cls.__database_engine = create_engine(
+                "sqlite://",
+                poolclass=StaticPool,
+                connect_args={"check_same_thread": False},
+            )
+        else:
+            cls.__database_engine = create_engine(
+                f"sqlite:///{cls.__database_path}"
+            )
+        event.listen(cls.__database_engine, "connect", cls.__ConfigureConnection)
+        BaseOrmType.metadata.create_all(cls.__database_engine)
+        return cls.__database_engine
+
+    @classmethod
+    def SetDatabasePath(cls, database_path: str) -> None:
+        cls.__database_path = database_path
+
+    @classmethod
+    def SetJournalMode(cls, journal_mode: str) -> None:
+        cls.__journal_mode = journal_mode.upper()
+
+    @classmethod
+    def SetPragmaProfile(cls, pragma_profile: SqlitePragmaProfile) -> None:
+        cls.__pragma_profile = pragma_profile
+
+    @classmethod
+    def GetBenchmarkDimensions(cls) -> dict[str, typing.Any]:
+        return {
+            "sqlite_storage": "memory"
+            if cls.__database_path == SQLITE_IN_MEMORY_PATH
+            else "file",
+            "sqlite_journal_mode": cls.__journal_mode.lower(),
+            "sqlite_pragma_profile": cls.__pragma_profile.value,
+        }
+
+    @classmethod
+    def FlushDatabase(cls) -> None:
+        orm_engine = cls.GetDatabaseEngine()
+        with orm_engine.begin() as connection:
+            for table in reversed(BaseOrmType.metadata.sorted_tables):
+                logging.debug(f"Flushing table {table.name}")
+                connection.execute(table.delete())
+
+    @classmethod
+    def EvictCaches(cls) -> None:
+        # The in-memory database lives in its only connection's page cache
+        if cls.__database_path == SQLITE_IN_MEMORY_PATH:
+            return
+        DropOperatingSystemCaches()
+        cls.GetDatabaseEngine().dispose()
+
+    @classmethod
+    def PrewarmCaches(cls) -> None:
+        if cls.__database_path == SQLITE_IN_MEMORY_PATH:
+            return
+        with open(cls.__database_path, "rb") as database_file:
+            while database_file.read(1024 * 1024):
+                pass
+
+    @classmethod
+    def GetStorageFootprint(cls) -> dict[str, typing.Any]:
+        with cls.GetDatabaseEngine().connect() as connection:
+            page_count = int(
+                connection.execute(text("PRAGMA page_count")).scalar_one()
+            )
+            page_size = int(connection.execute(text("PRAGMA page_size")).scalar_one())
+            trips_count = int(
+                connection.execute(text("SELECT count(*) FROM trip")).scalar_one()
+            )
+        database_size = page_count * page_size
+        footprint = {
+            "database_size": database_size,
+            "trips_count": trips_count,
+            "bytes_per_trip": database_size / trips_count if trips_count else 0.0,
+        }
+        logging.info(f"SQLite storage footprint: {footprint}")
+        return footprint
+
+    @classmethod
+    def GetResourceSample(cls) -> dict[str, typing.Any]:
+        # The in-memory database shares one connection with the benchmark,
+        # it is covered by the process RSS instead
+        if cls.__database_path == SQLITE_IN_MEMORY_PATH:
+            return {}
+        return {
+            "storage_bytes": sum(
+                os.path.getsize(f"{cls.__database_path}{suffix}")
+                for suffix in ("", "-wal", "-shm")
+                if os.path.exists(f"{cls.__database_path}{suffix}")
+            )
+        }
+
+    @classmethod
+    def DeleteDatabase(cls) -> None:
+        if cls.__database_engine:
+            cls.__database_engine.dispose()
+        if cls.__database_path == SQLITE_IN_MEMORY_PATH:
+            return
+        for suffix in ("", "-wal", "-shm"):
+            database_file = f"{cls.__database_path}{suffix}"
+            if os.path.exists(database_file):
+                os.remove(database_file)
+
+    @classmethod
+    def Reset(cls) -> None:
+        cls.__database_engine = None
+
+    @classmethod
+    def __ConfigureConnection(
+        cls, dbapi_connection: sqlite3.Connection, _: typing.Any
+    ) -> None:
+        dbapi_connection.create_function(
+            "date_trunc", 2, _SqliteDateTrunc, deterministic=True
+        )
+        cursor = dbapi_connection.cursor()
+        pragmas: dict[str, typing.Any] = {
+            "foreign_keys": "ON",
+            **SQLITE_PRAGMA_PROFILES[cls.__pragma_profile],
+        }
+        # WAL needs a file, in-memory databases keep their MEMORY journal
+        if cls.__database_path != SQLITE_IN_MEMORY_PATH:
+            pragmas["journal_mode"] = cls.__journal_mode
+        for pragma, value in pragmas.items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+        logging.debug(f"SQLite connection configured with pragmas: {pragmas}")
+        cursor.close()
@@ -0,0 +1,141 @@
+import contextlib
+import enum
+import functools
+import json
+import logging
+import threading
+import time
+import typing
+
+METHOD_TYPE = typing.TypeVar(
+    "METHOD_TYPE", bound=typing.Callable[..., typing.Any]
+)
+
+
+class TraceEvent(enum.StrEnum):
+    QUERY_START = enum.auto()
+    QUERY_END = enum.auto()
+    ROWS = enum.auto()
+    BYTES = enum.auto()
+
+
+TraceSink = typing.Callable[[TraceEvent, dict[str, typing.Any]], None]
+
+
+def FormatTraceField(value: typing.Any) -> typing.Any:
+    # Redis queries and aggregations are described by their arguments,
+    # SQLAlchemy statements by their SQL text
+    if hasattr(value, "query_string"):
+        return value.query_string()
+    if hasattr(value, "build_args"):
+        return value.build_args()
+    return str(value)
+
+
+class Tracer:
+    __sinks: list[TraceSink] = []
+    __operation_depth: int = 0
+
+    @classmethod
+    def AddSink(cls, sink: TraceSink) -> None:
+        cls.__sinks.append(sink)
+
+    @classmethod
+    def RemoveSink(cls, sink: TraceSink) -> None:
+        cls.__sinks.remove(sink)
+
+    @classmethod
+    def CloseSinks(cls) -> None:
+        # File sinks buffer their lines until closed
+        for sink in cls.__sinks:
+            close = getattr(sink, "close", None)
+            if close is not None:
+                close()
+        cls.__sinks.clear()
+
+    @classmethod
+    def IsEnabled(cls) -> bool:
+        return bool(cls.__sinks)
+
+    @classmethod
+    @contextlib.contextmanager
+    def Operation(cls) -> typing.Iterator[bool]:
+        # Handler operations call each other (update reads first), only the
+        # outermost one is traced
+        cls.__operation_depth += 1
+        try:
+            yield cls.__operation_depth == 1
+        finally:
+            cls.__operation_depth -= 1
+
+    @classmethod
+    def Emit(cls, event: TraceEvent, **fields: typing.Any) -> None:
+        # Fields are passed as objects, only sinks format them
+        if not cls.__sinks:
+            return
+        for sink in cls.__sinks:
+            sink(event, fields)
+
+
+class LoggingTraceSink:
+    def __init__(self, level: int = logging.DEBUG):
+        self.level = level
+
+    def __call__(self, event: TraceEvent, fields: dict[str, typing.Any]) -> None:
+        if not logging.getLogger().isEnabledFor(self.level):
+            return
+        logging.log(
+            self.level,
+            "%s %s",
+            event.value,
+            json.dumps(fields, default=FormatTraceField),
+        )
+
+
+class JsonLinesTraceSink:
+    def __init__(self, path: str):
+        self._file = open(path, "a")
+        self._lock = threading.Lock()
+
+    def __call__(self, event: TraceEvent, fields: dict[str, typing.Any]) -> None:
+        line = json.dumps(
+            {"event": event.value, "time": time.time(), **fields},
+            default=FormatTraceField,
+        )
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def TracedOperation(method: METHOD_TYPE) -> METHOD_TYPE:
+    @functools.wraps(method)
+    def TracedMethod(
+        handler: typing.Any, *args: typing.Any, **kwargs: typing.Any
+    ) -> typing.Any:
+        if not Tracer.IsEnabled():
+            return method(handler, *args, **kwargs)
+        with Tracer.Operation() as outermost:
+            if not outermost:
+                return method(handler, *args, **kwargs)
+            operation = method.__name__
+            handler_name = type(handler).__name__
+            Tracer.Emit(
+                TraceEvent.QUERY_START,
+                handler=handler_name,
+                operation=operation,
+                query=args[0] if args else None,
+            )
+            start = time.perf_counter()
+            try:
+                return method(handler, *args, **kwargs)
+            finally:
+                Tracer.Emit(
+                    TraceEvent.QUERY_END,
+                    handler=handler_name,
+                    operation=operation,
+                    seconds=time.perf_counter() - start,
+                )
+
+    return typing.cast(METHOD_TYPE, TracedMethod)
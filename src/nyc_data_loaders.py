@@ -2,24 +2,35 @@ import logging
 import typing
 
 import pandas as pd
-from redis.commands.search.field import Field, NumericField, TagField, TextField
+import pyarrow.parquet as pq
+from sqlalchemy import Table
+from redis.commands.search.field import Field, NumericField, TagField
 from redis.commands.search.index_definition import IndexDefinition, IndexType
 
 from .framework import models
 from .framework.abstract_database import AbstractDatabase
-from .framework.crud_handlers import OrmCRUDHandler, RedisCRUDHandler
+from .framework.crud_handlers import (
+    JsonbDocumentCRUDHandler,
+    NumpyCRUDHandler,
+    OrmCRUDHandler,
+    RedisCRUDHandler,
+)
+from .framework.numpy_database import NUMPY_TRIP_COLUMNS
+from .framework.postgres_database import PostgresDatabase, PostgresLayout
+from .framework.postgres_document_database import TripDocument
+from .framework.schema_profiles import SchemaProfile
+from .framework.redis_database import RedisDatabase, RedisStorageModel
 
 ORM_TABLE_TYPE = typing.TypeVar("ORM_TABLE_TYPE", bound=models.BaseOrmType)
 
 
 def InsertRecordIntoDatabase(
-    orm_type: typing.Type[ORM_TABLE_TYPE],
+    orm_type: typing.Type[ORM_TABLE_TYPE] | Table,
     database: AbstractDatabase,
-    **kwargs: str,
+    **kwargs: typing.Any,
 ) -> typing.Optional[int]:
     orm_handler = OrmCRUDHandler(database.GetDatabaseEngine())
 
-    logging.debug(kwargs)
     try:
         return orm_handler.create(
             orm_type,
@@ -56,33 +67,53 @@ def CalcPercentage(current: int, total: int) -> float:
     return (current / total) * 100.0 if total > 0 else 0.0
 
 
+def ReadNycTaxiParquetChunks(
+    parquet_path: str, records_count: int, chunk_size: int = 100000
+) -> typing.Iterator[pd.DataFrame]:
+    # Only one chunk is held in memory, the index keeps counting across chunks
+    chunk_start = 0
+    for record_batch in pq.ParquetFile(parquet_path).iter_batches(
+        batch_size=min(chunk_size, records_count)
+    ):
+        taxi_data = record_batch.to_pandas().head(records_count - chunk_start)
+        taxi_data.index = pd.RangeIndex(
+            chunk_start, chunk_start + len(taxi_data)
+        )
+        yield taxi_data
+        chunk_start += len(taxi_data)
+        if chunk_start >= records_count:
+            return
+
+
 def LoadNycTaxiDataToSqlDatabase(
-    database: AbstractDatabase, taxi_data: pd.DataFrame
+    database: AbstractDatabase,
+    taxi_data: pd.DataFrame,
+    partitioned_trip_table: typing.Optional[Table] = None,
 ) -> None:
     total_rows = len(taxi_data)
-    for row_id, row in taxi_data.iterrows():
+    for row_position, (_, row) in enumerate(taxi_data.iterrows()):
         InsertRecordIntoDatabase(
             models.FareRate,
             database,
-            id=str(int(row["rate_code_id"])),
+            id=int(row["rate_code_id"]),
             rate_name=MapRateCodeIdToName(row["rate_code_id"]),
         )
         pickup_id = InsertRecordIntoDatabase(
             models.TaxiMeter,
             database,
             taxi_meter_date=row["tpep_pickup_datetime"].to_pydatetime(),
-            taxi_meter_location=row["PULocationID"],
+            taxi_meter_location=int(row["PULocationID"]),
         )
         dropoff_id = InsertRecordIntoDatabase(
             models.TaxiMeter,
             database,
             taxi_meter_date=row["tpep_dropoff_datetime"].to_pydatetime(),
-            taxi_meter_location=row["DOLocationID"],
+            taxi_meter_location=int(row["DOLocationID"]),
         )
         InsertRecordIntoDatabase(
             models.Vendor,
             database,
-            id=str(int(row["vendor_id"])),
+            id=int(row["vendor_id"]),
             vendor_name=MapVendorIdToName(row["vendor_id"]),
         )
         fees_id = InsertRecordIntoDatabase(
@@ -101,85 +132,282 @@ def LoadNycTaxiDataToSqlDatabase(
             tolls_amount=row["tolls_amount"],
             fare_amount=row["fare_amount"],
             total_amount=row["total_amount"],
-            fees_id=str(fees_id),
-            rate_code_id=str(int(row["rate_code_id"])),
+            fees_id=fees_id,
+            rate_code_id=int(row["rate_code_id"]),
         )
-        InsertRecordIntoDatabase(
-            models.Trip,
-            database,
+        trip_values: dict[str, typing.Any] = dict(
             distance=row["distance"],
             passenger_count=row["passenger_count"],
-            pickup_id=str(pickup_id),
-            dropoff_id=str(dropoff_id),
-            payment_id=str(payment_id),
-            vendor_id=str(int(row["vendor_id"])),
+            pickup_id=pickup_id,
+            dropoff_id=dropoff_id,
+            payment_id=payment_id,
+            vendor_id=int(row["vendor_id"]),
         )
-        percentage = CalcPercentage(int(str(row_id)) + 1, total_rows)
+        if partitioned_trip_table is None:
+            InsertRecordIntoDatabase(models.Trip, database, **trip_values)
+        else:
+            # Only partitioned trips carry their pickup time as partition key
+            InsertRecordIntoDatabase(
+                partitioned_trip_table,
+                database,
+                pickup_date=row["tpep_pickup_datetime"].to_pydatetime(),
+                **trip_values,
+            )
+        percentage = CalcPercentage(row_position + 1, total_rows)
+        if percentage % 10 == 0:
+            logging.info(f"Processed {percentage:.1f}% of rows")
+
+
+def BuildNycTaxiFlatColumns(taxi_data: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "vendor_id": taxi_data["vendor_id"],
+            "vendor_name": taxi_data["vendor_id"].map(MapVendorIdToName),
+            "pickup_time": taxi_data["tpep_pickup_datetime"],
+            "dropoff_time": taxi_data["tpep_dropoff_datetime"],
+            "passenger_count": taxi_data["passenger_count"],
+            "distance": taxi_data["distance"],
+            "rate_code_id": taxi_data["rate_code_id"],
+            "fare_rate": taxi_data["rate_code_id"].map(MapRateCodeIdToName),
+            "PULocationID": taxi_data["PULocationID"],
+            "DOLocationID": taxi_data["DOLocationID"],
+            "payment_type": taxi_data["payment_type"],
+            "fare_amount": taxi_data["fare_amount"],
+            "extra": taxi_data["extra"],
+            "mta_tax": taxi_data["mta_tax"],
+            "tip_amount": taxi_data["tip_amount"],
+            "tolls_amount": taxi_data["tolls_amount"],
+            "improvement_surcharge": taxi_data["improvement_surcharge"],
+            "total_amount": taxi_data["total_amount"],
+            "congestion_surcharge": taxi_data["congestion_surcharge"],
+            "airport_fee": taxi_data["airport_fee"],
+            "cbd_congestion_fee": taxi_data["cbd_congestion_fee"],
+        }
+    )
+
+
+def LoadNycTaxiDataToFlatSqlDatabase(
+    database: AbstractDatabase, taxi_data: pd.DataFrame
+) -> None:
+    flat_data = BuildNycTaxiFlatColumns(taxi_data)
+    flat_records = (
+        flat_data.astype(object)
+        .where(flat_data.notna(), None)
+        .to_dict("records")
+    )
+    # Rows are inserted one by one like in the normalized layout, so the
+    # layouts differ only in their data model
+    total_rows = len(flat_records)
+    for row_position, flat_record in enumerate(flat_records):
+        InsertRecordIntoDatabase(models.TripFlat, database, **flat_record)
+        percentage = CalcPercentage(row_position + 1, total_rows)
         if percentage % 10 == 0:
             logging.info(f"Processed {percentage:.1f}% of rows")
 
 
+def LoadNycTaxiDataToPostgresDatabase(
+    database: AbstractDatabase, taxi_data: pd.DataFrame
+) -> None:
+    if PostgresDatabase.GetPartitioning():
+        trip_months = pd.concat(
+            [
+                taxi_data["tpep_pickup_datetime"],
+                taxi_data["tpep_dropoff_datetime"],
+            ]
+        ).dt.to_period("M")
+        PostgresDatabase.EnsureMonthPartitions(
+            [month.to_timestamp().to_pydatetime() for month in trip_months.unique()]
+        )
+    if PostgresDatabase.GetSchemaProfile() == SchemaProfile.COMPACT:
+        PostgresDatabase.EnsureZones(
+            pd.concat(
+                [taxi_data["PULocationID"], taxi_data["DOLocationID"]]
+            ).unique()
+        )
+    partitioned_trip_table = (
+        PostgresDatabase.GetPartitionedTable(models.Trip.__tablename__)
+        if PostgresDatabase.GetPartitioning()
+        else None
+    )
+    match PostgresDatabase.GetLayout():
+        case PostgresLayout.NORMALIZED:
+            LoadNycTaxiDataToSqlDatabase(
+                database, taxi_data, partitioned_trip_table
+            )
+        case PostgresLayout.FLAT:
+            LoadNycTaxiDataToFlatSqlDatabase(database, taxi_data)
+        case PostgresLayout.MATERIALIZED_VIEW:
+            LoadNycTaxiDataToSqlDatabase(
+                database, taxi_data, partitioned_trip_table
+            )
+            PostgresDatabase.RefreshMaterializedView()
+
+
+def LoadNycTaxiDataToNumpyDatabase(
+    database: AbstractDatabase, taxi_data: pd.DataFrame
+) -> None:
+    flat_data = BuildNycTaxiFlatColumns(taxi_data)
+    # Timestamps are kept as epoch seconds, like the Redis numeric fields
+    for time_column in ("pickup_time", "dropoff_time"):
+        flat_data[time_column] = (
+            flat_data[time_column] - pd.Timestamp(0)
+        ) / pd.Timedelta(seconds=1)
+    numpy_handler = NumpyCRUDHandler(database.GetDatabaseEngine())
+    numpy_handler.create(
+        {
+            name: flat_data[name].to_numpy(dtype=dtype)
+            for name, dtype in NUMPY_TRIP_COLUMNS.items()
+        }
+    )
+    logging.info(f"Loaded {len(flat_data)} rows into column arrays")
+
+
+REDIS_INDEX_TYPES: dict[RedisStorageModel, IndexType] = {
+    RedisStorageModel.JSON: IndexType.JSON,
+    RedisStorageModel.HASH: IndexType.HASH,
+}
+
+# Fields that no index or query uses, dropped from the flat HASH encoding
+REDIS_HASH_PRUNED_FIELDS = ("tpep_pickup_datetime", "tpep_dropoff_datetime")
+
+
 def CreateNycTaxiRedisSchema(
-    database: AbstractDatabase, index_name: str
+    database_engine: typing.Any,
+    index_name: str,
+    storage_model: RedisStorageModel = RedisStorageModel.JSON,
 ) -> None:
+    path = "$." if storage_model == RedisStorageModel.JSON else ""
     schema: list[Field] = [
-        TagField("$.vendor_name", as_name="vendor_name"),
-        TextField("$.tpep_pickup_datetime", as_name="pickup_time"),
-        TextField("$.tpep_dropoff_datetime", as_name="dropoff_time"),
-        NumericField("$.passenger_count", as_name="passenger_count"),
-        NumericField("$.distance", as_name="distance"),
-        NumericField("$.rate_code_id", as_name="rate_code_id"),
-        TagField("$.fare_rate", as_name="fare_rate"),
-        NumericField("$.PULocationID", as_name="PULocationID"),
-        NumericField("$.DOLocationID", as_name="DOLocationID"),
-        NumericField("$.payment_type", as_name="payment_type"),
-        NumericField("$.fare_amount", as_name="fare_amount"),
-        NumericField("$.extra", as_name="extra"),
-        NumericField("$.mta_tax", as_name="mta_tax"),
-        NumericField("$.tip_amount", as_name="tip_amount"),
-        NumericField("$.tolls_amount", as_name="tolls_amount"),
+        TagField(f"{path}vendor_name", as_name="vendor_name"),
+        NumericField(
+            f"{path}pickup_timestamp", as_name="pickup_time", sortable=True
+        ),
         NumericField(
-            "$.improvement_surcharge", as_name="improvement_surcharge"
+            f"{path}dropoff_timestamp", as_name="dropoff_time", sortable=True
+        ),
+        NumericField(
+            f"{path}passenger_count", as_name="passenger_count", sortable=True
+        ),
+        NumericField(f"{path}distance", as_name="distance", sortable=True),
+        NumericField(f"{path}rate_code_id", as_name="rate_code_id"),
+        TagField(f"{path}fare_rate", as_name="fare_rate"),
+        NumericField(f"{path}PULocationID", as_name="PULocationID"),
+        NumericField(f"{path}DOLocationID", as_name="DOLocationID"),
+        NumericField(f"{path}payment_type", as_name="payment_type"),
+        NumericField(
+            f"{path}fare_amount", as_name="fare_amount", sortable=True
+        ),
+        NumericField(f"{path}extra", as_name="extra"),
+        NumericField(f"{path}mta_tax", as_name="mta_tax"),
+        NumericField(f"{path}tip_amount", as_name="tip_amount"),
+        NumericField(f"{path}tolls_amount", as_name="tolls_amount"),
+        NumericField(
+            f"{path}improvement_surcharge", as_name="improvement_surcharge"
+        ),
+        NumericField(
+            f"{path}total_amount", as_name="total_amount", sortable=True
+        ),
+        NumericField(
+            f"{path}congestion_surcharge", as_name="congestion_surcharge"
+        ),
+        NumericField(
+            f"{path}airport_fee", as_name="airport_fee", sortable=True
+        ),
+        NumericField(
+            f"{path}cbd_congestion_fee", as_name="cbd_congestion_fee"
         ),
-        NumericField("$.total_amount", as_name="total_amount"),
-        NumericField("$.congestion_surcharge", as_name="congestion_surcharge"),
-        NumericField("$.airport_fee", as_name="airport_fee"),
-        NumericField("$.cbd_congestion_fee", as_name="cbd_congestion_fee"),
     ]
-    database.GetDatabaseEngine().ft(index_name).create_index(
+    database_engine.ft(index_name).create_index(
         schema,
-        definition=IndexDefinition(prefix=["trip:"], index_type=IndexType.JSON),
+        definition=IndexDefinition(
+            prefix=["trip:"], index_type=REDIS_INDEX_TYPES[storage_model]
+        ),
+    )
+
+
+def BuildNycTaxiTripDocument(
+    record_dict: dict[str, typing.Any],
+) -> dict[str, typing.Any]:
+    record_dict["fare_rate"] = MapRateCodeIdToName(record_dict["rate_code_id"])
+    record_dict["vendor_name"] = MapVendorIdToName(record_dict["vendor_id"])
+    record_dict["pickup_timestamp"] = record_dict[
+        "tpep_pickup_datetime"
+    ].timestamp()
+    record_dict["dropoff_timestamp"] = record_dict[
+        "tpep_dropoff_datetime"
+    ].timestamp()
+    record_dict["tpep_pickup_datetime"] = str(
+        record_dict["tpep_pickup_datetime"].to_pydatetime()
+    )
+    record_dict["tpep_dropoff_datetime"] = str(
+        record_dict["tpep_dropoff_datetime"].to_pydatetime()
     )
+    record_dict.pop("store_and_fwd_flag")
+    record_dict.pop("vendor_id")
+    return record_dict
 
 
 def LoadNycTaxiDataToRedisDatabase(
-    database: AbstractDatabase, taxi_data: pd.DataFrame
+    database: AbstractDatabase,
+    taxi_data: pd.DataFrame,
+    chunk_size: int = 1000,
 ) -> None:
     trip_index = "idx:trip"
-    try:
-        database.GetDatabaseEngine().ft(trip_index).info()
-    except Exception:
-        CreateNycTaxiRedisSchema(database=database, index_name=trip_index)
+    storage_model = RedisDatabase.GetStorageModel()
+    # Every shard indexes the trips it holds
+    shard_engines = RedisDatabase.GetShardEngines()
+    for shard_engine in shard_engines:
+        try:
+            shard_engine.ft(trip_index).info()
+        except Exception:
+            CreateNycTaxiRedisSchema(
+                database_engine=shard_engine,
+                index_name=trip_index,
+                storage_model=storage_model,
+            )
 
-    redis_handler = RedisCRUDHandler(database.GetDatabaseEngine())
+    redis_handler = RedisCRUDHandler(
+        shard_engines,
+        storage_model,
+        shard_executor=RedisDatabase.GetShardExecutor(),
+    )
     total_rows = len(taxi_data)
-    for row_id, row in taxi_data.iterrows():
-        record_dict = row.to_dict()
-        record_dict["fare_rate"] = MapRateCodeIdToName(
-            record_dict["rate_code_id"]
-        )
-        record_dict["vendor_name"] = MapVendorIdToName(record_dict["vendor_id"])
-        record_dict["tpep_pickup_datetime"] = str(
-            record_dict["tpep_pickup_datetime"].to_pydatetime()
-        )
-        record_dict["tpep_dropoff_datetime"] = str(
-            record_dict["tpep_dropoff_datetime"].to_pydatetime()
-        )
-        record_dict.pop("store_and_fwd_flag")
-        record_dict.pop("vendor_id")
+    trip_entries: list[tuple[str, dict[str, typing.Any]]] = []
+    for row_position, (row_id, row) in enumerate(taxi_data.iterrows()):
+        record_dict = BuildNycTaxiTripDocument(row.to_dict())
+        if storage_model == RedisStorageModel.HASH:
+            for pruned_field in REDIS_HASH_PRUNED_FIELDS:
+                record_dict.pop(pruned_field)
+        trip_entries.append((f"trip:{str(row_id)}", record_dict))
+
+        # Sharded writes are pipelined per shard, chunk_size trips at a time
+        if len(trip_entries) == chunk_size or row_position + 1 == total_rows:
+            redis_handler.create_many(trip_entries)
+            trip_entries = []
+            percentage = CalcPercentage(row_position + 1, total_rows)
+            logging.info(f"Processed {percentage:.1f}% of rows")
 
-        redis_handler.create(f"trip:{str(row_id)}", record_dict)
 
-        percentage = CalcPercentage(int(str(row_id)) + 1, total_rows)
+def LoadNycTaxiDataToPostgresJsonbDatabase(
+    database: AbstractDatabase, taxi_data: pd.DataFrame
+) -> None:
+    # JSONB has no NaN, missing values become null like in the flat layout
+    records = (
+        taxi_data.astype(object).where(taxi_data.notna(), None).to_dict("index")
+    )
+    jsonb_handler = JsonbDocumentCRUDHandler(
+        database.GetDatabaseEngine(), TripDocument
+    )
+    # Documents are inserted one by one like the relational rows, so the
+    # layouts differ only in their data model
+    total_rows = len(records)
+    for row_position, (row_id, record_dict) in enumerate(records.items()):
+        jsonb_handler.create(
+            {
+                "id": int(row_id),
+                "document": BuildNycTaxiTripDocument(record_dict),
+            }
+        )
+        percentage = CalcPercentage(row_position + 1, total_rows)
         if percentage % 10 == 0:
             logging.info(f"Processed {percentage:.1f}% of rows")
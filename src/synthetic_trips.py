@@ -0,0 +1,122 @@
+import logging
+import typing
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Columns scaled together with the trip distance, so distance vs fare keeps
+# the correlation of the source trips
+DISTANCE_SCALED_COLUMNS = ("trip_distance", "fare_amount", "tip_amount")
+
+SECONDS_PER_HOUR = 3600
+SECONDS_PER_DAY = 24 * SECONDS_PER_HOUR
+
+
+class SyntheticTripModel:
+    def __init__(self, source_trips: pd.DataFrame, jitter: float = 0.1):
+        # Whole source rows are resampled, which keeps the joint distribution
+        # of zones, vendors, rate codes, payments and amounts
+        self.source_trips = source_trips.reset_index(drop=True)
+        self.jitter = jitter
+        pickup_times = self.source_trips["tpep_pickup_datetime"]
+        self.durations = (
+            self.source_trips["tpep_dropoff_datetime"] - pickup_times
+        ).to_numpy()
+        self.start_day = pickup_times.min().normalize()
+        self.days_count = max(
+            (pickup_times.max().normalize() - self.start_day).days + 1, 1
+        )
+        # P(hour | weekday) of the pickups, rows are cumulative
+        hour_counts = np.zeros((7, 24))
+        np.add.at(
+            hour_counts,
+            (pickup_times.dt.weekday.to_numpy(), pickup_times.dt.hour.to_numpy()),
+            1,
+        )
+        hour_counts += 1e-9
+        self.hour_cumulative = np.cumsum(
+            hour_counts / hour_counts.sum(axis=1, keepdims=True), axis=1
+        )
+
+    def generate_chunk(
+        self, rows_count: int, rng: np.random.Generator
+    ) -> pd.DataFrame:
+        source_rows = rng.integers(0, len(self.source_trips), rows_count)
+        trips = self.source_trips.iloc[source_rows].reset_index(drop=True)
+
+        scale = rng.lognormal(0.0, self.jitter, rows_count)
+        amounts_delta = np.zeros(rows_count)
+        for column in DISTANCE_SCALED_COLUMNS:
+            source_values = trips[column].to_numpy()
+            scaled_values = np.round(source_values * scale, 2)
+            if column != "trip_distance":
+                amounts_delta += np.nan_to_num(scaled_values - source_values)
+            trips[column] = scaled_values
+        trips["total_amount"] = np.round(
+            trips["total_amount"].to_numpy() + amounts_delta, 2
+        )
+
+        days = rng.integers(0, self.days_count, rows_count)
+        weekdays = (self.start_day.weekday() + days) % 7
+        hours = (
+            self.hour_cumulative[weekdays] < rng.random(rows_count)[:, None]
+        ).sum(axis=1)
+        hours = np.minimum(hours, 23)
+        pickup_offsets = (
+            days * SECONDS_PER_DAY
+            + hours * SECONDS_PER_HOUR
+            + rng.random(rows_count) * SECONDS_PER_HOUR
+        )
+        pickup_times = self.start_day + pd.to_timedelta(pickup_offsets, unit="s")
+        dropoff_times = pickup_times + pd.to_timedelta(
+            self.durations[source_rows] * scale
+        )
+        # Meters record whole seconds, rounded times also cast losslessly to
+        # the source resolution (microseconds in recent TLC files)
+        for column, times in (
+            ("tpep_pickup_datetime", pickup_times),
+            ("tpep_dropoff_datetime", dropoff_times),
+        ):
+            trips[column] = times.round("s").astype(
+                self.source_trips[column].dtype
+            )
+        return trips
+
+    def generate(
+        self, rows_count: int, seed: int = 0, chunk_size: int = 100000
+    ) -> typing.Iterator[pd.DataFrame]:
+        for chunk_start in range(0, rows_count, chunk_size):
+            # Seeding per chunk keeps every chunk reproducible on its own
+            rng = np.random.default_rng([seed, chunk_start // chunk_size])
+            trips = self.generate_chunk(
+                min(chunk_size, rows_count - chunk_start), rng
+            )
+            trips.index = pd.RangeIndex(chunk_start, chunk_start + len(trips))
+            yield trips
+
+    def write_parquet(
+        self,
+        parquet_path: str,
+        rows_count: int,
+        seed: int = 0,
+        chunk_size: int = 100000,
+    ) -> None:
+        schema = pa.Schema.from_pandas(self.source_trips, preserve_index=False)
+        with pq.ParquetWriter(parquet_path, schema) as writer:
+            for trips in self.generate(rows_count, seed, chunk_size):
+                writer.write_table(
+                    pa.Table.from_pandas(
+                        trips, schema=schema, preserve_index=False
+                    )
+                )
+                logging.info(
+                    f"Wrote {trips.index[-1] + 1} of {rows_count} rows"
+                )
+
+
+def LoadSyntheticTripModel(
+    source_parquet_path: str, jitter: float = 0.1
+) -> SyntheticTripModel:
+    return SyntheticTripModel(pd.read_parquet(source_parquet_path), jitter)
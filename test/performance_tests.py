@@ -1,101 +1,492 @@
 import logging
+import statistics
+import time
 import typing
+from datetime import datetime
 from itertools import product
 
-import pandas as pd
 import pytest
 from pytest_benchmark.fixture import BenchmarkFixture
 from redis.commands.search.query import Query
-from sqlalchemy import Delete
+from sqlalchemy import Delete, and_, func, select
 from test_queries import (
+    AGGREGATE_QUERIES_TEST_LIST,
+    CACHE_HIT_RATIOS_TEST_LIST,
+    CACHE_WORKING_SET_SIZES_TEST_LIST,
     DELETE_QUERIES_TEST_LIST,
+    ORDERED_QUERIES_TEST_LIST,
     SELECT_QUERIES_TEST_LIST,
+    TIME_RANGE_QUERIES_TEST_LIST,
     UPDATE_QUERIES_TEST_LIST,
+    BuildTripLookupQueries,
+    GetPickupWindowStart,
 )
 
-from src.database_fixture_factory import DatabaseFixtureFactory
+from src.database_fixture_factory import (
+    ContainerScope,
+    DatabaseFixtureFactory,
+    DatabaseType,
+)
+from src.framework.abstract_database import CacheState
 from src.framework.crud_handlers import (
     AbstractCRUDHandler,
+    CacheAsideCRUDHandler,
+    FlatOrmCRUDHandler,
+    GetDependentReferences,
+    JsonbDocumentCRUDHandler,
+    MaterializedViewCRUDHandler,
+    NumpyCRUDHandler,
     OrmCRUDHandler,
+    ReadResultFormat,
     RedisCRUDHandler,
 )
+from src.framework.models import BaseOrmType, Trip, TripFlat, TripFlatView
+from src.framework.phase_profiler import PhaseProfiler
+from src.framework.postgres_database import PostgresDatabase, PostgresLayout
+from src.framework.redis_database import RedisDatabase
+from src.framework.resource_sampler import (
+    ResourceSampler,
+    SummarizeResourceSamples,
+)
 
 
-@pytest.fixture
-def SetupDatabaseContainer() -> typing.Generator[None, None, None]:
+def GetContainerScope(fixture_name: str, config: pytest.Config) -> str:
+    return DatabaseFixtureFactory.GetContainerScope().value
+
+
+@pytest.fixture(scope=GetContainerScope)
+def DatabaseServer() -> typing.Generator[None, None, None]:
     DatabaseFixtureFactory.SetupDatabase()
     yield
     DatabaseFixtureFactory.TeardownDatabase()
 
 
+@pytest.fixture
+def SetupDatabaseContainer(
+    DatabaseServer: None,
+) -> typing.Generator[None, None, None]:
+    yield
+    # A shared server outlives the test, so its records are flushed instead
+    if DatabaseFixtureFactory.GetContainerScope() != ContainerScope.FUNCTION:
+        DatabaseFixtureFactory.GetDatabaseHandle().FlushDatabase()
+
+
+@pytest.fixture(autouse=True)
+def RecordBenchmarkDimensions(benchmark: BenchmarkFixture) -> None:
+    benchmark.extra_info.update(DatabaseFixtureFactory.GetBenchmarkDimensions())
+
+
+@pytest.fixture(autouse=True)
+def SampleServerResources(
+    SetupDatabaseContainer: None,
+    benchmark: BenchmarkFixture,
+    request: pytest.FixtureRequest,
+) -> typing.Generator[typing.Optional[ResourceSampler], None, None]:
+    sampling_interval = DatabaseFixtureFactory.GetResourceSamplingInterval()
+    if sampling_interval is None:
+        yield None
+        return
+    resource_sampler = ResourceSampler(
+        [
+            DatabaseFixtureFactory.GetDatabaseHandle().GetResourceSample,
+            DatabaseFixtureFactory.GetServerProcessSample,
+        ],
+        sampling_interval,
+    )
+    resource_sampler.start()
+    yield resource_sampler
+    resource_samples = resource_sampler.stop()
+    operations_count = (
+        benchmark.stats.stats.rounds * benchmark.stats.iterations
+        if benchmark.stats
+        else 0
+    )
+    benchmark.extra_info["resource_samples"] = resource_samples
+    benchmark.extra_info["resource_summary"] = SummarizeResourceSamples(
+        resource_samples,
+        operations_count,
+        request.node.callspec.params.get("records_count"),
+    )
+
+
+@pytest.fixture(autouse=True)
+def ProfileOperationPhases(
+    SetupDatabaseContainer: None,
+    benchmark: BenchmarkFixture,
+    request: pytest.FixtureRequest,
+) -> typing.Generator[None, None, None]:
+    flamegraph_capture = PhaseProfiler.StartFlamegraphCapture(request.node.name)
+    PhaseProfiler.Reset()
+    yield
+    if PhaseProfiler.IsEnabled():
+        benchmark.extra_info["phase_profile"] = PhaseProfiler.GetReport(
+            DatabaseFixtureFactory.GetDatabaseHandle().GetServerExecutionSeconds()
+        )
+    if flamegraph_capture is not None:
+        benchmark.extra_info["flamegraph"] = (
+            PhaseProfiler.StopFlamegraphCapture(flamegraph_capture)
+        )
+
+
+def MarkMeasurementBaseline(
+    resource_sampler: typing.Optional[ResourceSampler],
+) -> None:
+    # Work before the timed benchmark, e.g. loading records or capturing
+    # plans, is not part of the measured operation
+    if resource_sampler is not None:
+        resource_sampler.mark_baseline()
+    if PhaseProfiler.IsEnabled():
+        PhaseProfiler.Reset(
+            DatabaseFixtureFactory.GetDatabaseHandle().GetServerExecutionSeconds()
+        )
+
+
 def LoadRecordsToDatabase(
     records_count: int,
-) -> None:
+) -> datetime:
     data_parquet_path: str = DatabaseFixtureFactory.GetDatasetPath()
     loader_handle = DatabaseFixtureFactory.GetDataLoaderFunction()
 
-    df = pd.read_parquet(data_parquet_path)  # type: ignore
-    df = df.head(records_count)
-    df.rename(
-        columns={
-            "Airport_fee": "airport_fee",
-            "RatecodeID": "rate_code_id",
-            "VendorID": "vendor_id",
-            "trip_distance": "distance",
-        },
-        inplace=True,
-    )
-    logging.info(f"Loaded {len(df)} rows from {data_parquet_path}")
-    loader_handle(DatabaseFixtureFactory.GetDatabaseHandle(), df)
+    loaded_rows = 0
+    chunk_pickup_medians: list[datetime] = []
+    for df in DatabaseFixtureFactory.GetRecordChunks(records_count):
+        df.rename(
+            columns={
+                "Airport_fee": "airport_fee",
+                "RatecodeID": "rate_code_id",
+                "VendorID": "vendor_id",
+                "trip_distance": "distance",
+            },
+            inplace=True,
+        )
+        chunk_pickup_medians.append(
+            df["tpep_pickup_datetime"].median().to_pydatetime()
+        )
+        loader_handle(DatabaseFixtureFactory.GetDatabaseHandle(), df)
+        loaded_rows += len(df)
+    logging.info(f"Loaded {loaded_rows} rows from {data_parquet_path}")
+    # Time window reads are placed where the loaded trips are
+    return GetPickupWindowStart(chunk_pickup_medians)
+
+
+def ReloadRecordsToDatabase(records_count: int) -> None:
+    # pytest-benchmark takes a value returned by setup as the target arguments
+    LoadRecordsToDatabase(records_count)
 
 
 def GetCRUDHandler() -> AbstractCRUDHandler:
     return DatabaseFixtureFactory.ChooseBasedOnDatabaseType(
         RedisCRUDHandler(
-            DatabaseFixtureFactory.GetDatabaseHandle().GetDatabaseEngine()
+            DatabaseFixtureFactory.GetDatabaseHandle().GetShardEngines(),
+            RedisDatabase.GetStorageModel(),
+            DatabaseFixtureFactory.GetReadResultFormat(),
+            RedisDatabase.GetShardExecutor(),
+        ),
+        GetPostgresCRUDHandler(),
+        sqlite_option=OrmCRUDHandler(
+            DatabaseFixtureFactory.GetDatabaseHandle().GetDatabaseEngine(),
+            DatabaseFixtureFactory.GetReadResultFormat(),
+            DatabaseFixtureFactory.GetDeleteBatchSize(),
+        ),
+        numpy_option=NumpyCRUDHandler(
+            DatabaseFixtureFactory.GetDatabaseHandle().GetDatabaseEngine(),
+            DatabaseFixtureFactory.GetReadResultFormat(),
+        ),
+        postgres_jsonb_option=JsonbDocumentCRUDHandler(
+            DatabaseFixtureFactory.GetDatabaseHandle().GetDatabaseEngine(),
+            result_format=DatabaseFixtureFactory.GetReadResultFormat(),
+            delete_batch_size=DatabaseFixtureFactory.GetDeleteBatchSize(),
+        ),
+    )
+
+
+def GetPostgresCRUDHandler() -> AbstractCRUDHandler:
+    database_engine = (
+        DatabaseFixtureFactory.GetDatabaseHandle().GetDatabaseEngine()
+    )
+    read_result_format = DatabaseFixtureFactory.GetReadResultFormat()
+    delete_batch_size = DatabaseFixtureFactory.GetDeleteBatchSize()
+    return PostgresDatabase.ChooseBasedOnLayout(
+        normalized_option=OrmCRUDHandler(
+            database_engine, read_result_format, delete_batch_size
         ),
-        OrmCRUDHandler(
-            DatabaseFixtureFactory.GetDatabaseHandle().GetDatabaseEngine()
+        flat_option=FlatOrmCRUDHandler(
+            database_engine,
+            TripFlat.__table__,
+            result_format=read_result_format,
+            delete_batch_size=delete_batch_size,
         ),
+        materialized_view_option=MaterializedViewCRUDHandler(
+            database_engine,
+            TripFlatView,
+            result_format=read_result_format,
+            delete_batch_size=delete_batch_size,
+        ),
+    )
+
+
+def GetCacheAsideCRUDHandler() -> CacheAsideCRUDHandler:
+    if DatabaseFixtureFactory.GetCacheAddress() is None:
+        pytest.skip("Cache-aside runs need the address of a Redis cache.")
+    backing_handler = GetCRUDHandler()
+    if (
+        type(backing_handler) is not OrmCRUDHandler
+        or DatabaseFixtureFactory.GetReadResultFormat() != ReadResultFormat.ROWS
+    ):
+        pytest.skip("The cache tier fronts normalized ORM row reads only.")
+    return CacheAsideCRUDHandler(
+        backing_handler,
+        DatabaseFixtureFactory.GetCacheEngine(),
+        DatabaseFixtureFactory.GetCacheTtl(),
+        DatabaseFixtureFactory.GetCacheWritePolicy(),
+    )
+
+
+def SelectTripLookupQueries(working_set_size: int) -> list[typing.Any]:
+    database_engine = (
+        DatabaseFixtureFactory.GetDatabaseHandle().GetDatabaseEngine()
+    )
+    with database_engine.connect() as connection:
+        trip_ids = connection.scalars(
+            select(Trip.id).order_by(Trip.id).limit(working_set_size)
+        ).all()
+    return BuildTripLookupQueries(trip_ids)
+
+
+def AssertNoOrphanedRows() -> None:
+    # Meter readings, payments and fees exist only for the row owning them,
+    # a batched delete must not leave them behind. The single cascading
+    # DELETE only removes dependents
+    database_type = DatabaseFixtureFactory.GetDatabaseType()
+    if DatabaseFixtureFactory.GetDeleteBatchSize() is None:
+        return
+    if database_type not in (DatabaseType.SQLITE, DatabaseType.POSTGRES) or (
+        database_type == DatabaseType.POSTGRES
+        and PostgresDatabase.GetLayout() == PostgresLayout.FLAT
+    ):
+        return
+    database_engine = (
+        DatabaseFixtureFactory.GetDatabaseHandle().GetDatabaseEngine()
+    )
+    with database_engine.connect() as connection:
+        orphaned_rows = {
+            owned_table.name: connection.scalar(
+                select(func.count())
+                .select_from(owned_table)
+                .where(
+                    and_(
+                        *(
+                            owned_table.c.id.not_in(select(owner_column))
+                            for _, owner_column in GetDependentReferences(
+                                owned_table
+                            )
+                        )
+                    )
+                )
+            )
+            for owned_table in BaseOrmType.metadata.sorted_tables
+            if GetDependentReferences(owned_table)
+        }
+    assert not any(orphaned_rows.values()), (
+        f"Delete left orphaned rows behind: {orphaned_rows}"
     )
 
 
-RECORDS_COUNTS_TEST_LIST = [1000, 5000, 10000, 50000]
+def CaptureQueryPlan(
+    benchmark: BenchmarkFixture,
+    crud_handler: AbstractCRUDHandler,
+    records_count: int,
+    *query_args: typing.Any,
+    **explain_options: typing.Any,
+) -> None:
+    if not DatabaseFixtureFactory.GetCaptureQueryPlans():
+        return
+    benchmark.extra_info["records_count"] = records_count
+    benchmark.extra_info["query_plan"] = crud_handler.explain(
+        *query_args, **explain_options
+    )
+
+
+def CaptureModifyingQueryPlan(
+    benchmark: BenchmarkFixture,
+    crud_handler: AbstractCRUDHandler,
+    records_count: int,
+    *query_args: typing.Any,
+    **explain_options: typing.Any,
+) -> None:
+    if not DatabaseFixtureFactory.GetCaptureQueryPlans():
+        return
+    LoadRecordsToDatabase(records_count)
+    CaptureQueryPlan(
+        benchmark, crud_handler, records_count, *query_args, **explain_options
+    )
+    DatabaseFixtureFactory.GetDatabaseHandle().FlushDatabase()
+
+
+def BenchmarkReadQuery(
+    benchmark: BenchmarkFixture,
+    resource_sampler: typing.Optional[ResourceSampler],
+    records_count: int,
+    read_selector: typing.Any,
+    cache_state: typing.Optional[CacheState] = None,
+) -> None:
+    if (
+        cache_state == CacheState.COLD
+        and DatabaseFixtureFactory.GetDatabaseType() == DatabaseType.REDIS
+    ):
+        pytest.skip(
+            "Redis keeps every record in memory, it has no cold cache state."
+        )
+    pickup_window_start = LoadRecordsToDatabase(records_count)
+    if callable(read_selector):
+        read_selector = read_selector(pickup_window_start)
+    MarkMeasurementBaseline(resource_sampler)
+    crud_handler: AbstractCRUDHandler = GetCRUDHandler()
+    select_query = DatabaseFixtureFactory.ChooseQueryBasedOnDatabaseType(
+        *read_selector
+    )
+    database_handle = DatabaseFixtureFactory.GetDatabaseHandle()
+    match cache_state:
+        case CacheState.COLD:
+            benchmark.pedantic(
+                target=crud_handler.read,
+                args=(select_query,),
+                setup=database_handle.EvictCaches,
+                rounds=10,
+            )
+        case CacheState.WARM:
+            database_handle.PrewarmCaches()
+            benchmark.pedantic(
+                target=crud_handler.read,
+                args=(select_query,),
+                warmup_rounds=1,
+                rounds=10,
+            )
+        case _:
+            benchmark(crud_handler.read, select_query)
+    if cache_state is not None:
+        benchmark.extra_info["cache_state"] = cache_state.value
+    benchmark.extra_info["storage_footprint"] = (
+        DatabaseFixtureFactory.GetDatabaseHandle().GetStorageFootprint()
+    )
+    CaptureQueryPlan(benchmark, crud_handler, records_count, select_query)
+
+
+RECORDS_COUNTS_TEST_LIST = DatabaseFixtureFactory.GetRecordsCounts()
 
 
 @pytest.mark.parametrize("records_count", RECORDS_COUNTS_TEST_LIST)
 def test_create_records(
-    SetupDatabaseContainer: None,
+    SampleServerResources: typing.Optional[ResourceSampler],
     benchmark: BenchmarkFixture,
     records_count: int,
 ) -> None:
+    database_handle = DatabaseFixtureFactory.GetDatabaseHandle()
+    load_finish_seconds: list[float] = []
+
+    def FinishLoadAndFlush(*_: typing.Any) -> None:
+        # Switching the durability back after the load (the LOGGED rewrite of
+        # unlogged tables) is timed on its own
+        finish_start = time.perf_counter()
+        database_handle.FinishLoad()
+        load_finish_seconds.append(time.perf_counter() - finish_start)
+        database_handle.FlushDatabase()
+
+    MarkMeasurementBaseline(SampleServerResources)
     benchmark.pedantic(
         target=LoadRecordsToDatabase,
         args=(records_count,),
-        teardown=lambda *_: DatabaseFixtureFactory.GetDatabaseHandle().FlushDatabase(),
+        setup=database_handle.PrepareForLoad,
+        teardown=FinishLoadAndFlush,
         rounds=10,
     )
+    benchmark.extra_info["load_finish_seconds"] = statistics.mean(
+        load_finish_seconds
+    )
 
 
 @pytest.mark.parametrize(
-    "records_count, read_selector",
-    list(product(RECORDS_COUNTS_TEST_LIST, SELECT_QUERIES_TEST_LIST)),
+    "records_count, read_selector, cache_state",
+    list(
+        product(RECORDS_COUNTS_TEST_LIST, SELECT_QUERIES_TEST_LIST, CacheState)
+    ),
     ids=lambda val: str(val)
-    if isinstance(val, int)
+    if isinstance(val, int | CacheState)
     else f"read_query{SELECT_QUERIES_TEST_LIST.index(val)}",
 )
 def test_read_records(
-    SetupDatabaseContainer: None,
+    SampleServerResources: typing.Optional[ResourceSampler],
+    benchmark: BenchmarkFixture,
+    records_count: int,
+    read_selector: typing.Any,
+    cache_state: CacheState,
+) -> None:
+    BenchmarkReadQuery(
+        benchmark,
+        SampleServerResources,
+        records_count,
+        read_selector,
+        cache_state,
+    )
+
+
+@pytest.mark.parametrize(
+    "records_count, read_selector",
+    list(product(RECORDS_COUNTS_TEST_LIST, TIME_RANGE_QUERIES_TEST_LIST)),
+    ids=lambda val: str(val)
+    if isinstance(val, int)
+    else f"time_range_query{TIME_RANGE_QUERIES_TEST_LIST.index(val)}",
+)
+def test_time_range_read_records(
+    SampleServerResources: typing.Optional[ResourceSampler],
     benchmark: BenchmarkFixture,
     records_count: int,
     read_selector: typing.Any,
+) -> None:
+    BenchmarkReadQuery(
+        benchmark, SampleServerResources, records_count, read_selector
+    )
+
+
+@pytest.mark.parametrize(
+    "records_count, read_selector",
+    list(product(RECORDS_COUNTS_TEST_LIST, ORDERED_QUERIES_TEST_LIST)),
+    ids=lambda val: str(val)
+    if isinstance(val, int)
+    else f"ordered_query{ORDERED_QUERIES_TEST_LIST.index(val)}",
+)
+def test_ordered_read_records(
+    SampleServerResources: typing.Optional[ResourceSampler],
+    benchmark: BenchmarkFixture,
+    records_count: int,
+    read_selector: typing.Any,
+) -> None:
+    BenchmarkReadQuery(
+        benchmark, SampleServerResources, records_count, read_selector
+    )
+
+
+@pytest.mark.parametrize(
+    "records_count, aggregate_selector",
+    list(product(RECORDS_COUNTS_TEST_LIST, AGGREGATE_QUERIES_TEST_LIST)),
+    ids=lambda val: str(val)
+    if isinstance(val, int)
+    else f"aggregate_query{AGGREGATE_QUERIES_TEST_LIST.index(val)}",
+)
+def test_aggregate_records(
+    SampleServerResources: typing.Optional[ResourceSampler],
+    benchmark: BenchmarkFixture,
+    records_count: int,
+    aggregate_selector: typing.Any,
 ) -> None:
     LoadRecordsToDatabase(records_count)
+    MarkMeasurementBaseline(SampleServerResources)
     crud_handler: AbstractCRUDHandler = GetCRUDHandler()
-    select_query = DatabaseFixtureFactory.ChooseBasedOnDatabaseType(
-        *read_selector
+    aggregate_query = DatabaseFixtureFactory.ChooseQueryBasedOnDatabaseType(
+        *aggregate_selector
     )
-    benchmark(crud_handler.read, select_query)
+    benchmark(crud_handler.aggregate, aggregate_query)
+    CaptureQueryPlan(benchmark, crud_handler, records_count, aggregate_query)
 
 
 @pytest.mark.parametrize(
@@ -106,20 +497,24 @@ def test_read_records(
     else f"update_query{UPDATE_QUERIES_TEST_LIST.index(val)}",
 )
 def test_update_records(
-    SetupDatabaseContainer: None,
+    SampleServerResources: typing.Optional[ResourceSampler],
     benchmark: BenchmarkFixture,
     records_count: int,
     update_selector: tuple[typing.Any, typing.Any],
 ) -> None:
     crud_handler: AbstractCRUDHandler = GetCRUDHandler()
     update_query, update_values = (
-        DatabaseFixtureFactory.ChooseBasedOnDatabaseType(*update_selector)
+        DatabaseFixtureFactory.ChooseQueryBasedOnDatabaseType(*update_selector)
+    )
+    CaptureModifyingQueryPlan(
+        benchmark, crud_handler, records_count, update_query, update_values
     )
 
+    MarkMeasurementBaseline(SampleServerResources)
     benchmark.pedantic(
         target=crud_handler.update,
         args=(update_query, update_values),
-        setup=lambda: LoadRecordsToDatabase(records_count),
+        setup=lambda: ReloadRecordsToDatabase(records_count),
         teardown=lambda *_: DatabaseFixtureFactory.GetDatabaseHandle().FlushDatabase(),
         rounds=10,
     )
@@ -133,19 +528,117 @@ def test_update_records(
     else f"delete_query{DELETE_QUERIES_TEST_LIST.index(val)}",
 )
 def test_delete_records(
-    SetupDatabaseContainer: None,
+    SampleServerResources: typing.Optional[ResourceSampler],
     benchmark: BenchmarkFixture,
     records_count: int,
     delete_selector: tuple[tuple[str, Query], Delete],
 ) -> None:
     crud_handler: AbstractCRUDHandler = GetCRUDHandler()
-    delete_query = DatabaseFixtureFactory.ChooseBasedOnDatabaseType(
+    delete_query = DatabaseFixtureFactory.ChooseQueryBasedOnDatabaseType(
         *delete_selector
     )
+    CaptureModifyingQueryPlan(
+        benchmark, crud_handler, records_count, delete_query, for_delete=True
+    )
+
+    def CheckAndFlushDatabase(*_: typing.Any) -> None:
+        AssertNoOrphanedRows()
+        DatabaseFixtureFactory.GetDatabaseHandle().FlushDatabase()
+
+    MarkMeasurementBaseline(SampleServerResources)
     benchmark.pedantic(
         target=crud_handler.delete,
         args=(delete_query,),
-        setup=lambda: LoadRecordsToDatabase(records_count),
+        setup=lambda: ReloadRecordsToDatabase(records_count),
+        teardown=CheckAndFlushDatabase,
+        rounds=10,
+    )
+
+
+@pytest.mark.parametrize(
+    "records_count, working_set_size, cache_hit_ratio",
+    list(
+        product(
+            RECORDS_COUNTS_TEST_LIST,
+            CACHE_WORKING_SET_SIZES_TEST_LIST,
+            CACHE_HIT_RATIOS_TEST_LIST,
+        )
+    ),
+)
+def test_cache_aside_read_records(
+    SampleServerResources: typing.Optional[ResourceSampler],
+    benchmark: BenchmarkFixture,
+    records_count: int,
+    working_set_size: int,
+    cache_hit_ratio: float,
+) -> None:
+    cache_handler = GetCacheAsideCRUDHandler()
+    LoadRecordsToDatabase(records_count)
+    lookup_queries = SelectTripLookupQueries(working_set_size)
+    cached_queries_count = round(len(lookup_queries) * cache_hit_ratio)
+
+    def PrimeCache() -> None:
+        cache_handler.flush()
+        for lookup_query in lookup_queries[:cached_queries_count]:
+            cache_handler.read(lookup_query)
+        cache_handler.reset_statistics()
+
+    def ReadWorkingSet() -> None:
+        for lookup_query in lookup_queries:
+            cache_handler.read(lookup_query)
+
+    MarkMeasurementBaseline(SampleServerResources)
+    benchmark.pedantic(target=ReadWorkingSet, setup=PrimeCache, rounds=10)
+    # The statistics cover the last round, the misses are the reads that
+    # reached the backing database
+    benchmark.extra_info.update(
+        {
+            "working_set_size": len(lookup_queries),
+            **cache_handler.get_statistics(),
+        }
+    )
+    cache_handler.flush()
+
+
+@pytest.mark.parametrize(
+    "records_count, update_selector",
+    list(product(RECORDS_COUNTS_TEST_LIST, UPDATE_QUERIES_TEST_LIST)),
+    ids=lambda val: str(val)
+    if isinstance(val, int)
+    else f"update_query{UPDATE_QUERIES_TEST_LIST.index(val)}",
+)
+def test_cache_aside_update_records(
+    SampleServerResources: typing.Optional[ResourceSampler],
+    benchmark: BenchmarkFixture,
+    records_count: int,
+    update_selector: tuple[typing.Any, typing.Any],
+) -> None:
+    cache_handler = GetCacheAsideCRUDHandler()
+    update_query, update_values = update_selector[1]
+
+    working_set_size = CACHE_WORKING_SET_SIZES_TEST_LIST[0]
+
+    def LoadAndPrimeCache() -> None:
+        ReloadRecordsToDatabase(records_count)
+        cache_handler.flush()
+        for lookup_query in SelectTripLookupQueries(working_set_size):
+            cache_handler.read(lookup_query)
+        cache_handler.reset_statistics()
+
+    # Updates pay for invalidating or rewriting the cached lookups, a
+    # write-through update rereads every cached lookup of the updated table
+    MarkMeasurementBaseline(SampleServerResources)
+    benchmark.pedantic(
+        target=cache_handler.update,
+        args=(update_query, update_values),
+        setup=LoadAndPrimeCache,
         teardown=lambda *_: DatabaseFixtureFactory.GetDatabaseHandle().FlushDatabase(),
         rounds=10,
     )
+    benchmark.extra_info.update(
+        {
+            "working_set_size": working_set_size,
+            **cache_handler.get_statistics(),
+        }
+    )
+    cache_handler.flush()
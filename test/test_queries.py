@@ -1,7 +1,23 @@
 import typing
+from datetime import datetime, timedelta, timezone
 
+from redis.commands.search import reducers
+from redis.commands.search.aggregation import AggregateRequest, Asc, Desc
 from redis.commands.search.query import Query
-from sqlalchemy import Delete, Update, and_, delete, select, update
+from sqlalchemy import (
+    Delete,
+    Integer,
+    Select,
+    Update,
+    and_,
+    cast,
+    delete,
+    func,
+    literal_column,
+    select,
+    update,
+)
+from sqlalchemy.orm import aliased
 
 import src.framework.models as models
 
@@ -28,7 +44,7 @@ SELECT_QUERIES_TEST_LIST: list[tuple[tuple[str, Query], typing.Any]] = [
             Query(
                 "@airport_fee:[0.00000001 inf] @distance:[-inf 1.99999999] "
                 "@fare_amount:[10.00000001 inf] (@passenger_count:[1 3] | @passenger_count:[5 5])"
-            ),
+            ).sort_by("total_amount", asc=False),
         ),
         select(
             models.Trip,
@@ -50,7 +66,7 @@ SELECT_QUERIES_TEST_LIST: list[tuple[tuple[str, Query], typing.Any]] = [
             "idx:trip",
             Query(
                 "@vendor_name:{Curb*} @distance:[3 inf] @fare_amount:[20 inf]"
-            ),
+            ).sort_by("airport_fee", asc=False),
         ),
         select(
             models.Trip.id,
@@ -73,6 +89,287 @@ SELECT_QUERIES_TEST_LIST: list[tuple[tuple[str, Query], typing.Any]] = [
     ),
 ]
 
+# The windows start at the hour the loaded pickups center on, so they are
+# built once the records are loaded
+SHORT_PICKUP_WINDOW = timedelta(minutes=15)
+LONG_PICKUP_WINDOW = timedelta(hours=1)
+
+ReadSelector = tuple[tuple[str, Query], typing.Any]
+
+
+def GetPickupWindowStart(pickup_times: typing.Iterable[datetime]) -> datetime:
+    # A median ignores the few trips with implausible dates in TLC files
+    ordered_times = sorted(pickup_times)
+    return ordered_times[len(ordered_times) // 2].replace(
+        minute=0, second=0, microsecond=0
+    )
+
+
+def EpochSeconds(moment: datetime) -> float:
+    return moment.replace(tzinfo=timezone.utc).timestamp()
+
+
+def EpochRange(field: str, start: datetime, end: datetime) -> str:
+    return f"@{field}:[{EpochSeconds(start)} {EpochSeconds(end)}]"
+
+
+PickupMeter = aliased(models.TaxiMeter)
+DropoffMeter = aliased(models.TaxiMeter)
+
+
+def PickupWindowQuery(window_start: datetime) -> ReadSelector:
+    window_end = window_start + SHORT_PICKUP_WINDOW
+    return (
+        (
+            "idx:trip",
+            Query(EpochRange("pickup_time", window_start, window_end)),
+        ),
+        select(models.Trip)
+        .join(models.Trip.pickup)
+        .where(
+            models.TaxiMeter.taxi_meter_date.between(window_start, window_end)
+        ),
+    )
+
+
+def LongTripsInPickupWindowQuery(window_start: datetime) -> ReadSelector:
+    window_end = window_start + LONG_PICKUP_WINDOW
+    return (
+        (
+            "idx:trip",
+            Query(
+                EpochRange("pickup_time", window_start, window_end)
+                + " @distance:[5.00000001 inf]"
+            ),
+        ),
+        select(models.Trip)
+        .join(models.Trip.pickup)
+        .where(
+            and_(
+                models.TaxiMeter.taxi_meter_date.between(
+                    window_start, window_end
+                ),
+                models.Trip.distance > 5,
+            )
+        ),
+    )
+
+
+def ExpensiveTripsInDropoffWindowQuery(window_start: datetime) -> ReadSelector:
+    window_end = window_start + LONG_PICKUP_WINDOW
+    return (
+        (
+            "idx:trip",
+            Query(
+                EpochRange("dropoff_time", window_start, window_end)
+                + " @fare_amount:[20 inf]"
+            ),
+        ),
+        select(models.Trip)
+        .join(models.Trip.dropoff)
+        .join(models.Trip.payment)
+        .where(
+            and_(
+                models.TaxiMeter.taxi_meter_date.between(
+                    window_start, window_end
+                ),
+                models.Payment.fare_amount >= 20,
+            )
+        ),
+    )
+
+
+def PickupAndDropoffWindowQuery(window_start: datetime) -> ReadSelector:
+    window_end = window_start + LONG_PICKUP_WINDOW
+    return (
+        (
+            "idx:trip",
+            Query(
+                EpochRange("pickup_time", window_start, window_end)
+                + " "
+                + EpochRange("dropoff_time", window_start, window_end)
+            ),
+        ),
+        select(models.Trip)
+        .join(PickupMeter, models.Trip.pickup)
+        .join(DropoffMeter, models.Trip.dropoff)
+        .where(
+            and_(
+                PickupMeter.taxi_meter_date.between(window_start, window_end),
+                DropoffMeter.taxi_meter_date.between(window_start, window_end),
+            )
+        ),
+    )
+
+
+def OrderedPickupWindowQuery(window_start: datetime) -> ReadSelector:
+    window_end = window_start + LONG_PICKUP_WINDOW
+    return (
+        (
+            "idx:trip",
+            Query(EpochRange("pickup_time", window_start, window_end)).sort_by(
+                "pickup_time"
+            ),
+        ),
+        select(models.Trip)
+        .join(models.Trip.pickup)
+        .where(
+            models.TaxiMeter.taxi_meter_date.between(window_start, window_end)
+        )
+        .order_by(models.TaxiMeter.taxi_meter_date),
+    )
+
+
+TIME_RANGE_QUERIES_TEST_LIST: list[
+    typing.Callable[[datetime], ReadSelector]
+] = [
+    PickupWindowQuery,
+    LongTripsInPickupWindowQuery,
+    ExpensiveTripsInDropoffWindowQuery,
+    PickupAndDropoffWindowQuery,
+]
+
+ORDERED_QUERIES_TEST_LIST: list[
+    ReadSelector | typing.Callable[[datetime], ReadSelector]
+] = [
+    OrderedPickupWindowQuery,
+    (
+        ("idx:trip", Query("*").sort_by("distance", asc=False)),
+        select(models.Trip).order_by(models.Trip.distance.desc()),
+    ),
+    (
+        (
+            "idx:trip",
+            Query("@passenger_count:[3 inf]").sort_by(
+                "fare_amount", asc=False
+            ),
+        ),
+        select(models.Trip)
+        .join(models.Trip.payment)
+        .where(models.Trip.passenger_count > 2)
+        .order_by(models.Payment.fare_amount.desc()),
+    ),
+    (
+        (
+            "idx:trip",
+            Query("@distance:[10.00000001 inf]").sort_by("total_amount"),
+        ),
+        select(models.Trip)
+        .join(models.Trip.payment)
+        .where(models.Trip.distance > 10)
+        .order_by(models.Payment.total_amount),
+    ),
+]
+
+# Aggregations return every group, the default FT.AGGREGATE limit is 10 rows
+AGGREGATE_GROUPS_LIMIT = 100000
+
+# The unit is rendered inline so SELECT and GROUP BY share one expression
+PICKUP_HOUR = func.date_trunc(
+    literal_column("'hour'"), models.TaxiMeter.taxi_meter_date
+)
+
+AGGREGATE_QUERIES_TEST_LIST: list[
+    tuple[tuple[str, AggregateRequest], Select[typing.Any]]
+] = [
+    (
+        (
+            "idx:trip",
+            AggregateRequest("*")
+            .load("@PULocationID", "@fare_amount")
+            .group_by(
+                "@PULocationID",
+                reducers.avg("@fare_amount").alias("avg_fare"),
+                reducers.count().alias("trips"),
+            )
+            .sort_by(Desc("@avg_fare"))
+            .limit(0, AGGREGATE_GROUPS_LIMIT),
+        ),
+        select(
+            cast(models.TaxiMeter.taxi_meter_location, Integer).label(
+                "PULocationID"
+            ),
+            func.avg(models.Payment.fare_amount).label("avg_fare"),
+            func.count().label("trips"),
+        )
+        .select_from(models.Trip)
+        .join(models.Trip.pickup)
+        .join(models.Trip.payment)
+        .group_by(models.TaxiMeter.taxi_meter_location)
+        .order_by(func.avg(models.Payment.fare_amount).desc()),
+    ),
+    (
+        (
+            "idx:trip",
+            AggregateRequest("*")
+            .load("@pickup_time")
+            .apply(pickup_hour="hour(@pickup_time)")
+            .group_by("@pickup_hour", reducers.count().alias("trips"))
+            .sort_by(Asc("@pickup_hour"))
+            .limit(0, AGGREGATE_GROUPS_LIMIT),
+        ),
+        select(
+            PICKUP_HOUR.label("pickup_hour"),
+            func.count().label("trips"),
+        )
+        .select_from(models.Trip)
+        .join(models.Trip.pickup)
+        .group_by(PICKUP_HOUR)
+        .order_by(PICKUP_HOUR),
+    ),
+    (
+        (
+            "idx:trip",
+            AggregateRequest("*")
+            .load("@vendor_name", "@rate_code_id", "@total_amount")
+            .group_by(
+                ["@vendor_name", "@rate_code_id"],
+                reducers.sum("@total_amount").alias("revenue"),
+                reducers.count().alias("trips"),
+            )
+            .sort_by(Desc("@revenue"))
+            .limit(0, AGGREGATE_GROUPS_LIMIT),
+        ),
+        select(
+            models.Vendor.vendor_name,
+            models.Payment.rate_code_id,
+            func.sum(models.Payment.total_amount).label("revenue"),
+            func.count().label("trips"),
+        )
+        .select_from(models.Trip)
+        .join(models.Trip.vendor)
+        .join(models.Trip.payment)
+        .group_by(models.Vendor.vendor_name, models.Payment.rate_code_id)
+        .order_by(func.sum(models.Payment.total_amount).desc()),
+    ),
+    (
+        (
+            "idx:trip",
+            AggregateRequest("@distance:[1 inf]")
+            .load("@passenger_count", "@fare_amount", "@distance")
+            .apply(fare_per_mile="@fare_amount / @distance")
+            .group_by(
+                "@passenger_count",
+                reducers.avg("@fare_per_mile").alias("avg_fare_per_mile"),
+                reducers.max("@distance").alias("max_distance"),
+            )
+            .sort_by(Asc("@passenger_count"))
+            .limit(0, AGGREGATE_GROUPS_LIMIT),
+        ),
+        select(
+            models.Trip.passenger_count,
+            func.avg(models.Payment.fare_amount / models.Trip.distance).label(
+                "avg_fare_per_mile"
+            ),
+            func.max(models.Trip.distance).label("max_distance"),
+        )
+        .join(models.Trip.payment)
+        .where(models.Trip.distance >= 1)
+        .group_by(models.Trip.passenger_count)
+        .order_by(models.Trip.passenger_count),
+    ),
+]
+
 
 UPDATE_QUERIES_TEST_LIST: list[
     tuple[
@@ -220,3 +517,16 @@ DELETE_QUERIES_TEST_LIST: list[tuple[tuple[str, Query], Delete]] = [
         delete(models.Trip).where(models.Trip.passenger_count.in_([2, 3, 5])),
     ),
 ]
+
+# Cache-aside sweeps read a working set of single trip lookups, the given
+# share of them is cached before every round
+CACHE_HIT_RATIOS_TEST_LIST: list[float] = [0.0, 0.5, 0.9, 1.0]
+
+CACHE_WORKING_SET_SIZES_TEST_LIST: list[int] = [100, 1000]
+
+
+def BuildTripLookupQueries(trip_ids: typing.Iterable[int]) -> list[Select]:
+    return [
+        select(models.Trip).where(models.Trip.id == trip_id)
+        for trip_id in trip_ids
+    ]